@@ -0,0 +1,95 @@
+"""Bandwidth vs CPU of response compression: bytes on the wire and cost per response for each encoding.
+
+For every payload size and encoding it prints the compressed size, the compression time of one
+response and the rps of an ORJSONResponse route behind `CompressionMiddleware`, plus a streamed
+response compressed chunk by chunk. Routes sit on a plain APIRouter so the access log does not
+dominate the numbers.
+
+Usage: python -m benchmarks.bench_compression [--items 10 200 5000] [--requests 2000] [--concurrency 20]
+"""
+
+import argparse
+import asyncio
+import timeit
+from functools import partial
+
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from loguru import logger
+from orjson import orjson
+
+from benchmarks.utils import make_http_scope, run_asgi_load, write_line
+from src.settings import CompressionSettings
+from src.transport.rest.content_encoding import AVAILABLE_ENCODINGS, BROTLI, GZIP, IDENTITY, ZSTD, compress
+from src.transport.rest.middlewares.compression_middleware import CompressionMiddleware
+
+STREAM_CHUNKS = 32
+
+
+def _payload(items: int) -> list[dict]:
+    return [
+        {'id': idx, 'name': f'item {idx}', 'tags': ['alpha', 'beta', str(idx % 7)], 'price': idx * 1.25}
+        for idx in range(items)
+    ]
+
+
+def _make_app(items: int, settings: CompressionSettings) -> FastAPI:
+    app = FastAPI()
+    router = APIRouter(prefix='/bench')
+    payload = _payload(items)
+    chunk = orjson.dumps(payload[: max(items // STREAM_CHUNKS, 1)])
+
+    @router.get(path='/json')
+    async def get_json_handler():
+        return ORJSONResponse(payload)
+
+    @router.get(path='/stream')
+    async def get_stream_handler():
+        async def chunks():
+            for _ in range(STREAM_CHUNKS):
+                yield chunk
+
+        return StreamingResponse(chunks(), media_type='application/x-ndjson')
+
+    app.include_router(router)
+    app.add_middleware(CompressionMiddleware, settings=settings)  # type: ignore
+    return app
+
+
+async def _main(items_list: list[int], requests: int, concurrency: int) -> None:
+    logger.remove()
+    settings = CompressionSettings()
+    levels = {GZIP: settings.gzip_level, BROTLI: settings.brotli_quality, ZSTD: settings.zstd_level}
+
+    for items in items_list:
+        body = orjson.dumps(_payload(items))
+        app = _make_app(items, settings)
+        write_line(f'--- {items} items, {len(body)} bytes')
+
+        for encoding in (IDENTITY, *AVAILABLE_ENCODINGS):
+            if encoding == IDENTITY:
+                size, compress_us = len(body), 0.0
+            else:
+                size = len(compress(body, encoding, levels[encoding]))
+                level = levels[encoding]
+                compress_us = timeit.timeit(partial(compress, body, encoding, level), number=200) / 200 * 1e6
+            write_line(
+                f'{encoding:<9} level={levels.get(encoding, 0):<3} size={size:>9}B '
+                f'ratio={len(body) / size:6.2f} compress={compress_us:9.1f}us'
+            )
+
+            for path in ('/bench/json', '/bench/stream'):
+                scope = make_http_scope(path, headers=[(b'accept-encoding', encoding.encode())])
+                name = f'{encoding} {path.rsplit("/", 1)[-1]}'
+                await run_asgi_load(name, app, scope, requests=requests // 10, concurrency=concurrency)
+                result = await run_asgi_load(name, app, scope, requests=requests, concurrency=concurrency)
+                write_line(result.as_line())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, nargs='+', default=[10, 200, 5000])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(_main(items_list=args.items, requests=args.requests, concurrency=args.concurrency))
@@ -0,0 +1,77 @@
+"""Payload size and serialization cost of JSON vs MessagePack vs CBOR responses.
+
+For every payload size it prints the encoded size and encode/decode time of each available media type,
+then the rps of a `FastAPILoggingRouter` route answering with each of them (access log included).
+
+Usage: python -m benchmarks.bench_content_negotiation [--items 10 200 5000] [--requests 2000] [--concurrency 20]
+"""
+
+import argparse
+import asyncio
+import timeit
+from functools import partial
+
+from fastapi import FastAPI
+from loguru import logger
+from orjson import orjson
+
+from benchmarks.utils import make_http_scope, run_asgi_load, write_line
+from src.transport.rest.content_negotiation import AVAILABLE_MEDIA_TYPES, decode_body, encode_body, JSON
+from src.transport.rest.router import FastAPILoggingRouter
+
+
+def _payload(items: int) -> list[dict]:
+    return [
+        {'id': idx, 'name': f'item {idx}', 'tags': ['alpha', 'beta', str(idx % 7)], 'price': idx * 1.25}
+        for idx in range(items)
+    ]
+
+
+def _make_app(items: int) -> FastAPI:
+    app = FastAPI()
+    router = FastAPILoggingRouter(prefix='/bench')
+    payload = _payload(items)
+
+    @router.get(path='/items')
+    async def get_items_handler():
+        return payload
+
+    app.include_router(router)
+    return app
+
+
+def _encode(content: list[dict], media_type: str) -> bytes:
+    return orjson.dumps(content) if media_type == JSON else encode_body(content, media_type)
+
+
+def _decode(body: bytes, media_type: str) -> list[dict]:
+    return orjson.loads(body) if media_type == JSON else decode_body(body, media_type)
+
+
+async def _main(items_list: list[int], requests: int, concurrency: int) -> None:
+    logger.remove()
+
+    for items in items_list:
+        payload = _payload(items)
+        app = _make_app(items)
+        write_line(f'--- {items} items')
+
+        for media_type in AVAILABLE_MEDIA_TYPES:
+            body = _encode(payload, media_type)
+            encode_us = timeit.timeit(partial(_encode, payload, media_type), number=200) / 200 * 1e6
+            decode_us = timeit.timeit(partial(_decode, body, media_type), number=200) / 200 * 1e6
+            write_line(f'{media_type:<20} size={len(body):>9}B encode={encode_us:9.1f}us decode={decode_us:9.1f}us')
+
+            scope = make_http_scope('/bench/items', headers=[(b'accept', media_type.encode())])
+            await run_asgi_load(media_type, app, scope, requests=requests // 10, concurrency=concurrency)
+            result = await run_asgi_load(media_type, app, scope, requests=requests, concurrency=concurrency)
+            write_line(result.as_line())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, nargs='+', default=[10, 200, 5000])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(_main(items_list=args.items, requests=args.requests, concurrency=args.concurrency))
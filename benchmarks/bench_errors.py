@@ -0,0 +1,80 @@
+"""Cost of rendering ServerError responses: an auth-rejection flood and errors with per-request details.
+
+Prints the time of one `process_server_error` call and the rps of a route that rejects every request,
+for a static `UnauthorizedError`, one with `details` and the same in MessagePack when available.
+The route sits on a plain APIRouter so the access log does not dominate the numbers.
+
+Usage: python -m benchmarks.bench_errors [--requests 5000] [--concurrency 20]
+"""
+
+import argparse
+import asyncio
+import timeit
+from functools import partial
+
+from fastapi import APIRouter, Depends, FastAPI, Request
+from loguru import logger
+
+from benchmarks.utils import make_http_scope, run_asgi_load, write_line
+from src.settings import get_settings_snapshot, SettingsSnapshot
+from src.transport.rest.content_negotiation import AVAILABLE_MEDIA_TYPES, JSON
+from src.transport.rest.error_handlers import process_server_error, setup_fastapi_error_handlers
+from src.transport.rest.errors import UnauthorizedError
+
+
+async def _reject(request: Request) -> None:
+    if request.query_params.get('details'):
+        raise UnauthorizedError(details=[f'token expired for {request.url.path}'])
+    raise UnauthorizedError
+
+
+def _render(request: Request, *, details: list[str] | None, settings_snapshot: SettingsSnapshot) -> None:
+    process_server_error(
+        request,
+        UnauthorizedError(details=details),
+        sentry_id=None,
+        is_debug=False,
+        settings_snapshot=settings_snapshot,
+    )
+
+
+def _make_app() -> FastAPI:
+    app = FastAPI()
+    router = APIRouter(prefix='/bench')
+
+    @router.get(path='/private', dependencies=[Depends(_reject)])
+    async def get_private_handler():
+        return {}
+
+    app.include_router(router)
+    setup_fastapi_error_handlers(app, is_debug=False)
+    return app
+
+
+async def _main(requests: int, concurrency: int) -> None:
+    logger.remove()
+    settings_snapshot = get_settings_snapshot()
+    app = _make_app()
+
+    for media_type in AVAILABLE_MEDIA_TYPES[:2]:
+        accept = [(b'accept', media_type.encode())] if media_type != JSON else []
+        request = Request(make_http_scope('/bench/private', headers=accept))
+        for name, details in (('static', None), ('details', ['token expired'])):
+            render = partial(_render, request, details=details, settings_snapshot=settings_snapshot)
+            render_us = timeit.timeit(render, number=5000) / 5000 * 1e6
+            write_line(f'{media_type:<20} {name:<8} process_server_error={render_us:7.2f}us')
+
+            query_string = b'details=1' if details else b''
+            scope = make_http_scope('/bench/private', headers=accept, query_string=query_string)
+            label = f'{media_type} {name}'
+            await run_asgi_load(label, app, scope, requests=requests // 10, concurrency=concurrency)
+            result = await run_asgi_load(label, app, scope, requests=requests, concurrency=concurrency)
+            write_line(result.as_line())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(_main(requests=args.requests, concurrency=args.concurrency))
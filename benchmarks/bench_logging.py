@@ -0,0 +1,67 @@
+"""Records-per-second of the `AppLogger.make()` sinks: text (stderr + serialized file) vs the batched JSON sink.
+
+Every mode writes to /dev/null (the text file sink to a temporary directory) and the clock stops
+once the last record is written, so queued and batched records are counted.
+
+Usage: python -m benchmarks.bench_logging [--records 50000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+from loguru import logger
+
+from benchmarks.utils import ROOT_PATH, write_line
+
+# AppLogger lives in src/logger.py and is imported as a top-level module, as under src/main.py
+sys.path.append(str(ROOT_PATH / 'src'))
+
+from logger import AppLogger  # noqa: E402
+from src.settings import get_settings, LogSinkMode  # noqa: E402
+
+ACCESS_RECORD = {
+    'destination': 'internal',
+    'http_method': 'GET',
+    'method': '/debug/ping',
+    'processing_time': 0.0002,
+    'http_status_code': 200,
+    'trace_id': '2dda34c8-8f8a-441c-ad14-ad054dd42fc7',
+}
+
+
+def _run(mode: LogSinkMode, records: int, log_dir: Path) -> float:
+    logger_settings = get_settings().env.logger
+    logger_settings.sink_mode = mode
+    logger_settings.path = log_dir / f'{mode}.log'
+    app_logger = AppLogger.make()
+
+    start_time = perf_counter()
+    for _ in range(records):
+        app_logger.info(ACCESS_RECORD)
+    logger.complete()
+    logger.remove()
+    return records / (perf_counter() - start_time)
+
+
+def main(records: int) -> None:
+    stdout, stderr = sys.stdout, sys.stderr
+    with Path(os.devnull).open('w') as devnull, tempfile.TemporaryDirectory() as log_dir:
+        sys.stdout = sys.stderr = devnull
+        try:
+            results = {mode: _run(mode, records, Path(log_dir)) for mode in LogSinkMode}
+        finally:
+            sys.stdout, sys.stderr = stdout, stderr
+
+    for mode, records_per_second in results.items():
+        write_line(f'{mode:<8} {records_per_second:12.1f} records/s')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--records', type=int, default=50000)
+    args = parser.parse_args()
+    main(records=args.records)
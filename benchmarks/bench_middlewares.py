@@ -0,0 +1,45 @@
+"""Requests-per-second and p99 of the `init_middlewares` stack on `/debug/ping`,
+and of `/debug/health`, which the fast path dispatches in front of the stack.
+
+Usage: python -m benchmarks.bench_middlewares [--requests 20000] [--concurrency 50]
+"""
+
+import argparse
+import asyncio
+
+from fastapi import FastAPI
+from loguru import logger
+
+from benchmarks.utils import make_http_scope, run_asgi_load, write_line
+from src.settings import get_settings_snapshot
+from src.transport import rest
+
+
+def _make_app(*, with_middlewares: bool) -> FastAPI:
+    app = FastAPI()
+    if with_middlewares:
+        rest.init_middlewares(app=app, settings_snapshot=get_settings_snapshot())
+    rest.init_api_routes(app=app)
+    return app
+
+
+async def _main(requests: int, concurrency: int) -> None:
+    logger.remove()
+    for name, path, with_middlewares in (
+        ('routes only', '/debug/ping', False),
+        ('init_middlewares', '/debug/ping', True),
+        ('fast path /debug/health', '/debug/health', True),
+    ):
+        app = _make_app(with_middlewares=with_middlewares)
+        scope = make_http_scope(path)
+        await run_asgi_load(name, app, scope, requests=requests // 10, concurrency=concurrency)
+        result = await run_asgi_load(name, app, scope, requests=requests, concurrency=concurrency)
+        write_line(result.as_line())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(_main(requests=args.requests, concurrency=args.concurrency))
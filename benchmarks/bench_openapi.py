@@ -0,0 +1,74 @@
+"""Cost of serving `/openapi.json`: FastAPI's lazy schema vs the precomputed, pre-compressed document.
+
+The app gets `--routes` extra routes with request/response models so the schema has a realistic size.
+Reports the first hit (where FastAPI builds the schema), steady-state rps with gzip and a 304 revalidation.
+
+Usage: python -m benchmarks.bench_openapi [--routes 200] [--requests 2000] [--concurrency 20]
+"""
+
+import argparse
+import asyncio
+from time import perf_counter
+
+from fastapi import FastAPI
+from loguru import logger
+from pydantic import BaseModel
+
+from benchmarks.utils import call_asgi, make_http_scope, run_asgi_load, write_line
+from src.transport.rest.openapi import init_openapi, OpenAPIDocument
+from src.transport.rest.router import FastAPILoggingRouter
+
+OPENAPI_PATH = '/openapi.json'
+
+
+class _Item(BaseModel):
+    id: int
+    name: str
+    tags: list[str]
+    price: float | None = None
+
+
+def _make_app(routes: int, *, precomputed: bool) -> FastAPI:
+    app = FastAPI()
+    router = FastAPILoggingRouter(prefix='/bench')
+    for idx in range(routes):
+
+        async def handler(item: _Item) -> _Item:
+            return item
+
+        router.add_api_route(f'/items-{idx}/{{item_id}}', handler, methods=['POST'], response_model=_Item)
+    app.include_router(router)
+
+    if precomputed:
+        init_openapi(app, artifact_path=None)
+    return app
+
+
+async def _main(routes: int, requests: int, concurrency: int) -> None:
+    logger.remove()
+    gzip_scope = make_http_scope(OPENAPI_PATH, headers=[(b'accept-encoding', b'gzip, deflate, br')])
+
+    for name, precomputed in (('fastapi', False), ('precomputed', True)):
+        started = perf_counter()
+        app = _make_app(routes, precomputed=precomputed)
+        await call_asgi(app, make_http_scope(OPENAPI_PATH))
+        write_line(f'{name:<12} make_app + first hit {(perf_counter() - started) * 1000:8.1f}ms')
+
+        result = await run_asgi_load(f'{name} gzip', app, gzip_scope, requests=requests, concurrency=concurrency)
+        write_line(result.as_line())
+
+    document = OpenAPIDocument.from_schema(_make_app(routes, precomputed=False).openapi())
+    write_line(', '.join(f'{encoding}={len(body)}B' for encoding, body in document.bodies.items()))
+    revalidate_scope = make_http_scope(OPENAPI_PATH, headers=[(b'if-none-match', document.etag.encode())])
+    app = _make_app(routes, precomputed=True)
+    result = await run_asgi_load('precomputed 304', app, revalidate_scope, requests=requests, concurrency=concurrency)
+    write_line(result.as_line())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--routes', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(_main(routes=args.routes, requests=args.requests, concurrency=args.concurrency))
@@ -0,0 +1,72 @@
+"""Requests-per-second of an erroring route with Sentry reporting inline vs in the background worker.
+
+Events go to an in-memory transport, so only the SDK work on our side is measured.
+Deduplication is off so every request produces an event.
+
+Usage: python -m benchmarks.bench_sentry [--requests 5000] [--concurrency 20]
+"""
+
+import argparse
+import asyncio
+
+import sentry_sdk
+from fastapi import FastAPI
+from loguru import logger
+from sentry_sdk.envelope import Envelope
+from sentry_sdk.transport import Transport
+
+from benchmarks.utils import make_http_scope, run_asgi_load, write_line
+from src.settings import SentryReportingMode, get_settings_snapshot
+from src.transport import rest
+from src.transport.rest.middlewares import errors_handler_middleware
+from src.transport.rest.router import FastAPILoggingRouter
+from src.transport.rest.sentry_reporter import sentry_reporter
+
+ERROR_PATH = '/bench/error'
+
+
+class _NullTransport(Transport):
+    def capture_envelope(self, envelope: Envelope) -> None:
+        pass
+
+
+def _make_app() -> FastAPI:
+    app = FastAPI()
+    rest.init_middlewares(app=app, settings_snapshot=get_settings_snapshot())
+
+    router = FastAPILoggingRouter(prefix='/bench')
+
+    @router.get(path='/error')
+    async def get_error_handler():
+        raise RuntimeError('bench')
+
+    app.include_router(router)
+    return app
+
+
+async def _main(requests: int, concurrency: int) -> None:
+    logger.remove()
+    errors_handler_middleware.print_exc = lambda: None
+    sentry_sdk.init(dsn='http://key@localhost/1', transport=_NullTransport)
+
+    app = _make_app()
+    scope = make_http_scope(ERROR_PATH)
+    sentry_settings = get_settings_snapshot().current.env.sentry
+    for mode in (SentryReportingMode.INLINE, SentryReportingMode.BACKGROUND):
+        settings = sentry_settings.model_copy(update={'reporting_mode': mode, 'dedup_window': 0})
+        if mode == SentryReportingMode.BACKGROUND:
+            sentry_reporter.start(settings=settings)
+        get_settings_snapshot().current.env.sentry = settings
+
+        await run_asgi_load(mode, app, scope, requests=requests // 10, concurrency=concurrency)
+        result = await run_asgi_load(mode, app, scope, requests=requests, concurrency=concurrency)
+        write_line(result.as_line())
+    sentry_reporter.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(_main(requests=args.requests, concurrency=args.concurrency))
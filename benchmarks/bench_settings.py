@@ -0,0 +1,66 @@
+"""Cost of reading settings on the request path: `Settings()` vs the cached snapshot.
+
+Also reports requests-per-second of the full middleware stack on `/debug/ping` and on a
+route that raises, since both the trace id and the error path read settings per request.
+
+Usage: python -m benchmarks.bench_settings [--requests 10000] [--concurrency 20]
+"""
+
+import argparse
+import asyncio
+import timeit
+
+from fastapi import FastAPI
+from loguru import logger
+
+from benchmarks.utils import make_http_scope, run_asgi_load, write_line
+from src.settings import Settings, get_settings_snapshot
+from src.transport import rest
+from src.transport.rest.middlewares import errors_handler_middleware
+from src.transport.rest.router import FastAPILoggingRouter
+
+ERROR_PATH = '/bench/error'
+
+
+def _make_app() -> FastAPI:
+    app = FastAPI()
+    rest.init_middlewares(app=app, settings_snapshot=get_settings_snapshot())
+    rest.init_api_routes(app=app)
+
+    router = FastAPILoggingRouter(prefix='/bench')
+
+    @router.get(path='/error')
+    async def get_error_handler():
+        raise RuntimeError('bench')
+
+    app.include_router(router)
+    return app
+
+
+def _time_call(name: str, func: object, number: int) -> None:
+    per_call_us = timeit.timeit(func, number=number) / number * 1e6
+    write_line(f'{name:<24} {per_call_us:10.2f} us/call')
+
+
+async def _main(requests: int, concurrency: int) -> None:
+    logger.remove()
+    errors_handler_middleware.print_exc = lambda: None
+
+    snapshot = get_settings_snapshot()
+    _time_call('Settings()', Settings, number=2000)
+    _time_call('snapshot.current', lambda: snapshot.current, number=200000)
+
+    app = _make_app()
+    for path in ('/debug/ping', ERROR_PATH):
+        scope = make_http_scope(path)
+        await run_asgi_load(path, app, scope, requests=requests // 10, concurrency=concurrency)
+        result = await run_asgi_load(path, app, scope, requests=requests, concurrency=concurrency)
+        write_line(result.as_line())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=10000)
+    parser.add_argument('--concurrency', type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(_main(requests=args.requests, concurrency=args.concurrency))
@@ -0,0 +1,129 @@
+"""Cold start of the app: import of `src.bootstrap`, `make_app()`, lifespan startup and the first request.
+
+Every run is a fresh interpreter, so nothing is shared between runs. `--importtime` also prints the
+heaviest modules from `python -X importtime`. With `--max-seconds` the script exits with 1 when the
+median of import + make_app + first request is above the threshold, so it can gate CI.
+
+Usage: python -m benchmarks.bench_startup [--runs 5] [--max-seconds 1.5] [--importtime] [--top 25]
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+from statistics import median
+from time import perf_counter
+
+from orjson import orjson
+
+from benchmarks.utils import call_asgi, make_http_scope, write_line
+
+ROOT_PATH = Path(__file__).resolve().parent.parent
+FIRST_REQUEST_PATH = '/debug/ping'
+PHASES = ('import', 'make_app', 'lifespan', 'first_request', 'total')
+
+_IMPORTTIME_RE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def _child_env() -> dict[str, str]:
+    python_path = [str(ROOT_PATH), str(ROOT_PATH / 'src'), os.environ.get('PYTHONPATH', '')]
+    return {**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, python_path))}
+
+
+async def _cold_start() -> dict[str, float]:
+    started = perf_counter()
+    from src.bootstrap import make_app  # noqa: PLC0415
+
+    imported = perf_counter()
+    app = make_app()
+    made = perf_counter()
+    async with app.router.lifespan_context(app):
+        ready = perf_counter()
+        status_code = await call_asgi(app, make_http_scope(FIRST_REQUEST_PATH))
+        answered = perf_counter()
+    if status_code != 200:  # noqa: PLR2004
+        raise RuntimeError(f'{FIRST_REQUEST_PATH} answered {status_code}')
+
+    return {
+        'import': imported - started,
+        'make_app': made - imported,
+        'lifespan': ready - made,
+        'first_request': answered - ready,
+        'total': answered - started,
+    }
+
+
+def _run_child() -> dict[str, float]:
+    started = perf_counter()
+    completed = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.bench_startup', '--child'],
+        cwd=ROOT_PATH,
+        env=_child_env(),
+        capture_output=True,
+        check=True,
+    )
+    timings = orjson.loads(completed.stdout.splitlines()[-1])
+    timings['process'] = perf_counter() - started
+    return timings
+
+
+def _report_importtime(top: int) -> None:
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import src.bootstrap'],
+        cwd=ROOT_PATH,
+        env=_child_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules: list[tuple[int, int, str]] = []
+    packages: defaultdict[str, int] = defaultdict(int)
+    for line in completed.stderr.splitlines():
+        if (match := _IMPORTTIME_RE.match(line)) is None:
+            continue
+        self_us, cumulative_us, name = int(match.group(1)), int(match.group(2)), match.group(4)
+        modules.append((cumulative_us, self_us, name))
+        packages[name.partition('.')[0]] += self_us
+
+    write_line(f'top {top} modules by cumulative import time')
+    for cumulative_us, self_us, name in sorted(modules, reverse=True)[:top]:
+        write_line(f'  {name:<56} cumulative={cumulative_us / 1000:8.1f}ms self={self_us / 1000:7.1f}ms')
+    write_line(f'top {top} packages by own import time')
+    for name, self_us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+        write_line(f'  {name:<56} {self_us / 1000:8.1f}ms')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-seconds', type=float, default=None)
+    parser.add_argument('--importtime', action='store_true')
+    parser.add_argument('--top', type=int, default=25)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        timings = asyncio.run(_cold_start())
+        sys.stdout.buffer.write(orjson.dumps(timings, option=orjson.OPT_APPEND_NEWLINE))
+        return
+
+    if args.importtime:
+        _report_importtime(args.top)
+
+    runs = [_run_child() for _ in range(args.runs)]
+    for phase in (*PHASES, 'process'):
+        values = [run[phase] for run in runs]
+        write_line(f'{phase:<16} median={median(values) * 1000:8.1f}ms max={max(values) * 1000:8.1f}ms')
+
+    total = median(run['total'] for run in runs)
+    if args.max_seconds is not None and total > args.max_seconds:
+        write_line(f'FAIL: cold start {total:.3f}s is above --max-seconds {args.max_seconds:.3f}s')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Records-per-second of the stdlib -> loguru bridge with SQLAlchemy echo enabled.
+
+Compares `InnerAppLogsHandler` with the handler it replaced (kept below for reference),
+both feeding one loguru sink that discards the formatted line. The second pass raises the
+sink level to WARNING, so every echo record is filtered out and queries/s is reported instead.
+
+Usage: python -m benchmarks.bench_std_logging [--queries 5000]
+"""
+
+import argparse
+import logging
+import sys
+from time import perf_counter
+
+from loguru import logger
+from sqlalchemy import create_engine, text
+
+from benchmarks.utils import ROOT_PATH, write_line
+
+# the bridge lives in src/logger.py and is imported as a top-level module, as under src/main.py
+sys.path.append(str(ROOT_PATH / 'src'))
+
+from logger import InnerAppLogsHandler, LOGLEVEL_MAPPING  # noqa: E402
+
+SQLALCHEMY_ENGINE_LOGGER = 'sqlalchemy.engine.Engine'
+
+
+class PreviousInnerAppLogsHandler(logging.Handler):
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            level = logger.level(record.levelname).name
+        except AttributeError:
+            level = LOGLEVEL_MAPPING[record.levelno]
+
+        frame, depth = logging.currentframe(), 2
+        while frame and frame.f_code.co_filename == logging.__file__:
+            frame = frame.f_back
+            depth += 1
+
+        log = logger.bind(
+            request_id='app',
+            method=record.funcName,
+            file=record.filename,
+            name=record.name,
+        )
+        log.opt(depth=depth, exception=record.exc_info).log(
+            level,
+            record.getMessage(),
+        )
+
+
+def _run(handler: logging.Handler, queries: int, level: str) -> tuple[float, float]:
+    records = 0
+
+    def count(_message: str) -> None:
+        nonlocal records
+        records += 1
+
+    logger.remove()
+    logger.add(count, level=level, format='{name}:{function}:{line} {extra[name]} {message}')
+    logging.getLogger(SQLALCHEMY_ENGINE_LOGGER).handlers = [handler]
+
+    engine = create_engine('sqlite://', echo=True)
+    with engine.connect() as connection:
+        start_time = perf_counter()
+        for idx in range(queries):
+            connection.execute(text('SELECT :value'), {'value': idx})
+        elapsed = perf_counter() - start_time
+    engine.dispose()
+    return records / elapsed, queries / elapsed
+
+
+def main(queries: int) -> None:
+    for level in ('INFO', 'WARNING'):
+        for name, handler in (
+            ('previous handler', PreviousInnerAppLogsHandler()),
+            ('InnerAppLogsHandler', InnerAppLogsHandler(level=level)),
+        ):
+            _run(handler, queries // 10, level)
+            records_per_second, queries_per_second = _run(handler, queries, level)
+            write_line(
+                f'{level:<8} {name:<20} {records_per_second:10.1f} records/s {queries_per_second:10.1f} queries/s'
+            )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--queries', type=int, default=5000)
+    args = parser.parse_args()
+    main(queries=args.queries)
@@ -0,0 +1,29 @@
+"""Requests-per-second of `src/main.py` on loopback with 1 vs N uvicorn workers.
+
+Usage: python -m benchmarks.bench_workers [--workers 1 4 16] [--requests 20000] [--concurrency 200]
+"""
+
+import argparse
+import asyncio
+import os
+
+from benchmarks.utils import BenchmarkResult, run_http_load, serve, write_line
+
+
+def _run(workers: int, port: int, requests: int, concurrency: int) -> BenchmarkResult:
+    with serve(port, workers) as base_url:
+        return asyncio.run(
+            run_http_load(f'workers={workers}', f'{base_url}/debug/ping', requests=requests, concurrency=concurrency)
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1])
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    for workers_count in args.workers:
+        write_line(_run(workers_count, args.port, args.requests, args.concurrency).as_line())
@@ -0,0 +1,247 @@
+"""Benchmark suite with machine-readable results and a regression gate.
+
+Runs entirely on this machine against `make_app()`:
+- every middleware `init_middlewares` installs, alone in front of a bare ASGI app;
+- the logging route class next to a plain APIRouter route;
+- the whole app in-process on `/debug/ping` and the fast-path `/debug/health`;
+- with `--e2e`, `src/main.py` under uvicorn on loopback.
+
+Every in-process scenario reports rps and p50/p95/p99 under load (best of `--repeat` runs), plus the
+peak traced memory of one request and the blocks it leaves allocated (tracemalloc, sequential pass).
+
+Usage:
+    python -m benchmarks.suite --output build/bench.json
+    python -m benchmarks.suite --compare build/bench.json [--tolerance 0.15]
+
+With `--compare` it exits 1 when a scenario lost more than `tolerance` of its rps, got slower than
+`tolerance` at p95 or retains more blocks per request than the baseline.
+"""
+
+import argparse
+import asyncio
+import platform
+import sys
+from collections.abc import Callable
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from fastapi import APIRouter, FastAPI
+from loguru import logger
+from orjson import orjson
+from pydantic import BaseModel
+
+from benchmarks.utils import (
+    ASGIApp,
+    BenchmarkResult,
+    make_http_scope,
+    measure_allocations,
+    ROOT_PATH,
+    run_asgi_load,
+    run_http_load,
+    serve,
+    write_line,
+)
+
+# src.bootstrap imports its siblings as top-level modules (`from logger import ...`), as under src/main.py
+sys.path.append(str(ROOT_PATH / 'src'))
+
+from src.bootstrap import make_app  # noqa: E402
+from src.transport.rest.router import FastAPILoggingRouter  # noqa: E402
+
+# rps/latency deltas are relative, these absolute slacks keep microsecond-scale scenarios from flapping;
+# retained blocks per request are close to 0 and jump on a leak
+LATENCY_SLACK_MS = 0.005
+RETAINED_BLOCKS_SLACK = 1.0
+
+_OK_BODY = b'{"ok":true}'
+_ITEM = {'id': 1, 'name': 'item', 'tags': ['alpha', 'beta'], 'price': 1.25}
+
+
+class _Item(BaseModel):
+    id: int
+    name: str
+    tags: list[str]
+    price: float
+
+
+async def _bare_app(_scope: dict[str, Any], _receive: Callable, send: Callable) -> None:
+    await send(
+        {
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(_OK_BODY)).encode())],
+        }
+    )
+    await send({'type': 'http.response.body', 'body': _OK_BODY})
+
+
+def _routes_app(router: APIRouter) -> FastAPI:
+    @router.get(path='/item')
+    async def get_item_handler() -> _Item:
+        return _Item(**_ITEM)
+
+    @router.post(path='/item')
+    async def post_item_handler(item: _Item) -> _Item:
+        return item
+
+    app = FastAPI()
+    app.include_router(router)
+    return app
+
+
+def _scenarios() -> list[tuple[str, ASGIApp, dict[str, Any], bytes]]:
+    app = make_app()
+    scenarios: list[tuple[str, ASGIApp, dict[str, Any], bytes]] = [
+        ('bare asgi', _bare_app, make_http_scope('/'), b''),
+    ]
+    for middleware in app.user_middleware:
+        scenarios.append(
+            (
+                f'middleware {middleware.cls.__name__}',
+                middleware.cls(_bare_app, *middleware.args, **middleware.kwargs),
+                make_http_scope('/', headers=[(b'accept-encoding', b'gzip'), (b'origin', b'http://bench')]),
+                b'',
+            )
+        )
+
+    body = orjson.dumps(_ITEM)
+    json_headers = [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+    for name, router in (('route APIRouter', APIRouter()), ('route FastAPILoggingRouter', FastAPILoggingRouter())):
+        routes_app = _routes_app(router)
+        scenarios.append((f'{name} GET', routes_app, make_http_scope('/item'), b''))
+        scenarios.append(
+            (f'{name} POST', routes_app, make_http_scope('/item', method='POST', headers=json_headers), body)
+        )
+
+    scenarios.append(('make_app /debug/ping', app, make_http_scope('/debug/ping'), b''))
+    scenarios.append(('make_app /debug/health', app, make_http_scope('/debug/health'), b''))
+    return scenarios
+
+
+async def _run_in_process(
+    name_filter: str | None,
+    *,
+    requests: int,
+    concurrency: int,
+    alloc_requests: int,
+    repeat: int,
+    min_seconds: float,
+) -> list[BenchmarkResult]:
+    scenarios = _scenarios()
+    # make_app() configures its own sinks
+    logger.remove()
+    results = []
+    for name, app, scope, body in scenarios:
+        if name_filter and name_filter not in name:
+            continue
+        warmup = await run_asgi_load(name, app, scope, requests=requests // 10, concurrency=concurrency, body=body)
+        # a few thousand requests of a microsecond middleware are over before the timer noise is
+        run_requests = max(requests, int(warmup.rps * min_seconds))
+        result = _best(
+            [
+                await run_asgi_load(name, app, scope, requests=run_requests, concurrency=concurrency, body=body)
+                for _ in range(repeat)
+            ]
+        )
+        result.peak_kib_per_request, result.retained_blocks_per_request = await measure_allocations(
+            app, scope, requests=alloc_requests, body=body
+        )
+        write_line(result.as_line())
+        results.append(result)
+    return results
+
+
+# best of the repeats: noise on a shared machine only ever makes a run slower
+def _best(results: list[BenchmarkResult]) -> BenchmarkResult:
+    best = max(results, key=lambda result: result.rps)
+    best.p50_ms = min(result.p50_ms for result in results)
+    best.p95_ms = min(result.p95_ms for result in results)
+    best.p99_ms = min(result.p99_ms for result in results)
+    return best
+
+
+def _run_e2e(port: int, requests: int, concurrency: int) -> BenchmarkResult:
+    with serve(port) as base_url:
+        result = asyncio.run(
+            run_http_load('uvicorn /debug/ping', f'{base_url}/debug/ping', requests=requests, concurrency=concurrency)
+        )
+    write_line(result.as_line())
+    return result
+
+
+def _regressions(result: dict[str, Any], baseline: dict[str, Any], tolerance: float) -> list[str]:
+    regressions = []
+    if result['rps'] < baseline['rps'] * (1 - tolerance):
+        regressions.append(f'rps {baseline["rps"]:.1f} -> {result["rps"]:.1f}')
+    if result['p95_ms'] > baseline['p95_ms'] * (1 + tolerance) + LATENCY_SLACK_MS:
+        regressions.append(f'p95 {baseline["p95_ms"]:.3f}ms -> {result["p95_ms"]:.3f}ms')
+    retained, baseline_retained = result['retained_blocks_per_request'], baseline['retained_blocks_per_request']
+    if retained is not None and baseline_retained is not None and retained > baseline_retained + RETAINED_BLOCKS_SLACK:
+        regressions.append(f'retained blocks {baseline_retained:.1f} -> {retained:.1f}')
+    return regressions
+
+
+def _compare(results: list[BenchmarkResult], baseline_path: Path, tolerance: float) -> bool:
+    baseline = {result['name']: result for result in orjson.loads(baseline_path.read_bytes())['results']}
+    is_ok = True
+    for result in results:
+        if (baseline_result := baseline.get(result.name)) is None:
+            write_line(f'{result.name:<32} new, no baseline')
+            continue
+        change = result.rps / baseline_result['rps'] - 1
+        if regressions := _regressions(result.as_dict(), baseline_result, tolerance):
+            is_ok = False
+            write_line(f'{result.name:<32} REGRESSION {", ".join(regressions)}')
+        else:
+            write_line(f'{result.name:<32} ok rps {change:+.1%}')
+    return is_ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=3, help='keep the best of this many runs per scenario')
+    parser.add_argument('--min-seconds', type=float, default=0.5, help='raise --requests so a run lasts this long')
+    parser.add_argument('--alloc-requests', type=int, default=200)
+    parser.add_argument('--filter', help='run only scenarios whose name contains this')
+    parser.add_argument('--e2e', action='store_true', help='also load src/main.py under uvicorn on loopback')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--output', type=Path)
+    parser.add_argument('--compare', type=Path, help='baseline written by --output')
+    parser.add_argument('--tolerance', type=float, default=0.15)
+    args = parser.parse_args()
+
+    results = asyncio.run(
+        _run_in_process(
+            args.filter,
+            requests=args.requests,
+            concurrency=args.concurrency,
+            alloc_requests=args.alloc_requests,
+            repeat=args.repeat,
+            min_seconds=args.min_seconds,
+        )
+    )
+    if args.e2e:
+        results.append(_run_e2e(args.port, args.requests, args.concurrency))
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_bytes(
+            orjson.dumps(
+                {
+                    'created_at': datetime.now(UTC).isoformat(),
+                    'python': sys.version,
+                    'platform': platform.platform(),
+                    'results': [result.as_dict() for result in results],
+                },
+                option=orjson.OPT_INDENT_2,
+            )
+        )
+    if args.compare and not _compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import tracemalloc
+from collections.abc import Awaitable, Callable, Iterator, MutableMapping
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from statistics import quantiles
+from time import perf_counter
+from typing import Any
+
+import httpx
+
+ROOT_PATH = Path(__file__).resolve().parent.parent
+
+ASGIApp = Callable[
+    [MutableMapping[str, Any], Callable[[], Awaitable[dict]], Callable[[dict], Awaitable[None]]],
+    Awaitable[None],
+]
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    requests: int
+    rps: float
+    p50_ms: float
+    p99_ms: float
+    p95_ms: float | None = None
+    # peak traced memory of one request and blocks still allocated after it, see measure_allocations
+    peak_kib_per_request: float | None = None
+    retained_blocks_per_request: float | None = None
+
+    @classmethod
+    def from_latencies(cls, name: str, latencies: list[float], elapsed: float) -> 'BenchmarkResult':
+        percentiles = quantiles(latencies, n=100)
+        return cls(
+            name=name,
+            requests=len(latencies),
+            rps=len(latencies) / elapsed,
+            p50_ms=percentiles[49] * 1000,
+            p95_ms=percentiles[94] * 1000,
+            p99_ms=percentiles[98] * 1000,
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+    def as_line(self) -> str:
+        line = (
+            f'{self.name:<32} requests={self.requests:<7} rps={self.rps:>10.1f} '
+            f'p50={self.p50_ms:>7.3f}ms p99={self.p99_ms:>7.3f}ms'
+        )
+        if self.peak_kib_per_request is not None:
+            line += f' peak={self.peak_kib_per_request:>7.1f}KiB retained={self.retained_blocks_per_request:>6.1f}'
+        return line
+
+
+def make_http_scope(
+    path: str,
+    method: str = 'GET',
+    headers: list[tuple[bytes, bytes]] | None = None,
+    query_string: bytes = b'',
+) -> dict[str, Any]:
+    return {
+        'type': 'http',
+        'asgi': {'version': '3.0', 'spec_version': '2.3'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'root_path': '',
+        'query_string': query_string,
+        'headers': [(b'host', b'bench'), *(headers or [])],
+        'client': ('127.0.0.1', 50000),
+        'server': ('127.0.0.1', 8000),
+        'state': {},
+    }
+
+
+async def call_asgi(app: ASGIApp, scope: dict[str, Any], body: bytes = b'') -> int:
+    status_code = 0
+    request_sent = False
+
+    async def receive() -> dict:
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        await asyncio.Event().wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message: dict) -> None:
+        nonlocal status_code
+        if message['type'] == 'http.response.start':
+            status_code = message['status']
+
+    await app(dict(scope), receive, send)
+    return status_code
+
+
+async def run_asgi_load(
+    name: str,
+    app: ASGIApp,
+    scope: dict[str, Any],
+    *,
+    requests: int,
+    concurrency: int,
+    body: bytes = b'',
+) -> BenchmarkResult:
+    latencies: list[float] = []
+    counter = iter(range(requests))
+
+    async def worker() -> None:
+        for _ in counter:
+            started = perf_counter()
+            await call_asgi(app, scope, body)
+            latencies.append(perf_counter() - started)
+
+    started = perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return BenchmarkResult.from_latencies(name, latencies, perf_counter() - started)
+
+
+# Sequential on purpose: the peak of one request, not of `concurrency` of them. Blocks still allocated
+# after `requests` calls point at caches filling up or at leaks.
+async def measure_allocations(
+    app: ASGIApp,
+    scope: dict[str, Any],
+    *,
+    requests: int,
+    body: bytes = b'',
+) -> tuple[float, float]:
+    await call_asgi(app, scope, body)
+    tracemalloc.start()
+    try:
+        peak_bytes = 0
+        blocks_before = sys.getallocatedblocks()
+        for _ in range(requests):
+            tracemalloc.reset_peak()
+            current_bytes = tracemalloc.get_traced_memory()[0]
+            await call_asgi(app, scope, body)
+            peak_bytes = max(peak_bytes, tracemalloc.get_traced_memory()[1] - current_bytes)
+            # a server loop runs an iteration between requests, that is where cancelled timers are dropped
+            await asyncio.sleep(0)
+        retained_blocks = sys.getallocatedblocks() - blocks_before
+    finally:
+        tracemalloc.stop()
+    return peak_bytes / 1024, retained_blocks / requests
+
+
+# `src/main.py` as it runs in production; yields the base url once the process is started, not once it is ready
+@contextmanager
+def serve(port: int, workers: int = 1, **env: str) -> Iterator[str]:
+    server = subprocess.Popen(  # noqa: S603
+        [sys.executable, str(ROOT_PATH.joinpath('src', 'main.py'))],
+        env={
+            **os.environ,
+            'REST_HOST': '127.0.0.1',
+            'REST_PORT': str(port),
+            'REST_WORKERS': str(workers),
+            'LOGGER_LEVEL': 'warning',
+            **env,
+        },
+        cwd=ROOT_PATH,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        yield f'http://127.0.0.1:{port}'
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+
+async def wait_until_ready(client: httpx.AsyncClient, url: str, wait_seconds: float = 30.0) -> None:
+    deadline = perf_counter() + wait_seconds
+    while perf_counter() < deadline:
+        try:
+            await client.get(url)
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+        else:
+            return
+    raise TimeoutError(url)
+
+
+async def run_http_load(name: str, url: str, *, requests: int, concurrency: int) -> BenchmarkResult:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        await wait_until_ready(client, url)
+        latencies: list[float] = []
+        counter = iter(range(requests))
+
+        async def worker() -> None:
+            for _ in counter:
+                started = perf_counter()
+                await client.get(url)
+                latencies.append(perf_counter() - started)
+
+        started = perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return BenchmarkResult.from_latencies(name, latencies, perf_counter() - started)
+
+
+def write_line(line: str) -> None:
+    sys.stdout.write(line + '\n')
@@ -1,6 +1,14 @@
-IS_SENTRY_INSTALLED = True
+import sys
+from importlib.util import find_spec
+from types import ModuleType
 
-try:
-    import sentry_sdk
-except ImportError:
-    IS_SENTRY_INSTALLED = False
+IS_SENTRY_INSTALLED = find_spec('sentry_sdk') is not None
+
+
+# sentry_sdk takes ~100 ms to import, so the app never imports it itself: whoever calls sentry_sdk.init()
+# has imported it already, and until then there is no client to report to.
+def get_active_sentry() -> ModuleType | None:
+    sentry_sdk = sys.modules.get('sentry_sdk')
+    if sentry_sdk is None or not sentry_sdk.get_client().is_active():
+        return None
+    return sentry_sdk
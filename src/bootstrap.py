@@ -1,25 +1,102 @@
+import asyncio
+import signal
 from collections.abc import AsyncGenerator
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 from functools import lru_cache
 
 from fastapi import FastAPI
+from loguru import logger
 
 from logger import AppLogger
-from src.settings import Environment, get_settings
+from src import IS_SENTRY_INSTALLED
+from src.database.client import SQLAlchemyClient
+from src.integrations.http_client import ExternalHTTPClient
+from src.metrics.loop import loop_monitor
+from src.settings import (
+    AccessLogMode,
+    Environment,
+    SentryReportingMode,
+    SettingsSnapshot,
+    get_settings,
+    get_settings_snapshot,
+)
+from src.tracing.exporters import make_span_exporter, span_exporter
 from src.transport import rest
+from src.transport.rest.cache import ResponseCache
+from src.transport.rest.middlewares.access_log_queue import access_log_queue
+from src.transport.rest.sentry_reporter import sentry_reporter
 from src.utils import get_project_info
 
 
+def _reload_settings(settings_snapshot: SettingsSnapshot) -> None:
+    try:
+        settings_snapshot.reload()
+    except Exception:  # noqa: BLE001
+        logger.exception('Settings reload failed, keeping the previous snapshot')
+    else:
+        logger.info('Settings reloaded')
+
+
 @asynccontextmanager
 async def _lifespan(
-    app: FastAPI,  # noqa
+    app: FastAPI,
 ) -> AsyncGenerator[None]:
+    settings = get_settings()
+
+    app.state.db_client = SQLAlchemyClient(
+        dsn=settings.env.postgres_dsn.unicode_string(),
+        settings=settings.env.database,
+    )
+
+    app.state.http_client = ExternalHTTPClient(
+        settings=settings.env.http_client,
+        trace_id_header=settings.trace_id_header,
+    )
+
+    app.state.response_cache = None
+    if settings.env.cache.enabled:
+        app.state.response_cache = ResponseCache.from_settings(
+            settings=settings.env.cache,
+            redis_dsn=settings.env.redis_dsn.unicode_string(),
+        )
+
+    if settings.env.logger.access_log_mode == AccessLogMode.QUEUED:
+        access_log_queue.start(
+            maxsize=settings.env.logger.access_log_queue_size,
+            policy=settings.env.logger.access_log_queue_policy,
+        )
+
+    if IS_SENTRY_INSTALLED and settings.env.sentry.reporting_mode == SentryReportingMode.BACKGROUND:
+        sentry_reporter.start(settings=settings.env.sentry)
+
+    if settings.env.tracing.enabled and (exporter := make_span_exporter(settings.env.tracing)) is not None:
+        span_exporter.start(settings=settings.env.tracing, exporter=exporter)
+
+    if settings.env.loop_monitor.enabled:
+        loop_monitor.start(settings=settings.env.loop_monitor)
+
+    loop = asyncio.get_running_loop()
+    with suppress(ValueError, NotImplementedError, RuntimeError):
+        loop.add_signal_handler(signal.SIGHUP, _reload_settings, app.state.settings_snapshot)
+
     yield
 
+    with suppress(ValueError, NotImplementedError, RuntimeError):
+        loop.remove_signal_handler(signal.SIGHUP)
+    await loop_monitor.stop()
+    await asyncio.to_thread(access_log_queue.stop)
+    await asyncio.to_thread(sentry_reporter.stop)
+    await asyncio.to_thread(span_exporter.stop)
+    await app.state.db_client.close()
+    await app.state.http_client.close()
+    if app.state.response_cache is not None:
+        await app.state.response_cache.close()
+
 
 @lru_cache
 def make_app() -> FastAPI:
-    settings = get_settings()
+    settings_snapshot = get_settings_snapshot()
+    settings = settings_snapshot.current
 
     app = FastAPI(
         title=get_project_info().title,
@@ -32,7 +109,8 @@ def make_app() -> FastAPI:
         redoc_url=None,
     )
 
-    rest.init_middlewares(app=app, settings=settings)
+    rest.init_middlewares(app=app, settings_snapshot=settings_snapshot)
     rest.init_api_routes(app=app)
+    rest.init_openapi(app=app, artifact_path=settings.env.rest.openapi_artifact_path)
 
     return app
@@ -0,0 +1,41 @@
+from collections import OrderedDict
+from time import monotonic
+
+
+class LRUCache[T]:
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, T]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> T | None:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at <= monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: T, ttl: float) -> None:
+        if self.max_entries <= 0 or ttl <= 0:
+            return
+        self._entries[key] = (monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    # least recently used first, expired entries are skipped but not evicted
+    def values(self) -> list[T]:
+        now = monotonic()
+        return [value for expires_at, value in self._entries.values() if expires_at > now]
+
+    def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
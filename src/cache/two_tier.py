@@ -0,0 +1,66 @@
+from collections.abc import Callable
+
+from loguru import logger
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from src.cache.lru import LRUCache
+
+
+class TwoTierCache[T]:
+    def __init__(
+        self,
+        local: LRUCache[T],
+        redis: Redis | None,
+        key_prefix: str,
+        encode: Callable[[T], bytes],
+        decode: Callable[[bytes], T],
+    ) -> None:
+        self.local = local
+        self.redis = redis
+        self.key_prefix = key_prefix
+        self._encode = encode
+        self._decode = decode
+
+    def _redis_key(self, key: str) -> str:
+        return f'{self.key_prefix}:{key}'
+
+    async def get(self, key: str) -> T | None:
+        if (value := self.local.get(key)) is not None:
+            return value
+        if self.redis is None:
+            return None
+
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                raw_value, ttl_ms = await pipe.get(self._redis_key(key)).pttl(self._redis_key(key)).execute()
+        except RedisError as exc:
+            logger.warning('Cache get failed for {}: {!r}', key, exc)
+            return None
+
+        if raw_value is None:
+            return None
+        value = self._decode(raw_value)
+        if ttl_ms and ttl_ms > 0:
+            self.local.set(key, value, ttl_ms / 1000)
+        return value
+
+    async def set(self, key: str, value: T, ttl: float) -> None:
+        self.local.set(key, value, ttl)
+        if self.redis is None:
+            return
+
+        try:
+            await self.redis.set(self._redis_key(key), self._encode(value), px=int(ttl * 1000))
+        except RedisError as exc:
+            logger.warning('Cache set failed for {}: {!r}', key, exc)
+
+    async def delete(self, key: str) -> None:
+        self.local.delete(key)
+        if self.redis is None:
+            return
+
+        try:
+            await self.redis.delete(self._redis_key(key))
+        except RedisError as exc:
+            logger.warning('Cache delete failed for {}: {!r}', key, exc)
@@ -0,0 +1,118 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from time import perf_counter
+
+from sqlalchemy import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool
+
+from src.settings import DatabaseSettings
+
+
+@dataclass
+class PoolWaitStats:
+    acquisitions: int = 0
+    timeouts: int = 0
+    wait_time_total: float = 0.0
+    wait_time_max: float = 0.0
+
+
+class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    wait_stats: PoolWaitStats
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def _do_get(self):  # noqa: ANN202
+        started = perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.wait_stats.timeouts += 1
+            raise
+        finally:
+            wait_time = perf_counter() - started
+            self.wait_stats.acquisitions += 1
+            self.wait_stats.wait_time_total += wait_time
+            self.wait_stats.wait_time_max = max(self.wait_stats.wait_time_max, wait_time)
+
+    def recreate(self) -> Pool:
+        pool = super().recreate()
+        pool.wait_stats = self.wait_stats
+        return pool
+
+
+@dataclass
+class PoolStats:
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    acquisitions: int
+    timeouts: int
+    wait_time_total: float
+    wait_time_avg: float
+    wait_time_max: float
+
+
+class SQLAlchemyClient:
+    engine: AsyncEngine
+    session_factory: async_sessionmaker[AsyncSession]
+
+    def __init__(
+        self,
+        dsn: str,
+        settings: DatabaseSettings,
+    ) -> None:
+        url = make_url(dsn)
+        engine_kwargs = {
+            'echo': settings.echo,
+            'pool_pre_ping': settings.pool_pre_ping,
+        }
+
+        if issubclass(url.get_dialect().get_pool_class(url), AsyncAdaptedQueuePool):
+            engine_kwargs.update(
+                poolclass=InstrumentedAsyncAdaptedQueuePool,
+                pool_size=settings.pool_size,
+                max_overflow=settings.max_overflow,
+                pool_timeout=settings.pool_timeout,
+                pool_recycle=settings.pool_recycle,
+            )
+
+        if url.get_driver_name() == 'asyncpg':
+            engine_kwargs['connect_args'] = {'statement_cache_size': settings.statement_cache_size}
+
+        self.engine = create_async_engine(url, **engine_kwargs)
+        self.session_factory = async_sessionmaker(self.engine, expire_on_commit=False)
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[AsyncSession]:
+        async with self.session_factory() as session:
+            try:
+                yield session
+            except Exception:
+                await session.rollback()
+                raise
+
+    def pool_stats(self) -> PoolStats:
+        pool = self.engine.pool
+        wait_stats = getattr(pool, 'wait_stats', None) or PoolWaitStats()
+        is_queue_pool = isinstance(pool, AsyncAdaptedQueuePool)
+        return PoolStats(
+            size=pool.size() if is_queue_pool else 1,
+            checked_in=pool.checkedin() if is_queue_pool else 0,
+            checked_out=pool.checkedout() if is_queue_pool else 0,
+            # SQLAlchemy's overflow() counts up from -pool_size, only connections past pool_size are reported
+            overflow=max(pool.overflow(), 0) if is_queue_pool else 0,
+            acquisitions=wait_stats.acquisitions,
+            timeouts=wait_stats.timeouts,
+            wait_time_total=wait_stats.wait_time_total,
+            wait_time_avg=wait_stats.wait_time_total / wait_stats.acquisitions if wait_stats.acquisitions else 0.0,
+            wait_time_max=wait_stats.wait_time_max,
+        )
+
+    async def close(self) -> None:
+        await self.engine.dispose()
@@ -0,0 +1,389 @@
+import asyncio
+import random
+from collections.abc import AsyncIterator, Callable
+from dataclasses import dataclass
+from enum import StrEnum
+from importlib.util import find_spec
+from math import ceil
+from time import monotonic, time
+from typing import Any
+
+import httpx
+from loguru import logger
+
+from src.metrics.loop import loop_monitor
+from src.settings import HTTPClientSettings
+from src.tracing.spans import get_propagation_headers, SpanKind, start_span
+from src.transport.rest.content_negotiation import normalize_media_type
+from src.transport.rest.errors import CircuitOpenError, ExternalServiceError, RequestTimeoutError, ServerError
+from src.transport.rest.middlewares.access_log_queue import access_log_queue, AccessLogSnapshot, log_access_record
+from src.transport.rest.middlewares.body_capture import BodyCapture
+from src.utils import remaining_budget, TRACE_ID
+
+IS_H2_INSTALLED = find_spec('h2') is not None
+
+IDEMPOTENT_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE', 'TRACE'))
+# the request never reached the host, retrying it cannot apply it twice
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+_REDACTED = b'***'
+
+
+def _origin(url: httpx.URL) -> str:
+    return f'{url.scheme}://{url.host}:{url.port or (443 if url.scheme == "https" else 80)}'
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]) -> None:
+        self._stream = stream
+        self._release: Callable[[], None] | None = release
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if (release := self._release) is not None:
+                self._release = None
+                release()
+
+
+# httpx only limits the pool as a whole, so one slow host could take every connection. A request holds
+# its host's slot until the response is closed, waiting for one counts against the pool timeout.
+class HostLimitedTransport(httpx.AsyncBaseTransport):
+    def __init__(self, transport: httpx.AsyncBaseTransport, max_connections_per_host: int) -> None:
+        self._transport = transport
+        self.max_connections_per_host = max_connections_per_host
+        self._slots: dict[str, asyncio.Semaphore] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        origin = _origin(request.url)
+        if (slots := self._slots.get(origin)) is None:
+            slots = self._slots[origin] = asyncio.Semaphore(self.max_connections_per_host)
+        if slots.locked():
+            try:
+                async with asyncio.timeout(request.extensions.get('timeout', {}).get('pool')):
+                    await slots.acquire()
+            except TimeoutError as exc:
+                raise httpx.PoolTimeout(f'No free connection to {origin}', request=request) from exc
+        else:
+            await slots.acquire()
+
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            slots.release()
+            raise
+        # a response built with its body is closed already and never streams it
+        if response.is_closed:
+            slots.release()
+        else:
+            response.stream = _ReleasingStream(response.stream, slots.release)
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+    def in_use(self) -> dict[str, int]:
+        return {
+            origin: self.max_connections_per_host - slots._value  # noqa: SLF001
+            for origin, slots in self._slots.items()
+            if slots._value < self.max_connections_per_host  # noqa: SLF001
+        }
+
+
+class CircuitState(StrEnum):
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+
+# Opens after `failure_threshold` failures in a row and rejects calls for `reset_timeout` seconds, then lets
+# a single probe through: its success closes the circuit, its failure opens it again.
+class CircuitBreaker:
+    __slots__ = ('_is_probing', 'failure_threshold', 'failures', 'opened_at', 'reset_timeout', 'state')
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._is_probing = False
+
+    def allow(self) -> bool:
+        if self.state == CircuitState.CLOSED:
+            return True
+        if self.state == CircuitState.OPEN:
+            if monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = CircuitState.HALF_OPEN
+        if self._is_probing:
+            return False
+        self._is_probing = True
+        return True
+
+    def retry_after(self) -> float:
+        return max(self.opened_at + self.reset_timeout - monotonic(), 0.0)
+
+    def on_success(self) -> None:
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self._is_probing = False
+
+    def on_failure(self) -> None:
+        self.failures += 1
+        self._is_probing = False
+        if self.state == CircuitState.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = CircuitState.OPEN
+            self.opened_at = monotonic()
+
+    # the call ended without telling anything about the host: cancelled, or the local pool was full
+    def on_abort(self) -> None:
+        self._is_probing = False
+
+
+@dataclass
+class HTTPClientStats:
+    requests: int = 0
+    attempts: int = 0
+    retries: int = 0
+    failed: int = 0
+    rejected: int = 0
+
+
+# The outbound client shared by the integrations, created once per worker in the lifespan. Every attempt is
+# logged as an 'external' access log record with the request's TRACE_ID, which is also sent along with
+# traceparent. Idempotent requests are retried with jittered exponential backoff within the request's
+# deadline, and each host has its own circuit breaker.
+class ExternalHTTPClient:
+    def __init__(
+        self,
+        settings: HTTPClientSettings,
+        trace_id_header: str,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        self.settings = settings
+        self.trace_id_header = trace_id_header
+        self.stats = HTTPClientStats()
+        self.breakers: dict[str, CircuitBreaker] = {}
+
+        if settings.http2 and not IS_H2_INSTALLED:
+            logger.warning('HTTP/2 needs the h2 package, the outbound client stays on HTTP/1.1')
+        if transport is None:
+            transport = httpx.AsyncHTTPTransport(
+                limits=httpx.Limits(
+                    max_connections=settings.max_connections,
+                    max_keepalive_connections=settings.max_keepalive_connections,
+                    keepalive_expiry=settings.keepalive_expiry,
+                ),
+                http2=settings.http2 and IS_H2_INSTALLED,
+            )
+        self.transport = HostLimitedTransport(transport, settings.max_connections_per_host)
+        self._client = httpx.AsyncClient(
+            transport=self.transport,
+            timeout=httpx.Timeout(settings.timeout, connect=settings.connect_timeout, pool=settings.pool_timeout),
+        )
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+    async def request(
+        self,
+        method: str,
+        url: httpx.URL | str,
+        *,
+        retries: int | None = None,
+        is_idempotent: bool | None = None,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        request = self._client.build_request(method, url, **kwargs)
+        if (trace_id := TRACE_ID.get(None)) is not None:
+            request.headers.setdefault(self.trace_id_header, trace_id)
+        origin = _origin(request.url)
+        if (breaker := self.breakers.get(origin)) is None:
+            breaker = self.breakers[origin] = CircuitBreaker(
+                self.settings.breaker_failure_threshold,
+                self.settings.breaker_reset_timeout,
+            )
+        retries = self.settings.retries if retries is None else retries
+        is_idempotent = request.method in IDEMPOTENT_METHODS if is_idempotent is None else is_idempotent
+        timeouts = request.extensions['timeout']
+        self.stats.requests += 1
+
+        attempt = 0
+        while True:
+            if (budget := remaining_budget()) is not None:
+                if budget <= 0:
+                    raise RequestTimeoutError(debug=f'No time left to call {origin}')
+                request.extensions['timeout'] = {
+                    key: budget if value is None else min(value, budget) for key, value in timeouts.items()
+                }
+            response, error = await self._attempt(request, origin, breaker)
+            if error is None and response.status_code not in self.settings.retry_statuses:
+                return response
+            delay = self._backoff(attempt, response)
+            if (
+                attempt >= retries
+                or not (is_idempotent or isinstance(error and error.__cause__, _NOT_SENT_ERRORS))
+                or isinstance(error, CircuitOpenError | RequestTimeoutError)
+                or delay is None
+                or ((budget := remaining_budget()) is not None and delay >= budget)
+            ):
+                if error is None:
+                    return response
+                self.stats.failed += 1
+                raise error
+            attempt += 1
+            self.stats.retries += 1
+            await asyncio.sleep(delay)
+
+    async def get(self, url: httpx.URL | str, **kwargs: Any) -> httpx.Response:
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url: httpx.URL | str, **kwargs: Any) -> httpx.Response:
+        return await self.request('POST', url, **kwargs)
+
+    async def put(self, url: httpx.URL | str, **kwargs: Any) -> httpx.Response:
+        return await self.request('PUT', url, **kwargs)
+
+    async def patch(self, url: httpx.URL | str, **kwargs: Any) -> httpx.Response:
+        return await self.request('PATCH', url, **kwargs)
+
+    async def delete(self, url: httpx.URL | str, **kwargs: Any) -> httpx.Response:
+        return await self.request('DELETE', url, **kwargs)
+
+    def stats_snapshot(self) -> dict[str, Any]:
+        return {
+            'requests': self.stats.requests,
+            'attempts': self.stats.attempts,
+            'retries': self.stats.retries,
+            'failed': self.stats.failed,
+            'rejected': self.stats.rejected,
+            'in_use': self.transport.in_use(),
+            'breakers': {
+                origin: {'state': breaker.state, 'failures': breaker.failures}
+                for origin, breaker in self.breakers.items()
+                if breaker.state != CircuitState.CLOSED or breaker.failures
+            },
+        }
+
+    async def _attempt(
+        self,
+        request: httpx.Request,
+        origin: str,
+        breaker: CircuitBreaker,
+    ) -> tuple[httpx.Response | None, ServerError | None]:
+        start_time = time()
+        loop_mark = loop_monitor.mark()
+        response = None
+        error = None
+
+        if not breaker.allow():
+            self.stats.rejected += 1
+            error = CircuitOpenError(
+                debug=f'{origin} failed {breaker.failures} times in a row',
+                retry_after=ceil(breaker.retry_after()),
+            )
+            await self._log(request, None, start_time=start_time, loop_mark=loop_mark, error=error)
+            return None, error
+
+        self.stats.attempts += 1
+        is_decided = False
+        with start_span(f'{request.method} {origin}', kind=SpanKind.CLIENT) as span:
+            request.headers.update(get_propagation_headers())
+            try:
+                response = await self._client.send(request)
+            except httpx.PoolTimeout as exc:
+                error = ExternalServiceError(message='No free connection to the external service', debug=repr(exc))
+                error.__cause__ = exc
+            except httpx.TransportError as exc:
+                breaker.on_failure()
+                is_decided = True
+                if isinstance(exc, httpx.TimeoutException) and remaining_budget() == 0:
+                    error = RequestTimeoutError(debug=f'{request.method} {request.url}: {exc!r}')
+                else:
+                    error = ExternalServiceError(debug=f'{request.method} {request.url}: {exc!r}')
+                error.__cause__ = exc
+            else:
+                if response.status_code >= 500:  # noqa: PLR2004
+                    breaker.on_failure()
+                else:
+                    breaker.on_success()
+                is_decided = True
+            finally:
+                if not is_decided:
+                    breaker.on_abort()
+            if span is not None:
+                span.attributes['http.request.method'] = request.method
+                span.attributes['url.full'] = str(request.url.copy_with(query=None))
+                if response is not None:
+                    span.attributes['http.response.status_code'] = response.status_code
+                    span.is_error = response.status_code >= 500  # noqa: PLR2004
+                span.is_error = span.is_error or error is not None
+
+        await self._log(request, response, start_time=start_time, loop_mark=loop_mark, error=error)
+        return response, error
+
+    # None when the server asks to come back later than the backoff allows
+    def _backoff(self, attempt: int, response: httpx.Response | None) -> float | None:
+        delay = random.uniform(0, min(self.settings.retry_backoff * 2**attempt, self.settings.retry_backoff_max))  # noqa: S311
+        if response is not None and (retry_after := response.headers.get('retry-after', '')).isdigit():
+            if int(retry_after) > self.settings.retry_backoff_max:
+                return None
+            delay = max(delay, int(retry_after))
+        return delay
+
+    def _capture(self, content: bytes | None, content_type: str | None) -> BodyCapture:
+        capture = BodyCapture(limit=self.settings.log_body_limit, media_type=normalize_media_type(content_type))
+        capture.feed(content or b'')
+        return capture
+
+    def _redact(self, headers: httpx.Headers) -> tuple[tuple[bytes, bytes], ...]:
+        redacted = self.settings.log_redacted_headers
+        return tuple(
+            (key, _REDACTED if key.decode('latin-1').lower() in redacted else value) for key, value in headers.raw
+        )
+
+    async def _log(
+        self,
+        request: httpx.Request,
+        response: httpx.Response | None,
+        *,
+        start_time: float,
+        loop_mark: tuple[int, float],
+        error: ServerError | None,
+    ) -> None:
+        try:
+            snapshot = AccessLogSnapshot(
+                http_method=request.method,
+                method=str(request.url.copy_with(query=None)),
+                processing_time=time() - start_time,
+                loop_lag=loop_monitor.max_lag_since(loop_mark),
+                http_status_code=response.status_code if response is not None else None,
+                query_string=request.url.query,
+                request_body=self._capture(
+                    request.content if hasattr(request, '_content') else None,
+                    request.headers.get('content-type'),
+                ),
+                response_body=self._capture(response.content, response.headers.get('content-type'))
+                if response is not None
+                else None,
+                request_headers=self._redact(request.headers),
+                response_headers=self._redact(response.headers) if response is not None else None,
+                error_title=error.title if error else None,
+                error_message=error.message if error else None,
+                error_details=[error.debug] if error and error.debug else None,
+                sentry_id=None,
+                trace_id=TRACE_ID.get('UNSET'),
+                trace=None,
+                destination='external',
+            )
+            if access_log_queue.is_running:
+                await access_log_queue.put(snapshot)
+            else:
+                log_access_record(snapshot.as_record())
+        except Exception:  # noqa: BLE001
+            logger.exception('Failed to log the external call to {}', request.url.host)
@@ -0,0 +1,266 @@
+"""Trace-id / time-window index over rotated serialized log files.
+
+Built by `LogRotationIndexer`, which loguru calls as the `compression` function of the file sink.
+Usage: python -m src.log_index (--trace-id ID | --since ISO [--until ISO]) [--limit 100] [--path logs/app.log]
+"""
+
+import argparse
+import gzip
+import mmap
+import sys
+import zlib
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from collections.abc import Iterator
+from contextlib import nullcontext
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import chain, islice
+from pathlib import Path
+from typing import Any
+
+from orjson import orjson
+
+INDEX_SUFFIX = '.idx'
+ARCHIVE_SUFFIX = '.gz'
+SEGMENT_SIZE = 1 << 20
+
+# ts, segment, offset, length, status_code, route, trace_id
+Entry = tuple[float, int, int, int, int | None, str | None, str | None]
+
+
+# access log records carry their index fields in `extra`, their message is the repr of the whole record
+def _parse_line(line: bytes) -> tuple[float, int | None, str | None, str | None]:
+    record = orjson.loads(line)['record']
+    extra = record['extra']
+    return record['time']['timestamp'], extra.get('http_status_code'), extra.get('route'), extra.get('trace_id')
+
+
+def _index_path(data_path: Path) -> Path:
+    return data_path.with_name(data_path.name + INDEX_SUFFIX)
+
+
+# With `compress` the rotated file becomes a multi-member gzip (still readable by zcat) whose members
+# are ~SEGMENT_SIZE of whole lines, so one record costs one member to inflate. Without it the file is
+# left as is and read through mmap.
+class LogRotationIndexer:
+    def __init__(self, *, compress: bool) -> None:
+        self.compress = compress
+
+    def __call__(self, path: str) -> None:
+        source_path = Path(path)
+        data_path = source_path.with_name(source_path.name + ARCHIVE_SUFFIX) if self.compress else source_path
+        entries: list[Entry] = []
+        segments: list[tuple[int, int]] = []
+
+        with source_path.open('rb') as source, data_path.open('wb') if self.compress else nullcontext() as archive:
+            segment = bytearray()
+            offset = 0
+            for line in source:
+                if not line.strip():
+                    offset += len(line)
+                    continue
+                try:
+                    ts, status_code, route, trace_id = _parse_line(line)
+                except (orjson.JSONDecodeError, KeyError, TypeError):
+                    offset += len(line)
+                    continue
+
+                if self.compress:
+                    entries.append((ts, len(segments), len(segment), len(line), status_code, route, trace_id))
+                    segment += line
+                    if len(segment) >= SEGMENT_SIZE:
+                        segments.append(self._write_segment(archive, segment))
+                        segment = bytearray()
+                else:
+                    entries.append((ts, 0, offset, len(line), status_code, route, trace_id))
+                offset += len(line)
+
+            if self.compress and segment:
+                segments.append(self._write_segment(archive, segment))
+
+        entries.sort(key=lambda entry: entry[0])
+        traces: defaultdict[str, list[int]] = defaultdict(list)
+        for idx, entry in enumerate(entries):
+            if entry[6] is not None:
+                traces[entry[6]].append(idx)
+
+        # the header line alone tells whether a search needs the file, the entries are only parsed when it does
+        header = {
+            'data': data_path.name,
+            'compressed': self.compress,
+            'segments': segments,
+            'time_range': [entries[0][0], entries[-1][0]] if entries else None,
+        }
+        _index_path(data_path).write_bytes(
+            orjson.dumps(header, option=orjson.OPT_APPEND_NEWLINE)
+            + orjson.dumps({'entries': entries, 'traces': traces})
+        )
+        if self.compress:
+            source_path.unlink()
+
+    @staticmethod
+    def _write_segment(archive: Any, segment: bytearray) -> tuple[int, int]:
+        start = archive.tell()
+        archive.write(gzip.compress(segment, compresslevel=6))
+        return start, archive.tell() - start
+
+
+@dataclass(slots=True)
+class LogIndex:
+    data_path: Path
+    compressed: bool
+    segments: list[tuple[int, int]]
+    time_range: tuple[float, float] | None
+    entries: list[Entry]
+    traces: dict[str, list[int]]
+
+    @staticmethod
+    def load_header(index_path: Path) -> dict[str, Any]:
+        with index_path.open('rb') as file:
+            return orjson.loads(file.readline())
+
+    # indexes written before the header line was split off are one JSON document, the header holds it all
+    @classmethod
+    def load(cls, index_path: Path) -> 'LogIndex':
+        header, _, body = index_path.read_bytes().partition(b'\n')
+        data = orjson.loads(header)
+        if body.strip():
+            data.update(orjson.loads(body))
+        return cls(
+            data_path=index_path.with_name(data['data']),
+            compressed=data['compressed'],
+            segments=data['segments'],
+            time_range=data['time_range'],
+            entries=data['entries'],
+            traces=data['traces'],
+        )
+
+    def find(self, *, trace_id: str | None, since: float | None, until: float | None) -> list[int]:
+        if trace_id is not None:
+            return [
+                idx
+                for idx in self.traces.get(trace_id, ())
+                if (since is None or self.entries[idx][0] >= since) and (until is None or self.entries[idx][0] <= until)
+            ]
+        timestamps = [entry[0] for entry in self.entries]
+        start = bisect_left(timestamps, since) if since is not None else 0
+        end = bisect_right(timestamps, until) if until is not None else len(timestamps)
+        return list(range(start, end))
+
+    def read(self, entry_ids: list[int]) -> Iterator[bytes]:
+        if not entry_ids:
+            return
+        with self.data_path.open('rb') as file:
+            if not self.compressed:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    for idx in entry_ids:
+                        _, _, offset, length, *_ = self.entries[idx]
+                        yield mapped[offset : offset + length]
+                return
+
+            # entries come in time order, which is the order of the segments, so one inflated segment is kept
+            segment_no, segment = None, b''
+            for idx in entry_ids:
+                _, entry_segment_no, offset, length, *_ = self.entries[idx]
+                if entry_segment_no != segment_no:
+                    segment_no = entry_segment_no
+                    segment_offset, segment_length = self.segments[segment_no]
+                    file.seek(segment_offset)
+                    segment = zlib.decompress(file.read(segment_length), wbits=31)
+                yield segment[offset : offset + length]
+
+
+def _overlaps(time_range: list[float] | None, since: float | None, until: float | None) -> bool:
+    if time_range is None:
+        return False
+    return (since is None or time_range[1] >= since) and (until is None or time_range[0] <= until)
+
+
+def _lines_containing(mapped: mmap.mmap, needle: bytes) -> Iterator[bytes]:
+    position = 0
+    while (position := mapped.find(needle, position)) != -1:
+        start = mapped.rfind(b'\n', 0, position) + 1
+        end = mapped.find(b'\n', position)
+        end = len(mapped) if end == -1 else end + 1
+        yield mapped[start:end]
+        position = end
+
+
+def _scan_active_file(
+    path: Path,
+    *,
+    trace_id: str | None,
+    since: float | None,
+    until: float | None,
+) -> Iterator[bytes]:
+    if not path.is_file() or not path.stat().st_size:
+        return
+    with path.open('rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        lines = iter(mapped.readline, b'') if trace_id is None else _lines_containing(mapped, trace_id.encode())
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                ts, *_, line_trace_id = _parse_line(line)
+            except (orjson.JSONDecodeError, KeyError, TypeError):
+                continue
+            if trace_id is not None and line_trace_id != trace_id:
+                continue
+            if (since is None or ts >= since) and (until is None or ts <= until):
+                yield line
+
+
+def _indexed_lines(
+    log_path: Path,
+    *,
+    trace_id: str | None,
+    since: float | None,
+    until: float | None,
+) -> Iterator[bytes]:
+    for index_path in sorted(log_path.parent.glob(f'{log_path.stem}.*{log_path.suffix}*{INDEX_SUFFIX}')):
+        if not _overlaps(LogIndex.load_header(index_path)['time_range'], since, until):
+            continue
+        index = LogIndex.load(index_path)
+        yield from index.read(index.find(trace_id=trace_id, since=since, until=until))
+
+
+# Lazy from the rotated files to the active one: indexes are loaded one at a time and reading stops at `limit`
+def search_logs(
+    log_path: Path,
+    *,
+    trace_id: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    limit: int | None = None,
+) -> Iterator[dict]:
+    if trace_id is None and since is None and until is None:
+        raise ValueError('trace_id or a time window is required')
+
+    since_ts = since.timestamp() if since else None
+    until_ts = until.timestamp() if until else None
+    lines = chain(
+        _indexed_lines(log_path, trace_id=trace_id, since=since_ts, until=until_ts),
+        _scan_active_file(log_path, trace_id=trace_id, since=since_ts, until=until_ts),
+    )
+    return (orjson.loads(line)['record'] for line in islice(lines, limit))
+
+
+def main() -> None:
+    from src.settings import get_settings  # noqa: PLC0415
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--path', type=Path, default=None)
+    parser.add_argument('--trace-id')
+    parser.add_argument('--since', type=datetime.fromisoformat)
+    parser.add_argument('--until', type=datetime.fromisoformat)
+    parser.add_argument('--limit', type=int, default=None)
+    args = parser.parse_args()
+
+    log_path = args.path or get_settings().env.logger.path
+    for record in search_logs(log_path, trace_id=args.trace_id, since=args.since, until=args.until, limit=args.limit):
+        sys.stdout.buffer.write(orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE))
+
+
+if __name__ == '__main__':
+    main()
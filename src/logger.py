@@ -1,13 +1,20 @@
 import logging
 import sys
+import threading
+import traceback
 from datetime import datetime
+from functools import lru_cache
+from typing import BinaryIO
 from zoneinfo import ZoneInfo
 
 from loguru import logger
+from loguru._logger import Logger
 from loguru._defaults import LOGURU_FORMAT
 from loguru._recattrs import RecordLevel
+from orjson import orjson
 
-from src.settings import Settings
+from src.log_index import LogRotationIndexer
+from src.settings import get_settings, LogSinkMode
 
 LOGLEVEL_MAPPING = {
     50: 'CRITICAL',
@@ -20,17 +27,41 @@ LOGLEVEL_MAPPING = {
 }
 
 
+@lru_cache
+def _loguru_level(levelname: str, levelno: int) -> str | int:
+    try:
+        return logger.level(levelname).name
+    except ValueError:
+        return LOGLEVEL_MAPPING.get(levelno, levelno)
+
+
+# Records below the handler level never reach `emit` (stdlib checks it before calling the handler).
+# The loguru logger for a call site is bound once, with the depth of the caller's frame found once,
+# so `emit` is two dict lookups, the message formatting and the loguru call.
 class InnerAppLogsHandler(logging.Handler):
+    def __init__(self, level: int | str = logging.NOTSET) -> None:
+        super().__init__(level=level)
+        self._call_sites: dict[tuple[str, str, int], tuple[Logger, int]] = {}
+
     def emit(self, record: logging.LogRecord) -> None:
-        try:
-            level = logger.level(record.levelname).name
-        except AttributeError:
-            level = LOGLEVEL_MAPPING[record.levelno]
+        call_site = (record.name, record.pathname, record.lineno)
+        if (bound := self._call_sites.get(call_site)) is None:
+            bound = self._call_sites[call_site] = self._bind(record)
+        log, depth = bound
+        if record.exc_info:
+            log = log.opt(depth=depth, exception=record.exc_info)
 
-        frame, depth = logging.currentframe(), 2
-        while frame and frame.f_code.co_filename == logging.__file__:
+        log.log(_loguru_level(record.levelname, record.levelno), record.getMessage())
+
+    @staticmethod
+    def _bind(record: logging.LogRecord) -> tuple[Logger, int]:
+        # depth 0 is `emit` itself; stdlib already resolved the caller's location for the record
+        frame, depth = sys._getframe(1), 0  # noqa: SLF001
+        while frame is not None and (frame.f_code.co_filename, frame.f_lineno) != (record.pathname, record.lineno):
             frame = frame.f_back
             depth += 1
+        if frame is None:
+            depth = 0
 
         log = logger.bind(
             request_id='app',
@@ -38,25 +69,106 @@ class InnerAppLogsHandler(logging.Handler):
             file=record.filename,
             name=record.name,
         )
-        log.opt(depth=depth, exception=record.exc_info).log(
-            level,
-            record.getMessage(),
-        )
+        return log.opt(depth=depth), depth
+
+
+SQLALCHEMY_ENGINE_LOGGER = 'sqlalchemy.engine.Engine'
+DB_ECHO_LEVEL = RecordLevel(name='DB_ECHO', no=11, icon='🔵')
 
 
 def custom_time(*_args):
-    return datetime.now(tz=ZoneInfo('Europe/Moscow'))
+    return datetime.now(tz=AppLogger.timezone)
+
+
+# Lines are serialized by the caller and written in batches by one thread:
+# a batch is flushed once it reaches `batch_size` records or every `flush_interval` seconds.
+class JsonLogSink:
+    def __init__(
+        self,
+        stream: BinaryIO,
+        *,
+        timezone: ZoneInfo,
+        batch_size: int,
+        flush_interval: float,
+    ) -> None:
+        self.stream = stream
+        self.timezone = timezone
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._batch: list[bytes] = []
+        self._lock = threading.Lock()
+        self._batch_ready = threading.Event()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name='json-log-writer', daemon=True)
+        self._thread.start()
+
+    def write(self, message: str) -> None:
+        record = message.record  # type: ignore
+        data = {
+            'time': record['time'].astimezone(self.timezone).isoformat(),
+            'level': record['level'].name,
+            'message': record['message'],
+            'logger': record['name'],
+            'function': record['function'],
+            'line': record['line'],
+            'extra': record['extra'],
+        }
+        if record['exception'] is not None:
+            data['exception'] = ''.join(traceback.format_exception(*record['exception']))
+        line = orjson.dumps(data, default=str, option=orjson.OPT_APPEND_NEWLINE)
+
+        with self._lock:
+            self._batch.append(line)
+            if len(self._batch) >= self.batch_size:
+                self._batch_ready.set()
+
+    # not named `flush`: loguru would call it after every write
+    def _flush(self) -> None:
+        with self._lock:
+            batch, self._batch = self._batch, []
+        if batch:
+            self.stream.write(b''.join(batch))
+            self.stream.flush()
+
+    def stop(self) -> None:
+        self._stopped = True
+        self._batch_ready.set()
+        self._thread.join()
+        self._flush()
+
+    def _run(self) -> None:
+        while not self._stopped:
+            self._batch_ready.wait(self.flush_interval)
+            self._batch_ready.clear()
+            self._flush()
 
 
 class AppLogger:
     format: str = LOGURU_FORMAT
+    timezone: ZoneInfo = ZoneInfo('Europe/Moscow')
 
     @classmethod
     def make(cls):
-        settings = Settings()
+        settings = get_settings()
+        cls.timezone = ZoneInfo(settings.env.logger.timezone)
 
         logger.remove()
 
+        if settings.env.logger.sink_mode == LogSinkMode.JSON:
+            logger.add(
+                JsonLogSink(
+                    stream=sys.stdout.buffer,
+                    timezone=cls.timezone,
+                    batch_size=settings.env.logger.json_batch_size,
+                    flush_interval=settings.env.logger.json_flush_interval,
+                ),
+                level=settings.env.logger.level.upper(),
+                catch=True,
+                format='{message}',
+                filter=cls.log_message_filter,
+            )
+            return cls._intercept_std_loggers(level=settings.env.logger.level)
+
         logger.add(
             sys.stderr,
             level=settings.env.logger.level.upper(),
@@ -72,7 +184,11 @@ class AppLogger:
             rotation=settings.env.logger.rotation,
             retention=settings.env.logger.retention,
             level=settings.env.logger.level.upper(),
-            compression=settings.env.logger.compression,
+            compression=(
+                LogRotationIndexer(compress=bool(settings.env.logger.compression))
+                if settings.env.logger.index_rotated
+                else settings.env.logger.compression
+            ),
             encoding=settings.env.logger.encoding,
             catch=True,
             enqueue=True,
@@ -81,39 +197,45 @@ class AppLogger:
             serialize=True,
         )
 
-        for logger_title in ['uvicorn', 'uvicorn.access', 'fastapi', 'sqlalchemy.engine.Engine']:
+        return cls._intercept_std_loggers(level=settings.env.logger.level)
+
+    @staticmethod
+    def _intercept_std_loggers(level: str):
+        handler = InnerAppLogsHandler(level=logger.level(level).no)
+        for logger_title in ['uvicorn', 'uvicorn.access', 'fastapi', SQLALCHEMY_ENGINE_LOGGER]:
             _logger = logging.getLogger(logger_title)
-            _logger.handlers = [InnerAppLogsHandler()]
+            _logger.handlers = [handler]
 
         return logger.bind(request_id=None, method=None, file=None, name=None)
 
     @staticmethod
     def custom_formatter(record: dict) -> str:
-        custom_format = AppLogger.format + '\n'
-        record['time'] = datetime.astimezone(record['time'], ZoneInfo('Europe/Moscow'))
-
-        if record['extra'].get('name') == 'sqlalchemy.engine.Engine':
-            record['level'] = RecordLevel(name='DB_ECHO', no=11, icon='🔵')
-            custom_format = custom_format.replace('cyan', 'fg #FFA500')
-            custom_format = custom_format.replace(
-                '<level>{level: <8}</level>',
-                AppLogger.wrap_str_in_color(string='<level>{level: <8}</level>', color='fg #FFA500'),
-            )
-        return custom_format
+        record['time'] = record['time'].astimezone(AppLogger.timezone)
+
+        if record['extra'].get('name') == SQLALCHEMY_ENGINE_LOGGER:
+            record['level'] = DB_ECHO_LEVEL
+            return DB_ECHO_FORMAT
+        return DEFAULT_FORMAT
 
     @staticmethod
     def wrap_str_in_color(string: str, color: str) -> str:
         return f'<{color}>{string}</{color}>'
 
+    # /metrics never reaches the access log since the fast path, so only the logger-name rules are left
     @staticmethod
     def log_message_filter(record: dict) -> bool:
-        if record['extra'].get('name') == 'sqlalchemy.engine.Engine' and record['message'] == '[raw sql] ()':
-            return False
+        name = record['extra'].get('name')
+        if name is None:
+            return True
 
-        if record['extra'].get('name') == 'uvicorn.access':
+        if name == SQLALCHEMY_ENGINE_LOGGER and record['message'] == '[raw sql] ()':
             return False
 
-        if 'GET /metrics' in record['message']:
-            return False
+        return name != 'uvicorn.access'
+
 
-        return True
+DEFAULT_FORMAT = AppLogger.format + '\n'
+DB_ECHO_FORMAT = DEFAULT_FORMAT.replace('cyan', 'fg #FFA500').replace(
+    '<level>{level: <8}</level>',
+    AppLogger.wrap_str_in_color(string='<level>{level: <8}</level>', color='fg #FFA500'),
+)
@@ -1,4 +1,3 @@
-import contextlib
 import sys
 from pathlib import Path
 
@@ -6,24 +5,15 @@ from loguru import logger
 
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 
-from src.settings import Settings  # noqa
+from src.settings import get_settings  # noqa
 
-with contextlib.suppress(ImportError):
-    import uvicorn
-
-from src.bootstrap import make_app  # noqa
+from src.server import run_server  # noqa
 
 
 def main() -> None:
-    settings = Settings()
+    settings = get_settings()
     logger.debug('some')
-    uvicorn.run(
-        app=make_app,
-        host=settings.env.rest.host,
-        port=settings.env.rest.port,
-        factory=True,
-        lifespan='on'
-    )
+    run_server(rest_settings=settings.env.rest, metrics_settings=settings.env.metrics)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,85 @@
+from collections.abc import Awaitable, Callable, Iterable, Sequence
+from functools import lru_cache
+
+from prometheus_client import Counter, Gauge, Histogram
+from starlette.requests import Request
+from starlette.responses import Response
+
+from src.settings import get_settings
+
+UNMATCHED_ROUTE = '<unmatched>'
+
+
+class RouteInFlight:
+    def __init__(self, gauges: dict[str, Gauge]) -> None:
+        self.gauges = gauges
+
+    async def __call__(
+        self,
+        request: Request,
+        call_next: Callable[[Request], Awaitable[Response]],
+    ) -> Response:
+        gauge = self.gauges.get(request.method)
+        if gauge is None:
+            return await call_next(request)
+
+        gauge.inc()
+        try:
+            return await call_next(request)
+        finally:
+            gauge.dec()
+
+
+# Labelled children are resolved once and kept in plain dicts, so recording a request
+# is a dict lookup plus the child update instead of a locked `.labels()` call.
+class HTTPMetrics:
+    def __init__(self, latency_buckets: Sequence[float]) -> None:
+        self.requests = Counter(
+            'http_requests_total',
+            'Handled HTTP requests',
+            ('method', 'route', 'status_code'),
+        )
+        self.latency = Histogram(
+            'http_request_duration_seconds',
+            'HTTP request latency',
+            ('method', 'route'),
+            buckets=latency_buckets,
+        )
+        self.in_flight = Gauge(
+            'http_requests_in_flight',
+            'HTTP requests being handled',
+            ('method', 'route'),
+            multiprocess_mode='livesum',
+        )
+        self.server_errors = Counter(
+            'server_errors_total',
+            'Server errors returned to clients',
+            ('title',),
+        )
+        self._requests: dict[tuple[str, str, int], Counter] = {}
+        self._latency: dict[tuple[str, str], Histogram] = {}
+        self._server_errors: dict[str, Counter] = {}
+
+    def observe_request(self, method: str, route: str, status_code: int, duration: float) -> None:
+        key = (method, route)
+        if (latency := self._latency.get(key)) is None:
+            latency = self._latency[key] = self.latency.labels(method, route)
+        latency.observe(duration)
+
+        requests_key = (method, route, status_code)
+        if (requests := self._requests.get(requests_key)) is None:
+            requests = self._requests[requests_key] = self.requests.labels(method, route, str(status_code))
+        requests.inc()
+
+    def observe_server_error(self, title: str) -> None:
+        if (server_errors := self._server_errors.get(title)) is None:
+            server_errors = self._server_errors[title] = self.server_errors.labels(title)
+        server_errors.inc()
+
+    def route_in_flight(self, route: str, methods: Iterable[str]) -> RouteInFlight:
+        return RouteInFlight({method: self.in_flight.labels(method, route) for method in methods})
+
+
+@lru_cache
+def get_http_metrics() -> HTTPMetrics:
+    return HTTPMetrics(latency_buckets=get_settings().env.metrics.latency_buckets)
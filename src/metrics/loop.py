@@ -0,0 +1,182 @@
+import asyncio
+import sys
+import threading
+import traceback
+from bisect import bisect_left
+from collections import deque
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime
+from time import monotonic
+from typing import Any
+
+from loguru import logger
+
+from src.settings import LoopMonitorSettings
+from src.utils import TRACE_ID
+
+STACK_LIMIT = 30
+
+
+class LagHistogram:
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    # cumulative, like a prometheus histogram
+    def as_dict(self) -> dict[str, Any]:
+        cumulative, total = {}, 0
+        for bound, count in zip((*map(str, self.buckets), '+Inf'), self.counts, strict=True):
+            total += count
+            cumulative[bound] = total
+        return {'buckets': cumulative, 'count': self.count, 'sum': self.sum, 'max': self.max}
+
+
+@dataclass(slots=True)
+class SlowCallback:
+    detected_at: str
+    duration: float
+    task: str | None
+    trace_id: str | None
+    stack: list[str] | None
+
+
+@dataclass(slots=True)
+class _Stall:
+    task: str | None
+    trace_id: str | None
+    stack: list[str]
+
+
+# A heartbeat task sleeps `interval` and records how late it wakes up: that is the time every other
+# callback on the loop waited too. While the heartbeat is overdue by `slow_callback_threshold`, a watchdog
+# thread grabs the loop thread's stack and the running task's TRACE_ID, so the blocking call is caught in
+# the act. A C call that never releases the GIL is only seen afterwards, without a stack.
+class LoopMonitor:
+    def __init__(self) -> None:
+        self.settings: LoopMonitorSettings | None = None
+        self.histogram: LagHistogram | None = None
+        self.slow_callbacks: deque[SlowCallback] = deque()
+        self.tick = 0
+        self._lags: list[float] = []
+        self._beat = monotonic()
+        self._stall: _Stall | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._task: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, settings: LoopMonitorSettings) -> None:
+        if self.is_running:
+            return
+        self.settings = settings
+        self.histogram = LagHistogram(settings.lag_buckets)
+        self.slow_callbacks = deque(maxlen=settings.max_slow_callbacks)
+        self._lags = [0.0] * settings.lag_window
+        self._beat = monotonic()
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stopped.clear()
+        self._task = self._loop.create_task(self._heartbeat(), name='loop-monitor')
+        self._watchdog = threading.Thread(target=self._watch, name='loop-monitor-watchdog', daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        if not self.is_running:
+            return
+        self._stopped.set()
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        await asyncio.to_thread(self._watchdog.join)
+        self._task = self._watchdog = None
+
+    def mark(self) -> tuple[int, float]:
+        return self.tick, monotonic()
+
+    # Worst lag seen since `mark()`: the heartbeats recorded since then plus how overdue the next one is
+    # right now, which is where a request that just blocked the loop finds its own stall.
+    def max_lag_since(self, mark: tuple[int, float]) -> float | None:
+        if not self.is_running:
+            return None
+        tick, marked_at = mark
+        window = len(self._lags)
+        ticks = range(max(tick, self.tick - window) + 1, self.tick + 1)
+        overdue = monotonic() - max(self._beat + self.settings.interval, marked_at)
+        return max(overdue, 0.0, *(self._lags[idx % window] for idx in ticks))
+
+    async def _heartbeat(self) -> None:
+        interval = self.settings.interval
+        while True:
+            expected = monotonic() + interval
+            await asyncio.sleep(interval)
+            now = monotonic()
+            lag = max(now - expected, 0.0)
+            self._beat = now
+            self.tick += 1
+            self._lags[self.tick % len(self._lags)] = lag
+            self.histogram.observe(lag)
+            if lag >= self.settings.slow_callback_threshold:
+                self._record_slow_callback(lag)
+
+    def _record_slow_callback(self, lag: float) -> None:
+        stall, self._stall = self._stall, None
+        slow_callback = SlowCallback(
+            detected_at=datetime.now(UTC).isoformat(),
+            duration=lag,
+            task=stall.task if stall else None,
+            trace_id=stall.trace_id if stall else None,
+            stack=stall.stack if stall else None,
+        )
+        self.slow_callbacks.append(slow_callback)
+        logger.warning(
+            'Event loop was blocked for {:.3f}s, task={}, trace_id={}',
+            lag,
+            slow_callback.task,
+            slow_callback.trace_id,
+        )
+
+    def _watch(self) -> None:
+        overdue = self.settings.interval + self.settings.slow_callback_threshold
+        while not self._stopped.wait(self.settings.slow_callback_threshold / 2):
+            beat = self._beat
+            if self._stall is None and monotonic() - beat > overdue:
+                stall = self._capture()
+                # the heartbeat may have come back while the stack was being read
+                if stall is not None and self._beat == beat:
+                    self._stall = stall
+
+    def _capture(self) -> _Stall | None:
+        frame = sys._current_frames().get(self._loop_thread_id)  # noqa: SLF001
+        if frame is None:
+            return None
+        stack = [
+            f'{summary.filename}:{summary.lineno} {summary.name}'
+            for summary in traceback.extract_stack(frame, limit=STACK_LIMIT)
+        ]
+        task = asyncio.current_task(self._loop)
+        if task is None:
+            return _Stall(task=None, trace_id=None, stack=stack)
+        return _Stall(task=task.get_name(), trace_id=task.get_context().get(TRACE_ID), stack=stack)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            'is_running': self.is_running,
+            'lag': self.histogram.as_dict() if self.histogram else None,
+            'slow_callbacks': [asdict(slow_callback) for slow_callback in reversed(self.slow_callbacks)],
+        }
+
+
+loop_monitor = LoopMonitor()
@@ -0,0 +1,36 @@
+import os
+import shutil
+from pathlib import Path
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest, multiprocess
+
+MULTIPROC_DIR_ENV = 'PROMETHEUS_MULTIPROC_DIR'
+
+
+# Must run in the supervisor before workers are spawned: prometheus_client picks
+# its file-backed values at import time from this environment variable.
+def prepare_multiproc_dir(path: Path) -> None:
+    shutil.rmtree(path, ignore_errors=True)
+    path.mkdir(parents=True)
+    os.environ[MULTIPROC_DIR_ENV] = str(path)
+
+
+def is_multiproc() -> bool:
+    return bool(os.environ.get(MULTIPROC_DIR_ENV))
+
+
+def mark_worker_dead(pid: int | None) -> None:
+    if pid is not None and is_multiproc():
+        multiprocess.mark_process_dead(pid)
+
+
+def render_latest() -> bytes:
+    if not is_multiproc():
+        return generate_latest(REGISTRY)
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
+
+
+__all__ = ['CONTENT_TYPE_LATEST', 'mark_worker_dead', 'prepare_multiproc_dir', 'render_latest']
@@ -0,0 +1,118 @@
+import copy
+import random
+import socket
+
+from uvicorn import Config, Server
+from uvicorn.supervisors.multiprocess import Multiprocess, Process
+
+from src.metrics.registry import mark_worker_dead, prepare_multiproc_dir
+from src.settings import MetricsSettings, RESTSettings
+
+APP_FACTORY = 'src.bootstrap:make_app'
+
+
+def make_config(rest_settings: RESTSettings) -> Config:
+    return Config(
+        app=APP_FACTORY,
+        factory=True,
+        host=rest_settings.host,
+        port=rest_settings.port,
+        workers=rest_settings.workers,
+        loop=rest_settings.loop,
+        http=rest_settings.http,
+        backlog=rest_settings.backlog,
+        timeout_keep_alive=rest_settings.timeout_keep_alive,
+        timeout_graceful_shutdown=rest_settings.timeout_graceful_shutdown,
+        limit_max_requests=rest_settings.limit_max_requests,
+        lifespan='on',
+    )
+
+
+def bind_socket(config: Config, *, reuse_port: bool) -> socket.socket:
+    if not reuse_port:
+        return config.bind_socket()
+
+    family = socket.AF_INET6 if config.host and ':' in config.host else socket.AF_INET
+    sock = socket.socket(family=family)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((config.host, config.port))
+    sock.set_inheritable(True)
+    return sock
+
+
+# Same as uvicorn's supervisor, but every worker gets its own socket (one per worker with SO_REUSEPORT)
+# and its own jittered request limit, so recycling never restarts the whole pool at once.
+class WorkerSupervisor(Multiprocess):
+    def __init__(
+        self,
+        config: Config,
+        sockets: list[socket.socket],
+        limit_max_requests_jitter: int,
+    ) -> None:
+        super().__init__(config=config, target=Server(config).run, sockets=sockets)
+        self.limit_max_requests_jitter = limit_max_requests_jitter
+
+    def _make_process(self, idx: int) -> Process:
+        config = self.config
+        if config.limit_max_requests and self.limit_max_requests_jitter:
+            config = copy.copy(config)
+            config.limit_max_requests += random.randint(0, self.limit_max_requests_jitter)
+        sockets = [self.sockets[idx % len(self.sockets)]]
+        return Process(config, Server(config).run, sockets)
+
+    def init_processes(self) -> None:
+        for idx in range(self.processes_num):
+            process = self._make_process(idx)
+            process.start()
+            self.processes.append(process)
+
+    def restart_all(self) -> None:
+        for idx, process in enumerate(self.processes):
+            process.terminate()
+            process.join()
+            mark_worker_dead(process.process.pid)
+            new_process = self._make_process(idx)
+            new_process.start()
+            self.processes[idx] = new_process
+
+    def keep_subprocess_alive(self) -> None:
+        if self.should_exit.is_set():
+            return
+
+        for idx, process in enumerate(self.processes):
+            if process.is_alive():
+                continue
+
+            process.kill()
+            process.join()
+            mark_worker_dead(process.process.pid)
+
+            if self.should_exit.is_set():
+                return
+
+            new_process = self._make_process(idx)
+            new_process.start()
+            self.processes[idx] = new_process
+
+
+def run_server(rest_settings: RESTSettings, metrics_settings: MetricsSettings) -> None:
+    config = make_config(rest_settings)
+
+    if config.workers == 1:
+        # no supervisor to start a replacement, a recycled worker would take the service down
+        config.limit_max_requests = None
+        sock = bind_socket(config, reuse_port=rest_settings.reuse_port)
+        Server(config).run(sockets=[sock])
+        return
+
+    if metrics_settings.enabled:
+        prepare_multiproc_dir(metrics_settings.multiproc_dir)
+
+    sockets_count = config.workers if rest_settings.reuse_port else 1
+    sockets = [bind_socket(config, reuse_port=rest_settings.reuse_port) for _ in range(sockets_count)]
+    WorkerSupervisor(
+        config=config,
+        sockets=sockets,
+        limit_max_requests_jitter=rest_settings.limit_max_requests_jitter,
+    ).run()
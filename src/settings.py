@@ -1,14 +1,25 @@
+import os
+import tempfile
+from collections.abc import Mapping
 from enum import auto, StrEnum
 from functools import lru_cache
 from pathlib import Path
-from typing import Annotated
+from typing import Annotated, Any, Literal
 
-from pydantic import AfterValidator, BaseModel, DirectoryPath, Field, PostgresDsn, RedisDsn
-from pydantic_settings import BaseSettings, SettingsConfigDict
+from dotenv import dotenv_values
+from pydantic import AfterValidator, BaseModel, ConfigDict, DirectoryPath, Field, PostgresDsn, RedisDsn
+from pydantic.fields import FieldInfo
+from pydantic_settings import BaseSettings, PydanticBaseSettingsSource, SettingsConfigDict
 
 UpperStr = Annotated[str, AfterValidator(lambda v: v.upper())]
 
 
+def _available_cpu_count() -> int:
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
 # https://docs.pydantic.dev/latest/concepts/pydantic_settings/#environment-variable-names
 
 
@@ -26,23 +37,126 @@ class Environment(StrEnum):
     PROD = auto()
 
 
+class LogSinkMode(StrEnum):
+    TEXT = auto()
+    JSON = auto()
+
+
+class AccessLogMode(StrEnum):
+    INLINE = auto()
+    QUEUED = auto()
+
+
+class SentryReportingMode(StrEnum):
+    INLINE = auto()
+    BACKGROUND = auto()
+
+
+class AccessLogQueuePolicy(StrEnum):
+    DROP_OLDEST = auto()
+    DROP_NEW = auto()
+    BLOCK = auto()
+
+
+class SpanExporterKind(StrEnum):
+    NONE = auto()
+    OTLP = auto()
+    FILE = auto()
+    MEMORY = auto()
+
+
+ENV_FILE = Path('.env')
+
+
+@lru_cache(maxsize=4)
+def _read_env_file(
+    path: Path,
+    mtime_ns: int,  # noqa: ARG001 - part of the cache key, an edited file is parsed again
+    encoding: str | None,
+) -> Mapping[str, str | None]:
+    return dotenv_values(path, encoding=encoding or 'utf8')
+
+
+# EnvSettings builds a settings object per section and pydantic-settings parses .env for every one of them.
+# The file is parsed once here, and every section only looks up its own declared fields: the dotenv source
+# matches every line it gets against every field to collect extras, which are ignored anyway.
+# Built on the documented custom source API (get_field_value/__call__), not on DotEnvSettingsSource internals.
+class _SharedDotEnvSettingsSource(PydanticBaseSettingsSource):
+    def __init__(self, settings_cls: type[BaseSettings], env_file: Path, env_prefix: str) -> None:
+        super().__init__(settings_cls)
+        self.env_file = env_file
+        self.env_prefix = env_prefix.lower()
+        self.env_vars: Mapping[str, str | None] = {}
+
+    def get_field_value(self, field: FieldInfo, field_name: str) -> tuple[Any, str, bool]:  # noqa: ARG002
+        return self.env_vars.get(f'{self.env_prefix}{field_name}'.lower()), field_name, False
+
+    def __call__(self) -> dict[str, Any]:
+        if not self.env_file.is_file():
+            return {}
+        encoding = self.config.get('env_file_encoding')
+        env_file = _read_env_file(self.env_file, self.env_file.stat().st_mtime_ns, encoding)
+        self.env_vars = {name.lower(): value for name, value in env_file.items()}
+
+        data = {}
+        for field_name, field in self.settings_cls.model_fields.items():
+            value, field_key, value_is_complex = self.get_field_value(field, field_name)
+            if value is not None:
+                data[field_key] = self.prepare_field_value(field_name, field, value, value_is_complex)
+        return data
+
+
 class _BaseSettings(BaseSettings):
+    # env_file is left unset so the default dotenv source reads nothing, .env comes from the shared source
     model_config = SettingsConfigDict(
-        env_file='.env',
+        env_file=None,
         extra='ignore',
         str_strip_whitespace=True,
         validate_default=True,
         case_sensitive=False,
     )
 
+    @classmethod
+    def settings_customise_sources(
+        cls,
+        settings_cls: type[BaseSettings],
+        init_settings: PydanticBaseSettingsSource,
+        env_settings: PydanticBaseSettingsSource,
+        dotenv_settings: PydanticBaseSettingsSource,
+        file_secret_settings: PydanticBaseSettingsSource,
+    ) -> tuple[PydanticBaseSettingsSource, ...]:
+        shared_dotenv_settings = _SharedDotEnvSettingsSource(
+            settings_cls,
+            env_file=ENV_FILE,
+            env_prefix=dotenv_settings.env_prefix,
+        )
+        return init_settings, env_settings, shared_dotenv_settings, file_secret_settings
+
 
 class LoggerSettings(_BaseSettings):
     path: Path = Field(default=Path('../logs/app.log'))
     rotation: str = Field(default='1 day')
     retention: str = Field(default='1 month')
     compression: str = Field(default='zip')
+    index_rotated: bool = Field(default=False)
     encoding: str = Field(default='utf-8')
     level: UpperStr = Field(default='info')
+    sink_mode: LogSinkMode = Field(default=LogSinkMode.TEXT)
+    timezone: str = Field(default='Europe/Moscow')
+    json_batch_size: int = Field(default=512, gt=0)
+    json_flush_interval: float = Field(default=0.5, gt=0)
+    access_log_mode: AccessLogMode = Field(default=AccessLogMode.INLINE)
+    access_log_queue_size: int = Field(default=10_000, gt=0)
+    access_log_queue_policy: AccessLogQueuePolicy = Field(default=AccessLogQueuePolicy.DROP_OLDEST)
+    access_log_body_limit: int = Field(default=4096, ge=0)
+    access_log_sample_rate: float = Field(default=1.0, ge=0, le=1)
+    access_log_sample_rates: dict[str, float] = Field(default_factory=dict)
+    access_log_budget_per_second: float | None = Field(default=None, gt=0)
+    access_log_slow_threshold: float = Field(default=1.0, ge=0)
+    access_log_slow_thresholds: dict[str, float] = Field(default_factory=dict)
+    access_log_redacted_headers: tuple[str, ...] = Field(
+        default=('authorization', 'proxy-authorization', 'cookie', 'set-cookie', 'x-api-key'),
+    )
 
 
 class RESTSettings(_BaseSettings):
@@ -50,6 +164,159 @@ class RESTSettings(_BaseSettings):
     port: int = Field(default=8000)
     session_secret_key: str = Field(default='some secret key')
     cors_allowed_origins: list[str] = Field(default=['*'])
+    workers: int = Field(default_factory=_available_cpu_count, ge=1)
+    loop: Literal['auto', 'asyncio', 'uvloop'] = Field(default='auto')
+    http: Literal['auto', 'h11', 'httptools'] = Field(default='auto')
+    backlog: int = Field(default=2048, gt=0)
+    timeout_keep_alive: int = Field(default=5, ge=0)
+    timeout_graceful_shutdown: int | None = Field(default=30)
+    reuse_port: bool = Field(default=False)
+    limit_max_requests: int | None = Field(default=None)
+    limit_max_requests_jitter: int = Field(default=0, ge=0)
+    openapi_artifact_path: Path | None = Field(default=None)
+
+
+class DatabaseSettings(_BaseSettings):
+    pool_size: int = Field(default=10, ge=1)
+    max_overflow: int = Field(default=10, ge=0)
+    pool_timeout: float = Field(default=30.0, gt=0)
+    pool_recycle: int = Field(default=1800)
+    pool_pre_ping: bool = Field(default=True)
+    statement_cache_size: int = Field(default=100, ge=0)
+    echo: bool = Field(default=False)
+
+
+class CacheSettings(_BaseSettings):
+    enabled: bool = Field(default=True)
+    key_prefix: str = Field(default='response-cache')
+    local_max_entries: int = Field(default=1024, ge=0)
+    use_fakeredis: bool = Field(default=False)
+
+
+class CompressionSettings(_BaseSettings):
+    enabled: bool = Field(default=True)
+    minimum_size: int = Field(default=1024, ge=0)
+    encodings: tuple[str, ...] = Field(default=('zstd', 'br', 'gzip'))
+    gzip_level: int = Field(default=6, ge=1, le=9)
+    brotli_quality: int = Field(default=4, ge=0, le=11)
+    zstd_level: int = Field(default=3, ge=1, le=22)
+    skip_content_types: tuple[str, ...] = Field(
+        default=(
+            'image/',
+            'video/',
+            'audio/',
+            'font/woff',
+            'application/zip',
+            'application/gzip',
+            'application/x-gzip',
+            'application/zstd',
+            'application/x-7z-compressed',
+            'application/x-rar-compressed',
+            'application/x-bzip2',
+            'application/x-xz',
+        ),
+    )
+
+
+class MetricsSettings(_BaseSettings):
+    enabled: bool = Field(default=True)
+    multiproc_dir: Path = Field(default_factory=lambda: Path(tempfile.gettempdir()) / 'fast-api-template-metrics')
+    latency_buckets: tuple[float, ...] = Field(
+        default=(0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0),
+    )
+
+
+class SentrySettings(_BaseSettings):
+    reporting_mode: SentryReportingMode = Field(default=SentryReportingMode.INLINE)
+    queue_size: int = Field(default=1000, gt=0)
+    sample_rates: dict[str, float] = Field(default_factory=dict)
+    default_sample_rate: float = Field(default=1.0, ge=0, le=1)
+    rate_limits_per_minute: dict[str, int] = Field(default_factory=dict)
+    default_rate_limit_per_minute: int | None = Field(default=None)
+    dedup_window: float = Field(default=60.0, ge=0)
+
+
+class DeadlineSettings(_BaseSettings):
+    enabled: bool = Field(default=True)
+    default_timeout: float | None = Field(default=60.0, gt=0)
+    max_timeout: float = Field(default=300.0, gt=0)
+    header: str = Field(default='X-Request-Timeout')
+    cancel_on_disconnect: bool = Field(default=True)
+    disconnect_watch_delay: float = Field(default=0.05, ge=0)
+
+
+class AdmissionSettings(_BaseSettings):
+    enabled: bool = Field(default=False)
+    adaptive: bool = Field(default=True)
+    initial_limit: int = Field(default=100, ge=1)
+    min_limit: int = Field(default=10, ge=1)
+    max_limit: int = Field(default=1000, ge=1)
+    latency_target: float = Field(default=1.0, gt=0)
+    backoff_ratio: float = Field(default=0.9, gt=0, lt=1)
+    queue_size: int = Field(default=100, ge=0)
+    queue_timeout: float = Field(default=0.1, ge=0)
+    retry_after: int = Field(default=1, ge=0)
+    critical_paths: tuple[str, ...] = Field(default=('/debug/health', '/metrics'))
+    low_priority_paths: tuple[str, ...] = Field(default=())
+    low_priority_share: float = Field(default=0.8, gt=0, le=1)
+
+
+class TracingSettings(_BaseSettings):
+    enabled: bool = Field(default=True)
+    sample_rate: float = Field(default=1.0, ge=0, le=1)
+    access_log_spans: bool = Field(default=True)
+    exporter: SpanExporterKind = Field(default=SpanExporterKind.NONE)
+    otlp_endpoint: str = Field(default='http://localhost:4318/v1/traces')
+    otlp_headers: dict[str, str] = Field(default_factory=dict)
+    otlp_timeout: float = Field(default=10.0, gt=0)
+    file_path: Path = Field(default=Path('../logs/spans.jsonl'))
+    queue_size: int = Field(default=2048, gt=0)
+    batch_size: int = Field(default=512, gt=0)
+    flush_interval: float = Field(default=1.0, gt=0)
+
+
+class HTTPClientSettings(_BaseSettings):
+    max_connections: int = Field(default=100, ge=1)
+    max_connections_per_host: int = Field(default=20, ge=1)
+    max_keepalive_connections: int = Field(default=20, ge=0)
+    keepalive_expiry: float = Field(default=5.0, ge=0)
+    http2: bool = Field(default=False)
+    connect_timeout: float = Field(default=5.0, gt=0)
+    timeout: float = Field(default=30.0, gt=0)
+    pool_timeout: float = Field(default=5.0, gt=0)
+    retries: int = Field(default=2, ge=0)
+    retry_backoff: float = Field(default=0.1, ge=0)
+    retry_backoff_max: float = Field(default=2.0, ge=0)
+    retry_statuses: tuple[int, ...] = Field(default=(429, 502, 503, 504))
+    breaker_failure_threshold: int = Field(default=5, ge=1)
+    breaker_reset_timeout: float = Field(default=30.0, gt=0)
+    log_body_limit: int = Field(default=4096, ge=0)
+    log_redacted_headers: tuple[str, ...] = Field(
+        default=('authorization', 'proxy-authorization', 'cookie', 'set-cookie', 'x-api-key'),
+    )
+
+
+class LoopMonitorSettings(_BaseSettings):
+    enabled: bool = Field(default=True)
+    interval: float = Field(default=0.1, gt=0)
+    slow_callback_threshold: float = Field(default=0.1, gt=0)
+    max_slow_callbacks: int = Field(default=50, ge=0)
+    lag_window: int = Field(default=600, gt=0)
+    lag_buckets: tuple[float, ...] = Field(
+        default=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+    )
+
+
+class ProfilingSettings(_BaseSettings):
+    enabled: bool = Field(default=False)
+    header: str = Field(default='X-Profile')
+    secret: str = Field(default='')
+    allowed_clients: list[str] = Field(default_factory=list)
+    sample_interval: float = Field(default=0.005, gt=0)
+    max_duration: float = Field(default=30.0, gt=0)
+    path: Path = Field(default=Path('../logs/profiles'))
+    max_profiles: int = Field(default=50, ge=0)
+    profile_ttl: float = Field(default=3600.0, gt=0)
 
 
 class TestsSettings(_BaseSettings):
@@ -60,9 +327,20 @@ class TestsSettings(_BaseSettings):
 
 class EnvSettings(_BaseSettings):
     environment: Environment = Field(default=Environment.LOCAL)
-    rest: RESTSettings = RESTSettings(_env_prefix='REST_')
-    logger: LoggerSettings = LoggerSettings(_env_prefix='LOGGER_')
-    tests: TestsSettings = TestsSettings(_env_prefix='TEST')
+    rest: RESTSettings = Field(default_factory=lambda: RESTSettings(_env_prefix='REST_'))
+    logger: LoggerSettings = Field(default_factory=lambda: LoggerSettings(_env_prefix='LOGGER_'))
+    database: DatabaseSettings = Field(default_factory=lambda: DatabaseSettings(_env_prefix='DB_'))
+    cache: CacheSettings = Field(default_factory=lambda: CacheSettings(_env_prefix='CACHE_'))
+    compression: CompressionSettings = Field(default_factory=lambda: CompressionSettings(_env_prefix='COMPRESSION_'))
+    metrics: MetricsSettings = Field(default_factory=lambda: MetricsSettings(_env_prefix='METRICS_'))
+    sentry: SentrySettings = Field(default_factory=lambda: SentrySettings(_env_prefix='SENTRY_'))
+    deadline: DeadlineSettings = Field(default_factory=lambda: DeadlineSettings(_env_prefix='DEADLINE_'))
+    admission: AdmissionSettings = Field(default_factory=lambda: AdmissionSettings(_env_prefix='ADMISSION_'))
+    tracing: TracingSettings = Field(default_factory=lambda: TracingSettings(_env_prefix='TRACING_'))
+    http_client: HTTPClientSettings = Field(default_factory=lambda: HTTPClientSettings(_env_prefix='HTTP_CLIENT_'))
+    loop_monitor: LoopMonitorSettings = Field(default_factory=lambda: LoopMonitorSettings(_env_prefix='LOOP_MONITOR_'))
+    profiling: ProfilingSettings = Field(default_factory=lambda: ProfilingSettings(_env_prefix='PROFILING_'))
+    tests: TestsSettings = Field(default_factory=lambda: TestsSettings(_env_prefix='TEST'))
     postgres_dsn: PostgresDsn = Field()
     redis_dsn: RedisDsn = Field()
     sentry_dsn: str = Field(default='')
@@ -70,13 +348,43 @@ class EnvSettings(_BaseSettings):
 
 
 class Settings(BaseModel):
-    env: EnvSettings = EnvSettings()
+    model_config = ConfigDict(frozen=True)
+
+    env: EnvSettings = Field(default_factory=EnvSettings)
     root_path: DirectoryPath = Path(__file__).parent.parent.resolve()
     logs_path: DirectoryPath = root_path.joinpath('logs')
     trace_id_header: str = Field(default='X-Request-ID')
     sentry_id_header: str = Field(default='X-Sentry-ID')
 
 
+class SettingsSnapshot:
+    __slots__ = ('_settings',)
+
+    def __init__(self, settings: Settings) -> None:
+        self._settings = settings
+
+    @property
+    def current(self) -> Settings:
+        return self._settings
+
+    def swap(self, settings: Settings) -> Settings:
+        previous, self._settings = self._settings, settings
+        return previous
+
+    # only code that reads `current` per call sees the new values (trace id header, error responses,
+    # log redaction); whatever was read at startup stays until a restart: debug flag, the middleware
+    # stack and its settings (compression, admission, profiling, access log sampling), routes, db pool,
+    # http client and the background workers
+    def reload(self) -> Settings:
+        settings = Settings()
+        self.swap(settings)
+        return settings
+
+
 @lru_cache
+def get_settings_snapshot() -> SettingsSnapshot:
+    return SettingsSnapshot(Settings())
+
+
 def get_settings() -> Settings:
-    return Settings()
+    return get_settings_snapshot().current
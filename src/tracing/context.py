@@ -0,0 +1,63 @@
+import re
+from dataclasses import dataclass
+from random import getrandbits
+
+from epyxid import xid_create
+
+# https://www.w3.org/TR/trace-context/#traceparent-header
+_TRACEPARENT = re.compile(r'([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})')
+_INVALID_TRACE_ID = '0' * 32
+_INVALID_SPAN_ID = '0' * 16
+_SAMPLED = 0x01
+_MAX_TRACESTATE_LENGTH = 512
+
+
+# An xid (4 bytes of unix time, machine, pid, counter) plus 32 random bits: ids sort by creation time,
+# stay unique across workers and hosts, and cost a fraction of str(uuid4()).
+def new_trace_id() -> str:
+    return f'{xid_create().as_bytes().hex()}{getrandbits(32):08x}'
+
+
+def new_span_id() -> str:
+    return f'{getrandbits(64) or 1:016x}'
+
+
+@dataclass(frozen=True, slots=True)
+class TraceParent:
+    trace_id: str
+    span_id: str
+    is_sampled: bool
+    tracestate: str | None = None
+
+    def header(self) -> str:
+        return f'00-{self.trace_id}-{self.span_id}-{_SAMPLED if self.is_sampled else 0:02x}'
+
+
+def parse_traceparent(traceparent: str | None, tracestate: str | None = None) -> TraceParent | None:
+    if not traceparent:
+        return None
+    traceparent = traceparent.strip()
+    match = _TRACEPARENT.match(traceparent)
+    if match is None:
+        return None
+    version, trace_id, span_id, flags = match.groups()
+    # future versions may append fields after a dash, version 00 has exactly four
+    rest = traceparent[match.end() :]
+    if version == 'ff' or (rest and (version == '00' or not rest.startswith('-'))):
+        return None
+    if trace_id == _INVALID_TRACE_ID or span_id == _INVALID_SPAN_ID:
+        return None
+    return TraceParent(
+        trace_id=trace_id,
+        span_id=span_id,
+        is_sampled=bool(int(flags, 16) & _SAMPLED),
+        tracestate=_limit_tracestate(tracestate) if tracestate else None,
+    )
+
+
+# members are dropped from the end, cutting one in half would corrupt it
+def _limit_tracestate(tracestate: str) -> str | None:
+    members = [member.strip() for member in tracestate.split(',') if member.strip()]
+    while members and len(','.join(members)) > _MAX_TRACESTATE_LENGTH:
+        members.pop()
+    return ','.join(members) or None
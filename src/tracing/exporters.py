@@ -0,0 +1,206 @@
+import queue
+import threading
+from collections import deque
+from collections.abc import Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from time import monotonic
+from typing import Any, Protocol
+
+import httpx
+from loguru import logger
+from orjson import orjson
+
+from src.settings import SpanExporterKind, TracingSettings
+from src.tracing.spans import Span
+from src.utils import get_project_info
+
+
+class SpanExporter(Protocol):
+    def export(self, spans: Sequence[Span]) -> None: ...
+
+    def shutdown(self) -> None: ...
+
+
+def _attribute(key: str, value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {'key': key, 'value': {'boolValue': value}}
+    if isinstance(value, int):
+        return {'key': key, 'value': {'intValue': str(value)}}
+    if isinstance(value, float):
+        return {'key': key, 'value': {'doubleValue': value}}
+    return {'key': key, 'value': {'stringValue': str(value)}}
+
+
+def _otlp_span(span: Span) -> dict[str, Any]:
+    otlp_span = {
+        'traceId': span.trace_id,
+        'spanId': span.span_id,
+        'name': span.name,
+        'kind': int(span.kind),
+        'startTimeUnixNano': str(span.start_ns),
+        'endTimeUnixNano': str(span.end_ns or span.start_ns),
+        'attributes': [_attribute(key, value) for key, value in span.attributes.items()],
+        # STATUS_CODE_ERROR / STATUS_CODE_UNSET
+        'status': {'code': 2 if span.is_error else 0},
+    }
+    if span.parent_id:
+        otlp_span['parentSpanId'] = span.parent_id
+    return otlp_span
+
+
+# ExportTraceServiceRequest in the OTLP/JSON encoding: ids are hex, 64-bit integers are strings
+def to_otlp(spans: Sequence[Span]) -> dict[str, Any]:
+    project_info = get_project_info()
+    return {
+        'resourceSpans': [
+            {
+                'resource': {
+                    'attributes': [
+                        _attribute('service.name', project_info.title),
+                        _attribute('service.version', project_info.version),
+                    ]
+                },
+                'scopeSpans': [
+                    {
+                        'scope': {'name': project_info.title, 'version': project_info.version},
+                        'spans': [_otlp_span(span) for span in spans],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+# OTLP/HTTP with the JSON encoding, accepted by the OpenTelemetry Collector, Jaeger and Tempo on :4318
+class OTLPHttpSpanExporter:
+    def __init__(self, endpoint: str, headers: dict[str, str], timeout: float) -> None:
+        self.endpoint = endpoint
+        self._client = httpx.Client(headers={**headers, 'Content-Type': 'application/json'}, timeout=timeout)
+
+    def export(self, spans: Sequence[Span]) -> None:
+        self._client.post(self.endpoint, content=orjson.dumps(to_otlp(spans))).raise_for_status()
+
+    def shutdown(self) -> None:
+        self._client.close()
+
+
+# One ExportTraceServiceRequest per line, the format of the Collector's file exporter
+class FileSpanExporter:
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = path.open('ab')
+
+    def export(self, spans: Sequence[Span]) -> None:
+        self._file.write(orjson.dumps(to_otlp(spans)) + b'\n')
+        self._file.flush()
+
+    def shutdown(self) -> None:
+        self._file.close()
+
+
+class InMemorySpanExporter:
+    def __init__(self, max_spans: int = 10_000) -> None:
+        self.spans: deque[Span] = deque(maxlen=max_spans)
+
+    def export(self, spans: Sequence[Span]) -> None:
+        self.spans.extend(spans)
+
+    def shutdown(self) -> None:
+        pass
+
+
+def make_span_exporter(settings: TracingSettings) -> SpanExporter | None:
+    match settings.exporter:
+        case SpanExporterKind.OTLP:
+            return OTLPHttpSpanExporter(settings.otlp_endpoint, settings.otlp_headers, settings.otlp_timeout)
+        case SpanExporterKind.FILE:
+            return FileSpanExporter(settings.file_path)
+        case SpanExporterKind.MEMORY:
+            return InMemorySpanExporter()
+    return None
+
+
+@dataclass
+class SpanBatchExporterStats:
+    enqueued: int = 0
+    exported: int = 0
+    dropped: int = 0
+    failed: int = 0
+
+
+# Finished traces are queued without blocking and exported in batches of up to `batch_size` spans
+# from a daemon thread, at least every `flush_interval`. A full queue drops the new trace.
+class SpanBatchExporter:
+    def __init__(self) -> None:
+        self.stats = SpanBatchExporterStats()
+        self.settings: TracingSettings | None = None
+        self.exporter: SpanExporter | None = None
+        self._queue: queue.Queue[list[Span] | None] | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def size(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def start(self, settings: TracingSettings, exporter: SpanExporter) -> None:
+        if self.is_running:
+            return
+        self.settings = settings
+        self.exporter = exporter
+        self._queue = queue.Queue(maxsize=settings.queue_size)
+        self._thread = threading.Thread(target=self._run, name='span-exporter', daemon=True)
+        self._thread.start()
+
+    def stop(self, drain_timeout: float = 5.0) -> None:
+        if not self.is_running:
+            return
+        try:
+            self._queue.put(None, timeout=drain_timeout)
+        except queue.Full:
+            logger.warning('Span export queue is still full, {} traces are lost', self._queue.qsize())
+        self._thread.join(timeout=drain_timeout)
+        self._thread = None
+        self.exporter.shutdown()
+
+    def submit(self, spans: list[Span]) -> None:
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            self.stats.dropped += len(spans)
+            return
+        self.stats.enqueued += len(spans)
+
+    def _run(self) -> None:
+        batch: list[Span] = []
+        flush_at = monotonic() + self.settings.flush_interval
+        is_stopping = False
+        while not is_stopping:
+            try:
+                spans = self._queue.get(timeout=max(flush_at - monotonic(), 0.0))
+            except queue.Empty:
+                spans = []
+            if spans is None:
+                is_stopping = True
+            else:
+                batch.extend(spans)
+            if batch and (is_stopping or len(batch) >= self.settings.batch_size or monotonic() >= flush_at):
+                self._export(batch)
+                batch = []
+            if monotonic() >= flush_at:
+                flush_at = monotonic() + self.settings.flush_interval
+
+    def _export(self, batch: list[Span]) -> None:
+        try:
+            self.exporter.export(batch)
+            self.stats.exported += len(batch)
+        except Exception as exc:  # noqa: BLE001
+            self.stats.failed += len(batch)
+            logger.warning('Failed to export {} spans: {!r}', len(batch), exc)
+
+
+span_exporter = SpanBatchExporter()
@@ -0,0 +1,153 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import IntEnum
+from time import time_ns
+from typing import Any
+
+from src.tracing.context import new_span_id, new_trace_id, TraceParent
+from src.utils import trace_sample_point
+
+
+# values of the OTLP SpanKind enum
+class SpanKind(IntEnum):
+    INTERNAL = 1
+    SERVER = 2
+    CLIENT = 3
+
+
+@dataclass(slots=True)
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    kind: SpanKind
+    start_ns: int
+    end_ns: int | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    is_error: bool = False
+
+    @property
+    def duration(self) -> float | None:
+        return None if self.end_ns is None else (self.end_ns - self.start_ns) / 1e9
+
+    def end(self, end_ns: int | None = None) -> None:
+        if self.end_ns is None:
+            self.end_ns = end_ns or time_ns()
+
+
+# Every span of one request, rooted at the server span TraceIdMiddleware opens. Spans are kept in start order
+# and handed to the exporter together once the response is sent.
+class RequestTrace:
+    __slots__ = ('is_sampled', 'root', 'spans', 'trace_id', 'tracestate')
+
+    def __init__(self, name: str, parent: TraceParent | None, sample_rate: float) -> None:
+        if parent is None:
+            self.trace_id = new_trace_id()
+            self.is_sampled = trace_sample_point(self.trace_id) < sample_rate
+            self.tracestate = None
+        else:
+            self.trace_id = parent.trace_id
+            self.is_sampled = parent.is_sampled
+            self.tracestate = parent.tracestate
+        self.root = Span(
+            name=name,
+            trace_id=self.trace_id,
+            span_id=new_span_id(),
+            parent_id=parent.span_id if parent else None,
+            kind=SpanKind.SERVER,
+            start_ns=time_ns(),
+        )
+        self.spans = [self.root]
+
+    def start_span(
+        self,
+        name: str,
+        *,
+        kind: SpanKind = SpanKind.INTERNAL,
+        parent: Span | None = None,
+        start_ns: int | None = None,
+        attributes: dict[str, Any] | None = None,
+    ) -> Span:
+        span = Span(
+            name=name,
+            trace_id=self.trace_id,
+            span_id=new_span_id(),
+            parent_id=(parent or self.root).span_id,
+            kind=kind,
+            start_ns=start_ns or time_ns(),
+            attributes=attributes or {},
+        )
+        self.spans.append(span)
+        return span
+
+    def find(self, name: str) -> Span | None:
+        return next((span for span in reversed(self.spans) if span.name == name), None)
+
+    def traceparent(self, span: Span | None = None) -> TraceParent:
+        return TraceParent(
+            trace_id=self.trace_id,
+            span_id=(span or self.root).span_id,
+            is_sampled=self.is_sampled,
+            tracestate=self.tracestate,
+        )
+
+    # the root is still open while the access log is written, its duration is processing_time there
+    def as_access_log(self) -> dict[str, Any]:
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.root.span_id,
+            'parent_span_id': self.root.parent_id,
+            'spans': [
+                {
+                    'name': span.name,
+                    'span_id': span.span_id,
+                    'parent_span_id': span.parent_id,
+                    'offset': (span.start_ns - self.root.start_ns) / 1e9,
+                    'duration': span.duration,
+                }
+                for span in self.spans[1:]
+                if span.end_ns is not None
+            ],
+        }
+
+
+CURRENT_TRACE: ContextVar[RequestTrace | None] = ContextVar('CurrentTrace', default=None)
+CURRENT_SPAN: ContextVar[Span | None] = ContextVar('CurrentSpan', default=None)
+
+
+# A child of the current span, or of the request's root span. Outside a traced request it records nothing.
+@contextmanager
+def start_span(
+    name: str,
+    *,
+    kind: SpanKind = SpanKind.INTERNAL,
+    attributes: dict[str, Any] | None = None,
+) -> Iterator[Span | None]:
+    if (trace := CURRENT_TRACE.get()) is None:
+        yield None
+        return
+
+    span = trace.start_span(name, kind=kind, parent=CURRENT_SPAN.get(), attributes=attributes)
+    token = CURRENT_SPAN.set(span)
+    try:
+        yield span
+    except BaseException:
+        span.is_error = True
+        raise
+    finally:
+        span.end()
+        CURRENT_SPAN.reset(token)
+
+
+# traceparent/tracestate for an outgoing request, parented to the current span
+def get_propagation_headers() -> dict[str, str]:
+    if (trace := CURRENT_TRACE.get()) is None:
+        return {}
+    traceparent = trace.traceparent(CURRENT_SPAN.get())
+    headers = {'traceparent': traceparent.header()}
+    if traceparent.tracestate:
+        headers['tracestate'] = traceparent.tracestate
+    return headers
@@ -2,16 +2,54 @@ from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 
-from src.settings import Settings
-from src.transport.rest.handlers.debug.handlers import debug_router
+from src.metrics.http import get_http_metrics
+from src.settings import Environment, get_settings, SettingsSnapshot
+from src.transport.rest.admission import AdmissionController
+from src.transport.rest.constants import SKIP_MIDDLEWARE_PATHS
+from src.transport.rest.handlers.debug.handlers import debug_logs_router, debug_router
+from src.transport.rest.handlers.metrics.handlers import get_metrics_handler
+from src.transport.rest.middlewares.admission_middleware import AdmissionMiddleware
+from src.transport.rest.middlewares.compression_middleware import CompressionMiddleware
 from src.transport.rest.middlewares.errors_handler_middleware import ErrorsHandlerMiddleware
+from src.transport.rest.middlewares.fast_path_middleware import FastPathMiddleware
+from src.transport.rest.middlewares.metrics_middleware import MetricsMiddleware
+from src.transport.rest.middlewares.profiling_middleware import ProfilingMiddleware
 from src.transport.rest.middlewares.trace_id_middleware import TraceIdMiddleware
+from src.transport.rest.openapi import init_openapi
+from src.transport.rest.profiling import ProfileStore
 
 
-def init_middlewares(app: FastAPI, settings: Settings) -> None:
-    app.add_middleware(ErrorsHandlerMiddleware, is_debug=settings.env.debug)  # type: ignore
+def init_middlewares(app: FastAPI, settings_snapshot: SettingsSnapshot) -> None:
+    settings = settings_snapshot.current
+    app.state.settings_snapshot = settings_snapshot
+    app.add_middleware(
+        ErrorsHandlerMiddleware,  # type: ignore
+        is_debug=settings.env.debug,
+        settings_snapshot=settings_snapshot,
+    )
     app.add_middleware(SessionMiddleware, secret_key=settings.env.rest.session_secret_key)  # type: ignore
-    app.add_middleware(TraceIdMiddleware)  # type: ignore
+
+    if settings.env.profiling.enabled:
+        app.state.profile_store = ProfileStore(
+            path=settings.env.profiling.path,
+            max_profiles=settings.env.profiling.max_profiles,
+            ttl=settings.env.profiling.profile_ttl,
+        )
+        app.add_middleware(
+            ProfilingMiddleware,  # type: ignore
+            settings=settings.env.profiling,
+            store=app.state.profile_store,
+        )
+
+    if settings.env.admission.enabled:
+        app.state.admission_controller = AdmissionController(settings.env.admission)
+        app.add_middleware(
+            AdmissionMiddleware,  # type: ignore
+            controller=app.state.admission_controller,
+            is_debug=settings.env.debug,
+            settings_snapshot=settings_snapshot,
+        )
+    app.add_middleware(TraceIdMiddleware, settings_snapshot=settings_snapshot)  # type: ignore
 
     app.add_middleware(
         CORSMiddleware,  # type: ignore
@@ -21,6 +59,22 @@ def init_middlewares(app: FastAPI, settings: Settings) -> None:
         allow_headers=['*'],
     )
 
+    if settings.env.compression.enabled:
+        app.add_middleware(CompressionMiddleware, settings=settings.env.compression)  # type: ignore
+
+    if settings.env.metrics.enabled:
+        app.add_middleware(MetricsMiddleware, http_metrics=get_http_metrics())  # type: ignore
+
+    app.add_middleware(FastPathMiddleware, router=app.router, paths=SKIP_MIDDLEWARE_PATHS)  # type: ignore
+
 
 def init_api_routes(app: FastAPI):
     app.include_router(debug_router)
+    if get_settings().env.environment != Environment.PROD:
+        app.include_router(debug_logs_router)
+
+    if get_settings().env.metrics.enabled:
+        app.add_route('/metrics', get_metrics_handler, include_in_schema=False)
+
+
+__all__ = ['init_api_routes', 'init_middlewares', 'init_openapi']
@@ -0,0 +1,149 @@
+"""Admission control: a per-worker concurrency limit with a short wait queue and route priority classes.
+
+Requests over the limit wait up to `queue_timeout` in a bounded FIFO queue and are shed with a 503 after
+that, so under overload latency stays bounded by the limit instead of growing with the backlog on the loop.
+
+With `adaptive` the limit follows observed latency (AIMD, as in TCP congestion control): a request that
+finished within `latency_target` while at least half the limit was in use raises it by one, a slower one
+multiplies it by `backoff_ratio`. Requests admitted together finish slow together, so the limit backs off
+at most once per `latency_target`.
+"""
+
+import asyncio
+from collections import Counter, deque
+from contextlib import suppress
+from enum import auto, StrEnum
+from time import monotonic
+from typing import Any
+
+from src.settings import AdmissionSettings
+
+
+class Priority(StrEnum):
+    CRITICAL = auto()  # bypasses the limit: probes and metrics are never shed
+    NORMAL = auto()
+    LOW = auto()  # never queued, limited to `low_priority_share` of the limit
+
+
+class AIMDLimit:
+    def __init__(
+        self,
+        *,
+        initial: int,
+        min_limit: int,
+        max_limit: int,
+        latency_target: float,
+        backoff_ratio: float,
+    ) -> None:
+        self.min_limit = min_limit
+        self.max_limit = max(max_limit, min_limit)
+        self.value = min(max(initial, self.min_limit), self.max_limit)
+        self.latency_target = latency_target
+        self.backoff_ratio = backoff_ratio
+        self._backoff_at = -latency_target
+
+    def on_sample(self, latency: float, in_flight: int) -> None:
+        if latency > self.latency_target:
+            now = monotonic()
+            if now - self._backoff_at >= self.latency_target:
+                self._backoff_at = now
+                self.value = max(self.min_limit, int(self.value * self.backoff_ratio))
+        # an idle worker says nothing about how much more it could take
+        elif in_flight * 2 >= self.value:
+            self.value = min(self.max_limit, self.value + 1)
+
+
+class AdmissionController:
+    def __init__(self, settings: AdmissionSettings) -> None:
+        self.settings = settings
+        self.limit = AIMDLimit(
+            initial=settings.initial_limit,
+            min_limit=settings.min_limit if settings.adaptive else settings.initial_limit,
+            max_limit=settings.max_limit if settings.adaptive else settings.initial_limit,
+            latency_target=settings.latency_target,
+            backoff_ratio=settings.backoff_ratio,
+        )
+        self.in_flight = 0
+        self.admitted = 0
+        self.queued = 0
+        self.shed: Counter[str] = Counter()
+        self._waiters: deque[asyncio.Future[None]] = deque()
+        self._critical_paths = tuple(settings.critical_paths)
+        self._low_priority_paths = tuple(settings.low_priority_paths)
+
+    def priority(self, path: str) -> Priority:
+        if path.startswith(self._critical_paths):
+            return Priority.CRITICAL
+        if path.startswith(self._low_priority_paths):
+            return Priority.LOW
+        return Priority.NORMAL
+
+    async def acquire(self, priority: Priority) -> bool:
+        if priority is Priority.LOW:
+            if self.in_flight < self.limit.value * self.settings.low_priority_share and not self._waiters:
+                return self._admit()
+            self.shed['low_priority'] += 1
+            return False
+
+        if self.in_flight < self.limit.value and not self._waiters:
+            return self._admit()
+        if len(self._waiters) >= self.settings.queue_size:
+            self.shed['queue_full'] += 1
+            return False
+        return await self._wait()
+
+    def release(self, latency: float) -> None:
+        if self.settings.adaptive:
+            self.limit.on_sample(latency, self.in_flight)
+        self._release_slot()
+
+    def _release_slot(self) -> None:
+        self.in_flight -= 1
+        # slots are handed to waiters directly, so a newcomer cannot take one from the head of the queue
+        while self._waiters and self.in_flight < self.limit.value:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _admit(self) -> bool:
+        self.in_flight += 1
+        self.admitted += 1
+        return True
+
+    async def _wait(self) -> bool:
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        try:
+            async with asyncio.timeout(self.settings.queue_timeout):
+                await waiter
+        except TimeoutError:
+            # the slot may have been handed over right as the timeout fired
+            if waiter.cancelled():
+                self._discard(waiter)
+                self.shed['queue_timeout'] += 1
+                return False
+        except asyncio.CancelledError:
+            if waiter.cancelled():
+                self._discard(waiter)
+            else:
+                self._release_slot()
+            raise
+        self.admitted += 1
+        return True
+
+    # a releaser may have popped the cancelled waiter already
+    def _discard(self, waiter: asyncio.Future[None]) -> None:
+        with suppress(ValueError):
+            self._waiters.remove(waiter)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            'limit': self.limit.value,
+            'in_flight': self.in_flight,
+            'waiting': len(self._waiters),
+            'admitted': self.admitted,
+            'queued': self.queued,
+            'shed': dict(self.shed),
+        }
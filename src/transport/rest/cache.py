@@ -0,0 +1,161 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Sequence
+from dataclasses import dataclass
+from hashlib import blake2b
+from typing import TypeVar
+
+from orjson import orjson
+from redis.asyncio import Redis
+from starlette.requests import Request
+from starlette.responses import Response
+
+from src.cache.lru import LRUCache
+from src.cache.two_tier import TwoTierCache
+from src.settings import CacheSettings
+from src.transport.rest.content_negotiation import JSON, RESPONSE_MEDIA_TYPE
+
+CACHEABLE_METHODS = frozenset({'GET', 'HEAD'})
+CACHEABLE_STATUS_CODES = frozenset({200, 203})
+NOT_FORWARDED_HEADERS = frozenset({b'content-length', b'set-cookie'})
+
+EndpointT = TypeVar('EndpointT', bound=Callable)
+
+
+@dataclass(frozen=True, slots=True)
+class CachedResponse:
+    status_code: int
+    headers: tuple[tuple[bytes, bytes], ...]
+    body: bytes
+    etag: str
+
+    @classmethod
+    def from_response(cls, response: Response) -> 'CachedResponse':
+        headers = tuple((key, value) for key, value in response.raw_headers if key not in NOT_FORWARDED_HEADERS)
+        return cls(
+            status_code=response.status_code,
+            headers=headers,
+            body=response.body,
+            etag=f'"{blake2b(response.body, digest_size=16).hexdigest()}"',
+        )
+
+    def encode(self) -> bytes:
+        meta = orjson.dumps(
+            {
+                'status_code': self.status_code,
+                'headers': [[key.decode('latin-1'), value.decode('latin-1')] for key, value in self.headers],
+                'etag': self.etag,
+            }
+        )
+        return meta + b'\n' + self.body
+
+    @classmethod
+    def decode(cls, raw: bytes) -> 'CachedResponse':
+        meta, body = raw.split(b'\n', 1)
+        data = orjson.loads(meta)
+        return cls(
+            status_code=data['status_code'],
+            headers=tuple((key.encode('latin-1'), value.encode('latin-1')) for key, value in data['headers']),
+            body=body,
+            etag=data['etag'],
+        )
+
+    def to_response(self, request: Request, *, is_hit: bool) -> Response:
+        if request.headers.get('if-none-match') in {self.etag, f'W/{self.etag}', '*'}:
+            response = Response(status_code=304)
+        else:
+            response = Response(content=self.body, status_code=self.status_code)
+            response.raw_headers.extend(self.headers)
+        response.headers['ETag'] = self.etag
+        response.headers['X-Cache'] = 'HIT' if is_hit else 'MISS'
+        return response
+
+
+class ResponseCache(TwoTierCache[CachedResponse]):
+    def __init__(self, local: LRUCache[CachedResponse], redis: Redis | None, key_prefix: str) -> None:
+        super().__init__(
+            local=local,
+            redis=redis,
+            key_prefix=key_prefix,
+            encode=CachedResponse.encode,
+            decode=CachedResponse.decode,
+        )
+        self.inflight: dict[str, asyncio.Future[CachedResponse | None]] = {}
+
+    @classmethod
+    def from_settings(cls, settings: CacheSettings, redis_dsn: str) -> 'ResponseCache':
+        if settings.use_fakeredis:
+            from fakeredis import FakeAsyncRedis  # noqa: PLC0415
+
+            redis = FakeAsyncRedis()
+        else:
+            redis = Redis.from_url(redis_dsn)
+        return cls(local=LRUCache(max_entries=settings.local_max_entries), redis=redis, key_prefix=settings.key_prefix)
+
+    async def close(self) -> None:
+        if self.redis is not None:
+            await self.redis.aclose()
+
+
+class RouteCache:
+    def __init__(
+        self,
+        ttl: float,
+        vary_headers: Sequence[str] = (),
+    ) -> None:
+        self.ttl = ttl
+        self.vary_headers = tuple(sorted(header.lower() for header in vary_headers))
+
+    def make_key(self, request: Request) -> str:
+        key_hash = blake2b(digest_size=16)
+        key_hash.update(request.url.path.encode())
+        if (media_type := RESPONSE_MEDIA_TYPE.get()) != JSON:
+            key_hash.update(b'\x02' + media_type.encode())
+        for param, value in sorted(request.query_params.multi_items()):
+            key_hash.update(b'\x00' + param.encode() + b'=' + value.encode())
+        for header in self.vary_headers:
+            key_hash.update(b'\x01' + header.encode() + b'=' + request.headers.get(header, '').encode())
+        route = request.scope.get('route')
+        return f'{route.path if route else request.url.path}:{key_hash.hexdigest()}'
+
+    async def __call__(
+        self,
+        request: Request,
+        call_next: Callable[[Request], Awaitable[Response]],
+    ) -> Response:
+        cache: ResponseCache | None = getattr(request.app.state, 'response_cache', None)
+        if cache is None or request.method not in CACHEABLE_METHODS:
+            return await call_next(request)
+
+        key = self.make_key(request)
+        if (entry := await cache.get(key)) is not None:
+            return entry.to_response(request, is_hit=True)
+
+        if (pending := cache.inflight.get(key)) is not None:
+            if (entry := await asyncio.shield(pending)) is not None:
+                return entry.to_response(request, is_hit=True)
+            return await call_next(request)
+
+        future = asyncio.get_running_loop().create_future()
+        cache.inflight[key] = future
+        entry = None
+        try:
+            response = await call_next(request)
+            if response.status_code in CACHEABLE_STATUS_CODES and not hasattr(response, 'body_iterator'):
+                entry = CachedResponse.from_response(response)
+                await cache.set(key, entry, self.ttl)
+        finally:
+            future.set_result(entry)
+            del cache.inflight[key]
+
+        return entry.to_response(request, is_hit=False) if entry else response
+
+
+def cached(
+    ttl: float,
+    vary_headers: Sequence[str] = (),
+) -> Callable[[EndpointT], EndpointT]:
+    def decorator(endpoint: EndpointT) -> EndpointT:
+        endpoint.__route_cache__ = RouteCache(ttl=ttl, vary_headers=vary_headers)
+        return endpoint
+
+    return decorator
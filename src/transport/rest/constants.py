@@ -1,6 +1,5 @@
-SKIP_MIDDLEWARE_PATHS = ('/healthcheck', '/api/docs', '/redoc', '/api/openapi.json', '/metrics')
+# Liveness, readiness, metrics and docs: dispatched in front of the middleware stack and never access-logged
+SKIP_MIDDLEWARE_PATHS = frozenset({'/debug/health', '/metrics', '/docs', '/redoc', '/openapi.json'})
 
 LOGGING_REQUEST_METHODS_WITHOUT_BODY = {'GET', 'DELETE'}
-LOGGING_SUBSTRINGS_OF_ROUTES_FOR_SKIP = (
-    'metrics',
-)
+LOGGING_ROUTES_FOR_SKIP = SKIP_MIDDLEWARE_PATHS
@@ -0,0 +1,150 @@
+import threading
+import zlib
+from collections.abc import Sequence
+from functools import lru_cache
+from typing import Protocol
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+IDENTITY = 'identity'
+GZIP = 'gzip'
+BROTLI = 'br'
+ZSTD = 'zstd'
+
+# server preference when the client weighs several codings the same
+AVAILABLE_ENCODINGS: tuple[str, ...] = tuple(
+    encoding
+    for encoding, is_available in ((ZSTD, zstandard is not None), (BROTLI, brotli is not None), (GZIP, True))
+    if is_available
+)
+MAX_LEVELS = {GZIP: 9, BROTLI: 11, ZSTD: 19}
+# 256 KiB: the default 4 MiB window costs more to set up than compressing a typical response body
+BROTLI_LGWIN = 18
+
+_local = threading.local()
+
+
+class Compressor(Protocol):
+    def compress(self, data: bytes) -> bytes: ...
+
+    # everything passed so far, decodable by the client without waiting for the rest of the stream
+    def flush(self) -> bytes: ...
+
+    def finish(self) -> bytes: ...
+
+
+class _GzipCompressor:
+    __slots__ = ('_compressor',)
+
+    def __init__(self, level: int) -> None:
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliCompressor:
+    __slots__ = ('_compressor',)
+
+    def __init__(self, level: int) -> None:
+        self._compressor = brotli.Compressor(quality=level, lgwin=BROTLI_LGWIN)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class _ZstdCompressor:
+    __slots__ = ('_compressor',)
+
+    def __init__(self, level: int) -> None:
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+_COMPRESSORS: dict[str, type[Compressor]] = {GZIP: _GzipCompressor, BROTLI: _BrotliCompressor, ZSTD: _ZstdCompressor}
+
+
+@lru_cache(maxsize=256)
+def parse_accept_encoding(header: str) -> dict[str, float]:
+    weights: dict[str, float] = {}
+    for item in header.split(','):
+        coding, *params = item.split(';')
+        if not (coding := coding.strip().lower()):
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        weights[coding] = quality
+    return weights
+
+
+def choose_encoding(accept_encoding: str | None, offered: Sequence[str] = AVAILABLE_ENCODINGS) -> str:
+    if not accept_encoding:
+        return IDENTITY
+    weights = parse_accept_encoding(accept_encoding)
+    wildcard = weights.get('*', 0.0)
+    best, best_quality = IDENTITY, 0.0
+    for coding in offered:
+        if (quality := weights.get(coding, wildcard)) > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def make_compressor(encoding: str, level: int) -> Compressor:
+    if encoding not in AVAILABLE_ENCODINGS:
+        raise ValueError(f'Unsupported content encoding: {encoding}')
+    return _COMPRESSORS[encoding](level)
+
+
+# a ZstdCompressor takes ~70 us to set up and can be reused for one-shot calls, but not shared between threads
+def _zstd_compressor(level: int) -> 'zstandard.ZstdCompressor':
+    if (compressors := getattr(_local, 'zstd_compressors', None)) is None:
+        compressors = _local.zstd_compressors = {}
+    if (compressor := compressors.get(level)) is None:
+        compressor = compressors[level] = zstandard.ZstdCompressor(level=level)
+    return compressor
+
+
+# whole bodies; streamed ones go through make_compressor
+def compress(data: bytes, encoding: str, level: int | None = None) -> bytes:
+    if encoding not in AVAILABLE_ENCODINGS:
+        raise ValueError(f'Unsupported content encoding: {encoding}')
+    level = MAX_LEVELS[encoding] if level is None else level
+    if encoding == GZIP:
+        return zlib.compress(data, level, wbits=31)
+    if encoding == BROTLI:
+        return brotli.compress(data, quality=level, lgwin=BROTLI_LGWIN)
+    return _zstd_compressor(level).compress(data)
@@ -0,0 +1,146 @@
+from collections.abc import Awaitable, Callable
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any
+
+from fastapi.responses import ORJSONResponse
+from starlette.background import BackgroundTask
+from starlette.datastructures import Headers
+from starlette.requests import Request
+from starlette.responses import Response
+
+from src.transport.rest.errors import RequestValidationError
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+JSON = 'application/json'
+MSGPACK = 'application/msgpack'
+CBOR = 'application/cbor'
+
+# JSON first: it wins ties, so `*/*` and a missing Accept keep the old behaviour
+AVAILABLE_MEDIA_TYPES: tuple[str, ...] = tuple(
+    media_type
+    for media_type, is_available in ((JSON, True), (MSGPACK, msgpack is not None), (CBOR, cbor2 is not None))
+    if is_available
+)
+BINARY_MEDIA_TYPES = frozenset(AVAILABLE_MEDIA_TYPES) - {JSON}
+_ALIASES = {'application/x-msgpack': MSGPACK, 'application/vnd.msgpack': MSGPACK}
+_DECODE_ERRORS: tuple[type[Exception], ...] = (ValueError, cbor2.CBORError) if cbor2 is not None else (ValueError,)
+
+# set per request by negotiate_content, read by NegotiatedResponse when FastAPI renders the handler result
+RESPONSE_MEDIA_TYPE: ContextVar[str] = ContextVar('ResponseMediaType', default=JSON)
+
+
+def normalize_media_type(content_type: str | None) -> str | None:
+    if not content_type:
+        return None
+    media_type = content_type.partition(';')[0].strip().lower()
+    return _ALIASES.get(media_type, media_type)
+
+
+@lru_cache(maxsize=256)
+def choose_media_type(accept: str | None) -> str:
+    if not accept:
+        return JSON
+    weights: dict[str, float] = {}
+    for item in accept.split(','):
+        media_type, *params = item.split(';')
+        if not (media_type := normalize_media_type(media_type)):
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        weights[media_type] = quality
+
+    wildcard = weights.get('application/*', weights.get('*/*', 0.0))
+    best, best_quality = JSON, 0.0
+    for media_type in AVAILABLE_MEDIA_TYPES:
+        if (quality := weights.get(media_type, wildcard)) > best_quality:
+            best, best_quality = media_type, quality
+    return best
+
+
+def encode_body(content: Any, media_type: str) -> bytes:
+    if media_type == MSGPACK:
+        return msgpack.packb(content)
+    if media_type == CBOR:
+        return cbor2.dumps(content)
+    raise ValueError(f'Unsupported media type: {media_type}')
+
+
+def decode_body(body: bytes, media_type: str) -> Any:
+    try:
+        if media_type == MSGPACK:
+            return msgpack.unpackb(body)
+        if media_type == CBOR:
+            return cbor2.loads(body)
+    except _DECODE_ERRORS as exc:
+        raise ValueError(f'Invalid {media_type} body: {exc}') from exc
+    raise ValueError(f'Unsupported media type: {media_type}')
+
+
+# ORJSONResponse unless the request asked for a binary format, so openapi and existing clients see JSON
+class NegotiatedResponse(ORJSONResponse):
+    def __init__(
+        self,
+        content: Any,
+        status_code: int = 200,
+        headers: dict[str, str] | None = None,
+        media_type: str | None = None,
+        background: BackgroundTask | None = None,
+    ) -> None:
+        super().__init__(content, status_code, headers, media_type or RESPONSE_MEDIA_TYPE.get(), background)
+
+    def render(self, content: Any) -> bytes:
+        if self.media_type in BINARY_MEDIA_TYPES:
+            return encode_body(content, self.media_type)
+        return super().render(content)
+
+
+def _as_json_request(request: Request, body: bytes, content: Any) -> Request:
+    decoded_request = Request(request.scope, request.receive)
+    decoded_request._body = body  # noqa: SLF001
+    decoded_request._json = content  # noqa: SLF001
+    decoded_request._headers = Headers(  # noqa: SLF001
+        raw=[(key, JSON.encode() if key == b'content-type' else value) for key, value in request.scope['headers']]
+    )
+    return decoded_request
+
+
+# FastAPI only parses JSON bodies, so a binary body is decoded here and handed over as an already parsed JSON
+# request; the original request object keeps its headers for the access log.
+async def negotiate_content(
+    request: Request,
+    call_next: Callable[[Request], Awaitable[Response]],
+    *,
+    decode_request_body: bool,
+) -> Response:
+    RESPONSE_MEDIA_TYPE.set(choose_media_type(request.headers.get('accept')))
+
+    if decode_request_body and (media_type := normalize_media_type(request.headers.get('content-type'))) in (
+        BINARY_MEDIA_TYPES
+    ):
+        body = await request.body()
+        try:
+            content = decode_body(body, media_type)
+        except ValueError as exc:
+            raise RequestValidationError(debug=str(exc)) from exc
+        request = _as_json_request(request, body, content)
+
+    response = await call_next(request)
+    if BINARY_MEDIA_TYPES:
+        response.headers.add_vary_header('Accept')
+    return response
@@ -0,0 +1,160 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+from contextlib import suppress
+from time import monotonic
+from typing import TypeVar
+
+from starlette.requests import ClientDisconnect, Request
+from starlette.responses import Response
+from starlette.types import Message, Receive
+
+from src.settings import DeadlineSettings
+from src.transport.rest.errors import ClientDisconnectedError, RequestTimeoutError, ServerError
+from src.utils import DEADLINE
+
+EndpointT = TypeVar('EndpointT', bound=Callable)
+
+_NOT_SET = object()
+
+
+# The time budget of one handler call and the watch for the client going away share a single timer: it fires
+# `watch_delay` in to start watching and again at the deadline, so a fast request arms one timer and starts no
+# task. Expiring cancels the handler's task the way asyncio.timeout() does.
+#
+# Until the watch starts the handler reads the body straight from the server. After that a watcher task is the
+# only reader of the receive channel: body messages are passed on one at a time and `http.disconnect` is seen
+# as soon as the server sends it, even when nothing reads the body.
+class _RequestDeadline:
+    def __init__(self, receive: Receive, budget: float | None, watch_delay: float | None) -> None:
+        self.error: type[ServerError] | None = None
+        self._receive = receive
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.current_task()
+        self._cancelling = self._task.cancelling()
+        now = self._loop.time()
+        self._deadline_at = None if budget is None else now + budget
+        self._watch_at = None if watch_delay is None else now + watch_delay
+        self._messages: asyncio.Queue[Message] | None = None
+        self._watcher: asyncio.Task | None = None
+        self._is_receiving = False
+        self._timer: asyncio.TimerHandle | None = None
+        self._arm()
+
+    def _arm(self) -> None:
+        when = min((at for at in (self._deadline_at, self._watch_at) if at is not None), default=None)
+        self._timer = None if when is None else self._loop.call_at(when, self._on_timer)
+
+    def _on_timer(self) -> None:
+        if self._deadline_at is not None and self._loop.time() >= self._deadline_at:
+            self._expire(RequestTimeoutError)
+            return
+        self._watch_at = None
+        # two readers must not share the channel, the watch starts once the handler's read returns
+        if not self._is_receiving:
+            self._start_watch()
+        self._arm()
+
+    def _start_watch(self) -> None:
+        self._messages = asyncio.Queue(maxsize=1)
+        self._watcher = asyncio.create_task(self._watch())
+
+    def _expire(self, error: type[ServerError]) -> None:
+        if self.error is None:
+            self.error = error
+            self._task.cancel()
+
+    # whether a CancelledError is ours alone and becomes `error`, as asyncio.timeout() decides on TimeoutError
+    def is_expired(self) -> bool:
+        return self.error is not None and self._task.uncancel() <= self._cancelling
+
+    async def _watch(self) -> None:
+        while True:
+            message = await self._receive()
+            if message['type'] == 'http.disconnect':
+                self._expire(ClientDisconnectedError)
+                # wakes a handler waiting for the body, a queued body message is read first
+                with suppress(asyncio.QueueFull):
+                    self._messages.put_nowait(message)
+                return
+            await self._messages.put(message)
+
+    async def receive(self) -> Message:
+        if self._messages is None:
+            self._is_receiving = True
+            try:
+                return await self._receive()
+            finally:
+                self._is_receiving = False
+                if self._watch_at is None:
+                    self._start_watch()
+        if self.error is ClientDisconnectedError and self._messages.empty():
+            return {'type': 'http.disconnect'}
+        return await self._messages.get()
+
+    def close(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        if self._watcher is not None:
+            self._watcher.cancel()
+
+
+class RouteDeadline:
+    def __init__(
+        self,
+        timeout: float | None,
+        settings: DeadlineSettings,
+    ) -> None:
+        self.timeout = timeout
+        self.settings = settings
+        self.watch_delay = settings.disconnect_watch_delay if settings.cancel_on_disconnect else None
+
+    # a client can only shorten its deadline; on a route without one it is capped by max_timeout
+    def get_budget(self, request: Request) -> float | None:
+        if value := request.headers.get(self.settings.header):
+            with suppress(ValueError):
+                if (budget := float(value)) > 0:
+                    return min(budget, self.settings.max_timeout if self.timeout is None else self.timeout)
+        return self.timeout
+
+    async def __call__(
+        self,
+        request: Request,
+        call_next: Callable[[Request], Awaitable[Response]],
+    ) -> Response:
+        budget = self.get_budget(request)
+        if budget is None and self.watch_delay is None:
+            return await call_next(request)
+
+        deadline = _RequestDeadline(request.receive, budget=budget, watch_delay=self.watch_delay)
+        if self.watch_delay is not None:
+            request._receive = deadline.receive  # noqa: SLF001
+        token = DEADLINE.set(None if budget is None else monotonic() + budget)
+        try:
+            return await call_next(request)
+        except asyncio.CancelledError as exc:
+            if not deadline.is_expired():
+                raise
+            if deadline.error is RequestTimeoutError:
+                raise RequestTimeoutError(debug=f'no response within {budget}s') from exc
+            raise deadline.error from exc
+        except ClientDisconnect as exc:
+            raise ClientDisconnectedError from exc
+        finally:
+            deadline.close()
+            DEADLINE.reset(token)
+
+
+# Route timeout in seconds, overrides the router's and DEADLINE_DEFAULT_TIMEOUT; None - no timeout
+def request_timeout(
+    timeout: float | None,
+) -> Callable[[EndpointT], EndpointT]:
+    def decorator(endpoint: EndpointT) -> EndpointT:
+        endpoint.__route_timeout__ = timeout
+        return endpoint
+
+    return decorator
+
+
+def get_route_timeout(endpoint: Callable, default: float | None) -> float | None:
+    timeout = getattr(endpoint, '__route_timeout__', _NOT_SET)
+    return default if timeout is _NOT_SET else timeout
@@ -0,0 +1,22 @@
+from collections.abc import AsyncIterator
+from typing import Annotated
+
+from fastapi import Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.client import SQLAlchemyClient
+
+
+def get_db_client(request: Request) -> SQLAlchemyClient:
+    return request.app.state.db_client
+
+
+async def get_db_session(
+    db_client: Annotated[SQLAlchemyClient, Depends(get_db_client)],
+) -> AsyncIterator[AsyncSession]:
+    async with db_client.session() as session:
+        yield session
+
+
+DBClient = Annotated[SQLAlchemyClient, Depends(get_db_client)]
+DBSession = Annotated[AsyncSession, Depends(get_db_session)]
@@ -0,0 +1,17 @@
+from fastapi import Request
+
+from src.settings import get_settings
+from src.transport.rest.errors import ForbiddenError
+from src.transport.rest.profiling import is_profile_caller_allowed
+
+
+# profiles hold full stacks of real requests, reading them takes what capturing them takes
+def check_profile_caller(request: Request) -> None:
+    settings = get_settings().env.profiling
+    if not is_profile_caller_allowed(
+        request.headers.get(settings.header),
+        request.client.host if request.client else None,
+        secret=settings.secret,
+        allowed_clients=settings.allowed_clients,
+    ):
+        raise ForbiddenError(message=f'Profiles need the {settings.header} header, signed or from an allowed client')
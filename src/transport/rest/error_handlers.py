@@ -5,41 +5,43 @@ from fastapi.exceptions import (
     RequestValidationError as FastAPIRequestValidationError,
     ResponseValidationError as FastAPIResponseValidationError,
 )
-from fastapi.responses import JSONResponse
 from pydantic import ValidationError as PydanticValidationError
 from starlette.responses import Response
 
 from src import IS_SENTRY_INSTALLED
-from src.settings import Settings
+from src.metrics.http import get_http_metrics
+from src.settings import Settings, SettingsSnapshot, get_settings_snapshot
+from src.transport.rest.content_negotiation import choose_media_type, NegotiatedResponse
 from src.transport.rest.errors import (
     InternalValidationError,
     RequestValidationError,
     ResponseValidationError,
     ServerError,
 )
+from src.transport.rest.sentry_reporter import report_exception
 
-try:  # noqa: SIM105
-    from sentry_sdk import Scope, capture_exception
-except ImportError:
-    pass
-
+# (error type, media type, is_debug) -> encoded body of an error whose body is fully defined by its class
+_STATIC_ERROR_BODIES: dict[tuple[type[ServerError], str, bool], bytes] = {}
 
 
 def prepare_server_exc(
     exc: ServerError,
     trace_id: str | None = None,
     sentry_id: str | None = None,
+    settings: Settings | None = None,
 ) -> None:
     if not IS_SENTRY_INSTALLED:
         return
 
     if exc.capture_by_sentry and not exc.sentry_id:
-        scope = Scope.get_current_scope()
-        if trace_id:
-            scope.set_tag(Settings().trace_id_header.lower(), trace_id)
-        scope.set_extra('server_error.title', exc.title)
-        scope.set_extra('server_error.message', exc.message)
-        sentry_id = capture_exception(exc)
+        settings = settings or get_settings_snapshot().current
+        sentry_id = report_exception(
+            exc,
+            title=exc.title,
+            tags={settings.trace_id_header.lower(): trace_id} if trace_id else {},
+            extras={'server_error.title': exc.title, 'server_error.message': exc.message},
+            settings=settings.env.sentry,
+        )
     if sentry_id and not exc.sentry_id:
         exc.sentry_id = sentry_id
 
@@ -51,32 +53,74 @@ def process_server_error(
     sentry_id: str | None,
     is_debug: bool,
     old_exc: Exception | None = None,
+    settings_snapshot: SettingsSnapshot | None = None,
 ) -> Response:
-    trace_id = request.headers.get(Settings().trace_id_header)
+    settings = (settings_snapshot or get_settings_snapshot()).current
+    trace_id = request.headers.get(settings.trace_id_header)
 
     if old_exc and not exc.debug:
         exc.debug = str(old_exc)
+    if settings.env.metrics.enabled:
+        get_http_metrics().observe_server_error(exc.title)
 
     prepare_server_exc(
         exc=exc,
         trace_id=trace_id,
         sentry_id=sentry_id,
+        settings=settings,
     )
 
-    response: JSONResponse = JSONResponse(
-        content=exc.as_dict(is_debug=is_debug),
+    sentry_id = exc.sentry_id or sentry_id
+    headers = exc.headers
+    if sentry_id:
+        headers = {**(headers or {}), settings.sentry_id_header: sentry_id}
+    media_type = choose_media_type(request.headers.get('accept'))
+    return Response(
+        content=_render_error_body(exc, is_debug=is_debug, media_type=media_type),
         status_code=exc.status_code,
-        headers={Settings().sentry_id_header: sentry_id} if sentry_id else None,
+        headers=headers,
+        media_type=media_type,
+    )
+
+
+# Errors without details, debug info or a custom message (UnauthorizedError, ForbiddenError, ...) always
+# render to the same bytes, so they are encoded once per class and media type.
+def _render_error_body(exc: ServerError, *, is_debug: bool, media_type: str) -> bytes:
+    if exc.details is not None or exc.debug is not None or exc.message != type(exc).message:
+        return NegotiatedResponse(exc.as_dict(is_debug=is_debug), media_type=media_type).body
+
+    key = (type(exc), media_type, is_debug)
+    if (body := _STATIC_ERROR_BODIES.get(key)) is None:
+        body = _STATIC_ERROR_BODIES[key] = NegotiatedResponse(
+            exc.as_dict(is_debug=is_debug), media_type=media_type
+        ).body
+    return body
+
+
+# Starlette runs sync exception handlers in the threadpool, rendering an error does not need it
+async def _handle_server_error(
+    request: Request,
+    exc: ServerError,
+    *,
+    is_debug: bool,
+    settings_snapshot: SettingsSnapshot | None = None,
+) -> Response:
+    return process_server_error(
+        request=request,
+        exc=exc,
+        sentry_id=None,
+        is_debug=is_debug,
+        settings_snapshot=settings_snapshot,
     )
-    return response
 
 
-def _redefine_error(
+async def _redefine_error(
     request: Request,
     exc: Exception,
     server_error_instance: ServerError,
     *,
     is_debug: bool,
+    settings_snapshot: SettingsSnapshot | None = None,
 ) -> Response:
     return process_server_error(
         request=request,
@@ -84,6 +128,7 @@ def _redefine_error(
         sentry_id=None,
         is_debug=is_debug,
         old_exc=exc,
+        settings_snapshot=settings_snapshot,
     )
 
 
@@ -112,6 +157,7 @@ def _redefine_internal_exception(
     server_error_type: type[ServerError] | None,
     *,
     is_debug: bool,
+    settings_snapshot: SettingsSnapshot | None = None,
 ) -> None:
     for exc_class_or_status_code in _cast_exc_class_or_status_code_to_list(exc_class_or_status_codes):
         if not server_error_type and isinstance(exc_class_or_status_code, int):
@@ -122,6 +168,7 @@ def _redefine_internal_exception(
                 handler=partial(
                     _redefine_error,
                     is_debug=is_debug,
+                    settings_snapshot=settings_snapshot,
                     server_error_instance=exc_class_or_status_codes,
                 ),
             )
@@ -131,6 +178,7 @@ def _redefine_internal_exception(
             handler=partial(
                 _redefine_error,
                 is_debug=is_debug,
+                settings_snapshot=settings_snapshot,
                 server_error_instance=_make_server_error_instance(
                     exc_class_or_status_code=exc_class_or_status_code,
                     server_error_type=server_error_type,
@@ -143,30 +191,34 @@ def setup_fastapi_error_handlers(
     app: FastAPI,
     *,
     is_debug: bool,
+    settings_snapshot: SettingsSnapshot | None = None,
 ) -> None:
     app.add_exception_handler(
         exc_class_or_status_code=ServerError,
         handler=partial(
-            process_server_error,
+            _handle_server_error,
             is_debug=is_debug,
-            sentry_id=None,
+            settings_snapshot=settings_snapshot,
         ),
     )
     _redefine_internal_exception(
         app=app,
         is_debug=is_debug,
+        settings_snapshot=settings_snapshot,
         exc_class_or_status_codes=FastAPIRequestValidationError,
         server_error_type=RequestValidationError,
     )
     _redefine_internal_exception(
         app=app,
         is_debug=is_debug,
+        settings_snapshot=settings_snapshot,
         exc_class_or_status_codes=FastAPIResponseValidationError,
         server_error_type=ResponseValidationError,
     )
     _redefine_internal_exception(
         app=app,
         is_debug=is_debug,
+        settings_snapshot=settings_snapshot,
         exc_class_or_status_codes=PydanticValidationError,
         server_error_type=InternalValidationError,
     )
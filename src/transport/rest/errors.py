@@ -13,6 +13,10 @@ class ServerError(Exception):
     def title(self) -> str:
         return self.__class__.__name__
 
+    @property
+    def headers(self) -> dict[str, str] | None:
+        return None
+
     def __init__(
         self,
         message: str | None = None,
@@ -49,6 +53,64 @@ class ObjectNotFoundError(ServerError):
     message = 'Object not found'
 
 
+class OverloadedError(ServerError):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    message = 'Service is overloaded, retry later'
+
+    def __init__(
+        self,
+        message: str | None = None,
+        debug: str | None = None,
+        details: list[str] | None = None,
+        *,
+        retry_after: int = 1,
+    ):
+        super().__init__(message=message, debug=debug, details=details)
+        self.retry_after = retry_after
+
+    @property
+    def headers(self) -> dict[str, str]:
+        return {'Retry-After': str(self.retry_after)}
+
+
+class RequestTimeoutError(ServerError):
+    status_code = status.HTTP_504_GATEWAY_TIMEOUT
+    message = 'Request was not processed in time'
+    capture_by_sentry = False
+
+
+# nginx's "client closed request", the client never sees it but the access log does
+class ClientDisconnectedError(ServerError):
+    status_code = 499
+    message = 'Client closed the connection'
+    capture_by_sentry = False
+
+
+class ExternalServiceError(ServerError):
+    status_code = status.HTTP_502_BAD_GATEWAY
+    message = 'External service is unavailable'
+
+
+# the circuit breaker of the host is open: the call is not made and the client is asked to come back later
+class CircuitOpenError(ExternalServiceError):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+
+    def __init__(
+        self,
+        message: str | None = None,
+        debug: str | None = None,
+        details: list[str] | None = None,
+        *,
+        retry_after: int = 1,
+    ):
+        super().__init__(message=message, debug=debug, details=details)
+        self.retry_after = retry_after
+
+    @property
+    def headers(self) -> dict[str, str]:
+        return {'Retry-After': str(self.retry_after)}
+
+
 class InternalValidationError(ServerError):
     status_code = status.HTTP_400_BAD_REQUEST
     message = 'Internal validation error'
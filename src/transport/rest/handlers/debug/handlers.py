@@ -1,6 +1,25 @@
+from dataclasses import asdict
+from datetime import datetime
+from typing import Annotated
+
+from fastapi import Depends, Query, Request
+from fastapi.responses import PlainTextResponse
+
+from src.log_index import search_logs
+from src.metrics.loop import loop_monitor
+from src.settings import get_settings
+from src.tracing.exporters import span_exporter
+from src.transport.rest.depends.database import DBClient
+from src.transport.rest.depends.profiling import check_profile_caller
+from src.transport.rest.middlewares.access_log_queue import access_log_queue
+from src.transport.rest.middlewares.access_log_sampling import get_access_log_sampler
+from src.transport.rest.errors import ObjectNotFoundError, RequestValidationError
 from src.transport.rest.router import FastAPILoggingRouter
+from src.transport.rest.sentry_reporter import sentry_reporter
 
 debug_router = FastAPILoggingRouter(prefix='/debug', tags=['health'])
+# raw access log records, not mounted in PROD where `python -m src.log_index` on the host reads them
+debug_logs_router = FastAPILoggingRouter(prefix='/debug', tags=['health'])
 
 
 @debug_router.get(path='/health')
@@ -11,3 +30,102 @@ async def get_health_handler():
 @debug_router.get(path='/ping')
 async def get_ping_handler():
     return 'PONG'
+
+
+@debug_router.get(path='/access-log-queue')
+async def get_access_log_queue_handler():
+    return {
+        'is_running': access_log_queue.is_running,
+        'policy': access_log_queue.policy,
+        'size': access_log_queue.size,
+        **asdict(access_log_queue.stats),
+    }
+
+
+@debug_router.get(path='/access-log-sampling')
+async def get_access_log_sampling_handler():
+    sampler = get_access_log_sampler()
+    return {
+        'adaptive_rate': sampler.adaptive_rate,
+        **asdict(sampler.stats),
+        'dropped_by_route': sampler.dropped_by_route,
+    }
+
+
+@debug_router.get(path='/sentry-reporter')
+async def get_sentry_reporter_handler():
+    return {
+        'is_running': sentry_reporter.is_running,
+        'size': sentry_reporter.size,
+        **asdict(sentry_reporter.stats),
+    }
+
+
+@debug_router.get(path='/span-exporter')
+async def get_span_exporter_handler():
+    return {
+        'is_running': span_exporter.is_running,
+        'exporter': type(span_exporter.exporter).__name__ if span_exporter.exporter else None,
+        'size': span_exporter.size,
+        **asdict(span_exporter.stats),
+    }
+
+
+@debug_router.get(path='/loop')
+async def get_loop_handler():
+    return loop_monitor.as_dict()
+
+
+@debug_router.get(path='/admission')
+async def get_admission_handler(request: Request):
+    if (controller := getattr(request.app.state, 'admission_controller', None)) is None:
+        raise ObjectNotFoundError(message='Admission control is disabled')
+    return controller.stats()
+
+
+@debug_router.get(path='/db-pool')
+async def get_db_pool_handler(db_client: DBClient):
+    return asdict(db_client.pool_stats())
+
+
+@debug_router.get(path='/http-client')
+async def get_http_client_handler(request: Request):
+    if (http_client := getattr(request.app.state, 'http_client', None)) is None:
+        raise ObjectNotFoundError(message='Outbound HTTP client is not started')
+    return http_client.stats_snapshot()
+
+
+# sync on purpose: reading rotated segments is blocking file I/O, FastAPI runs it in the threadpool
+@debug_logs_router.get(path='/logs')
+def get_logs_handler(
+    trace_id: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 100,
+):
+    try:
+        return list(
+            search_logs(get_settings().env.logger.path, trace_id=trace_id, since=since, until=until, limit=limit)
+        )
+    except ValueError as exc:
+        raise RequestValidationError(message=str(exc)) from exc
+
+
+# sync on purpose: the profile store is a directory of files, FastAPI runs these in the threadpool
+@debug_router.get(path='/profiles', dependencies=[Depends(check_profile_caller)])
+def get_profiles_handler(request: Request):
+    store = getattr(request.app.state, 'profile_store', None)
+    return [profile.summary() for profile in reversed(store.values())] if store is not None else []
+
+
+# collapsed stacks: `flamegraph.pl profile.txt > profile.svg` or drop the file on speedscope.app
+@debug_router.get(
+    path='/profiles/{trace_id}',
+    response_class=PlainTextResponse,
+    dependencies=[Depends(check_profile_caller)],
+)
+def get_profile_handler(request: Request, trace_id: str):
+    store = getattr(request.app.state, 'profile_store', None)
+    if store is None or (profile := store.get(trace_id)) is None:
+        raise ObjectNotFoundError(message=f'No profile for trace id {trace_id}')
+    return PlainTextResponse(profile.collapsed())
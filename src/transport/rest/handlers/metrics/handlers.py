@@ -0,0 +1,9 @@
+from starlette.requests import Request
+from starlette.responses import Response
+
+from src.metrics.registry import CONTENT_TYPE_LATEST, render_latest
+
+
+# sync on purpose: in multi-worker mode rendering reads every worker's files, so it runs in the threadpool
+def get_metrics_handler(_request: Request) -> Response:
+    return Response(content=render_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,189 @@
+import asyncio
+import queue
+import threading
+from collections.abc import Iterable
+from contextlib import suppress
+from dataclasses import dataclass
+from urllib.parse import parse_qsl
+
+from loguru import logger
+
+from src.settings import AccessLogQueuePolicy, get_settings
+from src.tracing.spans import RequestTrace
+from src.transport.rest.middlewares.body_capture import (
+    BodyCapture,
+    decode_body_preview,
+    merge_input_data,
+    output_body_preview,
+)
+from src.utils import dump_json, get_project_info
+
+
+# values of LOGGER_ACCESS_LOG_REDACTED_HEADERS are logged as ***, the log is readable by more people than the secrets
+def decode_headers(raw_headers: Iterable[tuple[bytes, bytes]] | None) -> str | None:
+    if raw_headers is None:
+        return None
+    redacted = get_settings().env.logger.access_log_redacted_headers
+    headers = {}
+    for raw_key, raw_value in raw_headers:
+        key = raw_key.decode('latin-1')
+        headers[key] = '***' if key.lower() in redacted else raw_value.decode('latin-1')
+    return dump_json(headers)
+
+
+# The message is the repr of the whole record, request and response bodies included, so the fields the log
+# index needs go to `extra` as well: a body with a 'trace_id' key of its own cannot pass for the record's.
+def log_access_record(record: dict) -> None:
+    logger.bind(
+        trace_id=record['trace_id'],
+        http_status_code=record['http_status_code'],
+        route=record['method'],
+    ).info(record)
+
+
+@dataclass(slots=True)
+class AccessLogSnapshot:
+    http_method: str
+    method: str
+    processing_time: float
+    loop_lag: float | None
+    http_status_code: int | None
+    query_string: bytes
+    request_body: BodyCapture
+    response_body: BodyCapture | None
+    # copies: the response list is still mutated while sending (MutableHeaders), the worker reads them later
+    request_headers: tuple[tuple[bytes, bytes], ...]
+    response_headers: tuple[tuple[bytes, bytes], ...] | None
+    error_title: str | None
+    error_message: str | None
+    error_details: list[str] | None
+    sentry_id: str | None
+    trace_id: str
+    trace: RequestTrace | None
+    # 'internal' for requests to this service, 'external' for its calls to other services
+    destination: str = 'internal'
+
+    def input_data(self) -> str | None:
+        input_data = None
+        if self.request_body.size:
+            input_data = decode_body_preview(
+                bytes(self.request_body.preview),
+                truncated=self.request_body.truncated,
+                media_type=self.request_body.media_type,
+            )
+        if self.query_string:
+            params = dict(parse_qsl(self.query_string.decode('latin-1'), keep_blank_values=True))
+            input_data = merge_input_data(input_data, params)
+        return dump_json(input_data) if input_data else None
+
+    def output_data(self) -> str | None:
+        if not self.response_body or not self.response_body.size:
+            return None
+        return dump_json(
+            output_body_preview(
+                bytes(self.response_body.preview),
+                truncated=self.response_body.truncated,
+                media_type=self.response_body.media_type,
+            )
+        )
+
+    def as_record(self) -> dict:
+        return {
+            'destination': self.destination,
+            'http_method': self.http_method,
+            'method': self.method,
+            'processing_time': self.processing_time,
+            'loop_lag': self.loop_lag,
+            'http_status_code': self.http_status_code,
+            'input_data': self.input_data(),
+            'input_data_size': self.request_body.size,
+            'input_data_hash': self.request_body.digest,
+            'output_data': self.output_data(),
+            'output_data_size': self.response_body.size if self.response_body else None,
+            'output_data_hash': self.response_body.digest if self.response_body else None,
+            'request_headers': decode_headers(self.request_headers),
+            'response_headers': decode_headers(self.response_headers),
+            'error_title': self.error_title,
+            'error_message': self.error_message,
+            'error_details': self.error_details,
+            'sentry_id': self.sentry_id,
+            'trace_id': self.trace_id,
+            'trace': self.trace.as_access_log() if self.trace else None,
+            'service_version': get_project_info().version,
+        }
+
+
+@dataclass
+class AccessLogQueueStats:
+    enqueued: int = 0
+    emitted: int = 0
+    dropped_oldest: int = 0
+    dropped_new: int = 0
+    failed: int = 0
+
+
+# Record building (body decoding, header and JSON dumps) and the loguru call run in a daemon thread, so the
+# event loop only pays for the snapshot and a non-blocking put. The thread holds the GIL while it works,
+# a CPU-bound loop still competes with it for the interpreter.
+class AccessLogQueue:
+    def __init__(self) -> None:
+        self.stats = AccessLogQueueStats()
+        self.policy = AccessLogQueuePolicy.DROP_OLDEST
+        self._queue: queue.Queue[AccessLogSnapshot | None] | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def size(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def start(self, maxsize: int, policy: AccessLogQueuePolicy) -> None:
+        if self.is_running:
+            return
+        self.policy = policy
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = threading.Thread(target=self._run, name='access-log-worker', daemon=True)
+        self._thread.start()
+
+    def stop(self, drain_timeout: float = 5.0) -> None:
+        if not self.is_running:
+            return
+        try:
+            self._queue.put(None, timeout=drain_timeout)
+        except queue.Full:
+            logger.warning('Access log queue is still full, {} records are lost', self._queue.qsize())
+        self._thread.join(timeout=drain_timeout)
+        self._thread = None
+
+    async def put(self, snapshot: AccessLogSnapshot) -> None:
+        while True:
+            with suppress(queue.Full):
+                self._queue.put_nowait(snapshot)
+                self.stats.enqueued += 1
+                return
+
+            if self.policy == AccessLogQueuePolicy.BLOCK:
+                # waits in the default executor, the loop keeps serving other requests meanwhile
+                await asyncio.to_thread(self._queue.put, snapshot)
+                self.stats.enqueued += 1
+                return
+            if self.policy == AccessLogQueuePolicy.DROP_NEW:
+                self.stats.dropped_new += 1
+                return
+            with suppress(queue.Empty):
+                self._queue.get_nowait()
+                self.stats.dropped_oldest += 1
+
+    def _run(self) -> None:
+        while (snapshot := self._queue.get()) is not None:
+            try:
+                log_access_record(snapshot.as_record())
+                self.stats.emitted += 1
+            except Exception:  # noqa: BLE001
+                self.stats.failed += 1
+
+
+access_log_queue = AccessLogQueue()
@@ -0,0 +1,102 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from time import monotonic
+
+from starlette import status
+
+from src.settings import get_settings, LoggerSettings
+from src.utils import trace_sample_point
+
+ADAPTIVE_WINDOW = 0.25
+
+
+@dataclass
+class AccessLogSamplingStats:
+    kept_errors: int = 0
+    kept_slow: int = 0
+    kept_sampled: int = 0
+    dropped: int = 0
+
+
+# Errors (4xx/5xx, a raised exception or no response at all) and requests slower than their route threshold
+# are always kept. Everything else, redirects and 304s included, is kept at the route rate, capped by the adaptive
+# rate when a budget is set: once per window the adaptive rate becomes budget / offered records per second.
+class AccessLogSampler:
+    def __init__(
+        self,
+        *,
+        sample_rate: float,
+        sample_rates: dict[str, float],
+        budget_per_second: float | None,
+        slow_threshold: float,
+        slow_thresholds: dict[str, float],
+    ) -> None:
+        self.sample_rate = sample_rate
+        self.sample_rates = sample_rates
+        self.budget_per_second = budget_per_second
+        self.slow_threshold = slow_threshold
+        self.slow_thresholds = slow_thresholds
+        self.stats = AccessLogSamplingStats()
+        self.dropped_by_route: dict[str, int] = {}
+        self.adaptive_rate = 1.0
+        self._window_start = monotonic()
+        self._window_offered = 0
+
+    @classmethod
+    def from_settings(cls, settings: LoggerSettings) -> 'AccessLogSampler':
+        return cls(
+            sample_rate=settings.access_log_sample_rate,
+            sample_rates=settings.access_log_sample_rates,
+            budget_per_second=settings.access_log_budget_per_second,
+            slow_threshold=settings.access_log_slow_threshold,
+            slow_thresholds=settings.access_log_slow_thresholds,
+        )
+
+    @property
+    def is_sampling(self) -> bool:
+        return self.budget_per_second is not None or self.sample_rate < 1 or bool(self.sample_rates)
+
+    def should_log(
+        self,
+        *,
+        route: str,
+        http_status_code: int | None,
+        is_error: bool,
+        processing_time: float,
+        trace_id: str | None,
+    ) -> bool:
+        if is_error or http_status_code is None or http_status_code >= status.HTTP_400_BAD_REQUEST:
+            self.stats.kept_errors += 1
+            return True
+
+        if processing_time >= self.slow_thresholds.get(route, self.slow_threshold):
+            self.stats.kept_slow += 1
+            return True
+
+        rate = self.sample_rates.get(route, self.sample_rate)
+        if self.budget_per_second is not None:
+            self._window_offered += 1
+            self._adjust_adaptive_rate()
+            rate = min(rate, self.adaptive_rate)
+
+        if rate >= 1 or trace_sample_point(trace_id) < rate:
+            self.stats.kept_sampled += 1
+            return True
+
+        self.stats.dropped += 1
+        self.dropped_by_route[route] = self.dropped_by_route.get(route, 0) + 1
+        return False
+
+    def _adjust_adaptive_rate(self) -> None:
+        elapsed = monotonic() - self._window_start
+        if elapsed < ADAPTIVE_WINDOW:
+            return
+        offered_per_second = self._window_offered / elapsed
+        self.adaptive_rate = min(1.0, self.budget_per_second / offered_per_second)
+        self._window_start += elapsed
+        self._window_offered = 0
+
+
+@lru_cache
+def get_access_log_sampler() -> AccessLogSampler:
+    return AccessLogSampler.from_settings(get_settings().env.logger)
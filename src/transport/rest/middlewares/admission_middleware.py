@@ -0,0 +1,57 @@
+from time import perf_counter
+
+from fastapi import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.settings import SettingsSnapshot
+from src.transport.rest.admission import AdmissionController, Priority
+from src.transport.rest.error_handlers import process_server_error
+from src.transport.rest.errors import OverloadedError
+
+
+# Sits inside TraceIdMiddleware and CORSMiddleware so a shed request still gets its trace id and CORS
+# headers, and in front of everything that does per-request work. Latency samples run up to `http.response.start`,
+# so a streaming body or a slow client does not read as server latency; the slot is held until the response ends.
+class AdmissionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        controller: AdmissionController,
+        is_debug: bool,
+        settings_snapshot: SettingsSnapshot,
+    ) -> None:
+        self.app = app
+        self.controller = controller
+        self.is_debug = is_debug
+        self.settings_snapshot = settings_snapshot
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http' or (priority := self.controller.priority(scope['path'])) is Priority.CRITICAL:
+            await self.app(scope, receive, send)
+            return
+
+        if not await self.controller.acquire(priority):
+            response = process_server_error(
+                request=Request(scope),
+                exc=OverloadedError(retry_after=self.controller.settings.retry_after),
+                sentry_id=None,
+                is_debug=self.is_debug,
+                settings_snapshot=self.settings_snapshot,
+            )
+            await response(scope, receive, send)
+            return
+
+        started = perf_counter()
+        latency: float | None = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal latency
+            if message['type'] == 'http.response.start':
+                latency = perf_counter() - started
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.controller.release(perf_counter() - started if latency is None else latency)
@@ -0,0 +1,100 @@
+from collections.abc import AsyncIterable, AsyncIterator, Awaitable, Callable
+from contextlib import suppress
+from hashlib import blake2b
+from json import JSONDecodeError
+from typing import Any
+
+from orjson import orjson
+from starlette.types import Message, Receive
+
+from src.transport.rest.content_negotiation import BINARY_MEDIA_TYPES, decode_body
+
+
+class BodyCapture:
+    __slots__ = ('_hash', 'limit', 'media_type', 'preview', 'size')
+
+    def __init__(self, limit: int, media_type: str | None = None) -> None:
+        self.limit = limit
+        self.media_type = media_type
+        self.preview = bytearray()
+        self.size = 0
+        self._hash = blake2b(digest_size=16)
+
+    def feed(self, chunk: bytes) -> None:
+        if not chunk:
+            return
+        self.size += len(chunk)
+        self._hash.update(chunk)
+        if (free := self.limit - len(self.preview)) > 0:
+            self.preview += chunk[:free]
+
+    @property
+    def truncated(self) -> bool:
+        return self.size > len(self.preview)
+
+    @property
+    def digest(self) -> str | None:
+        return self._hash.hexdigest() if self.size else None
+
+
+def tee_receive(receive: Receive, capture: BodyCapture) -> Receive:
+    async def receive_wrapper() -> Message:
+        message = await receive()
+        if message['type'] == 'http.request':
+            capture.feed(message.get('body', b''))
+        return message
+
+    return receive_wrapper
+
+
+async def tee_body_iterator(
+    body_iterator: AsyncIterable[str | bytes],
+    capture: BodyCapture,
+    charset: str,
+    on_complete: Callable[[Exception | None], Awaitable[None]],
+) -> AsyncIterator[str | bytes]:
+    error = None
+    try:
+        async for chunk in body_iterator:
+            capture.feed(chunk if isinstance(chunk, bytes | memoryview) else chunk.encode(charset))
+            yield chunk
+    except Exception as exc:
+        error = exc
+        raise
+    finally:
+        await on_complete(error)
+
+
+# msgpack/cbor can carry bytes and non-string keys, the result has to stay JSON-serializable for the log
+def _decode_binary_preview(preview: bytes, *, truncated: bool, media_type: str) -> Any:
+    if not truncated:
+        with suppress(ValueError, TypeError):
+            content = decode_body(preview, media_type)
+            return orjson.loads(orjson.dumps(content, default=repr, option=orjson.OPT_NON_STR_KEYS))
+    # a cut binary body cannot be decoded, its size and hash are logged next to it
+    return f'<{media_type} body>'
+
+
+def decode_body_preview(preview: bytes, *, truncated: bool, media_type: str | None = None) -> Any:
+    if media_type in BINARY_MEDIA_TYPES:
+        return _decode_binary_preview(preview, truncated=truncated, media_type=media_type)
+    if not truncated:
+        with suppress(JSONDecodeError):
+            return orjson.loads(preview)
+    text = preview.decode(errors='replace')
+    return text + '...' if truncated else text
+
+
+def output_body_preview(preview: bytes, *, truncated: bool, media_type: str | None = None) -> Any:
+    if media_type in BINARY_MEDIA_TYPES:
+        return _decode_binary_preview(preview, truncated=truncated, media_type=media_type)
+    text = preview.decode(errors='replace')
+    return text + '...' if truncated else text
+
+
+def merge_input_data(input_data: Any, params: dict[str, Any]) -> dict[str, Any]:
+    if input_data is None:
+        return dict(params)
+    if isinstance(input_data, dict):
+        return {**input_data, **params}
+    return {'body': input_data, **params}
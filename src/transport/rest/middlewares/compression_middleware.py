@@ -0,0 +1,123 @@
+from collections.abc import Callable
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.settings import CompressionSettings
+from src.transport.rest.content_encoding import (
+    AVAILABLE_ENCODINGS,
+    BROTLI,
+    choose_encoding,
+    compress,
+    Compressor,
+    GZIP,
+    IDENTITY,
+    make_compressor,
+    ZSTD,
+)
+
+NOT_COMPRESSED_STATUS_CODES = frozenset({204, 206, 304})
+
+
+def uncompressed[EndpointT: Callable](endpoint: EndpointT) -> EndpointT:
+    endpoint.__compress__ = False
+    return endpoint
+
+
+def _accept_encoding(scope: Scope) -> str | None:
+    for key, value in scope['headers']:
+        if key == b'accept-encoding':
+            return value.decode('latin-1')
+    return None
+
+
+# The encoding is picked from Accept-Encoding before the app runs; whether to compress is decided on
+# http.response.start (route opt-out, status, existing Content-Encoding, content type, Content-Length)
+# and on the first body chunk. A single-chunk body under minimum_size is sent as is, a streamed body is
+# compressed chunk by chunk and flushed after each one, so nothing is buffered beyond the current chunk.
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, settings: CompressionSettings) -> None:
+        self.app = app
+        self.minimum_size = settings.minimum_size
+        self.encodings = tuple(encoding for encoding in settings.encodings if encoding in AVAILABLE_ENCODINGS)
+        self.levels = {GZIP: settings.gzip_level, BROTLI: settings.brotli_quality, ZSTD: settings.zstd_level}
+        self.skip_content_types = settings.skip_content_types
+
+    def _is_compressible(self, scope: Scope, message: Message, headers: MutableHeaders) -> bool:
+        route = scope.get('route')
+        if not getattr(getattr(route, 'endpoint', None), '__compress__', True):
+            return False
+        if message['status'] in NOT_COMPRESSED_STATUS_CODES or 'content-encoding' in headers:
+            return False
+        content_type = headers.get('content-type', '')
+        if content_type.startswith(self.skip_content_types) and not content_type.startswith('image/svg+xml'):
+            return False
+        content_length = headers.get('content-length')
+        return content_length is None or int(content_length) >= self.minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http' or scope['method'] == 'HEAD':
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(_accept_encoding(scope), self.encodings)
+        if encoding == IDENTITY:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Message | None = None
+        compressor: Compressor | None = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start_message, compressor, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message['type'] == 'http.response.start':
+                headers = MutableHeaders(scope=message)
+                if self._is_compressible(scope, message, headers):
+                    start_message = message
+                else:
+                    passthrough = True
+                    await send(message)
+                return
+
+            if message['type'] != 'http.response.body':
+                await send(message)
+                return
+
+            body = message.get('body', b'')
+            more_body = message.get('more_body', False)
+            if compressor is None:
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                headers = MutableHeaders(scope=start_message)
+                headers['Content-Encoding'] = encoding
+                headers.add_vary_header('Accept-Encoding')
+                if (etag := headers.get('etag')) and not etag.startswith('W/'):
+                    headers['ETag'] = f'W/{etag}'
+
+                if not more_body:
+                    body = compress(body, encoding, self.levels[encoding])
+                    headers['Content-Length'] = str(len(body))
+                    await send(start_message)
+                    await send({'type': 'http.response.body', 'body': body})
+                    return
+
+                del headers['Content-Length']
+                await send(start_message)
+                compressor = make_compressor(encoding, self.levels[encoding])
+
+            if more_body:
+                body = compressor.compress(body) + compressor.flush() if body else b''
+            else:
+                body = compressor.compress(body) + compressor.finish()
+            await send({'type': 'http.response.body', 'body': body, 'more_body': more_body})
+
+        await self.app(scope, receive, send_compressed)
@@ -1,57 +1,75 @@
 from traceback import format_exc, print_exc
 
 from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
-from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from src.settings import Settings
+from src.settings import SettingsSnapshot
 from src.transport.rest.error_handlers import IS_SENTRY_INSTALLED, process_server_error
 from src.transport.rest.errors import ServerError
+from src.transport.rest.sentry_reporter import report_exception
+from src.utils import TRACE_ID
 
-try:  # noqa: SIM105
-    from sentry_sdk import Scope, capture_exception
-except ImportError:
-    pass
 
-
-class ErrorsHandlerMiddleware(BaseHTTPMiddleware):
+class ErrorsHandlerMiddleware:
     def __init__(
         self,
-        *args,
+        app: ASGIApp,
+        *,
         is_debug: bool,
-        **kwargs,
+        settings_snapshot: SettingsSnapshot,
     ) -> None:
-        super().__init__(*args, **kwargs)
+        self.app = app
         self.is_debug = is_debug
+        self.settings_snapshot = settings_snapshot
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        response_started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if message['type'] == 'http.response.start':
+                response_started = True
+            await send(message)
 
-    async def dispatch(
-        self,
-        request: Request,
-        call_next: RequestResponseEndpoint,
-    ) -> Response:
-        settings = Settings()
         try:
-            return await call_next(request)
+            await self.app(scope, receive, send_wrapper)
         except ServerError as exc:
-            return process_server_error(
-                request=request,
+            if response_started:
+                raise
+            response = process_server_error(
+                request=Request(scope),
                 exc=exc,
                 sentry_id=None,
                 is_debug=self.is_debug,
+                settings_snapshot=self.settings_snapshot,
             )
+            await response(scope, receive, send)
         except Exception as exc:
+            if response_started:
+                raise
             print_exc()
             sentry_id = None
 
             if IS_SENTRY_INSTALLED:
-                scope = Scope.get_current_scope()
-                if trace_id := request.scope.get(settings.trace_id_header):
-                    scope.set_tag(settings.trace_id_header, trace_id)
-                sentry_id = capture_exception(exc)
+                settings = self.settings_snapshot.current
+                trace_id = TRACE_ID.get(None)
+                sentry_id = report_exception(
+                    exc,
+                    title=ServerError.__name__,
+                    tags={settings.trace_id_header: trace_id} if trace_id else {},
+                    extras={},
+                    settings=settings.env.sentry,
+                )
 
-            return process_server_error(
-                request=request,
+            response = process_server_error(
+                request=Request(scope),
                 exc=ServerError(debug=format_exc()),
                 sentry_id=sentry_id,
                 is_debug=self.is_debug,
+                settings_snapshot=self.settings_snapshot,
             )
+            await response(scope, receive, send)
@@ -0,0 +1,36 @@
+from collections.abc import Collection
+
+from starlette.routing import BaseRoute, Match, Router
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+# Sits in front of the whole middleware stack: probe and metrics paths are looked up
+# by exact path and handed to their route, everything else goes through the stack.
+class FastPathMiddleware:
+    def __init__(self, app: ASGIApp, router: Router, paths: Collection[str]) -> None:
+        self.app = app
+        self.router = router
+        self.paths = frozenset(paths)
+        self._routes: dict[str, BaseRoute] | None = None
+
+    # routes are collected on the first request, after every router has been included
+    def _build_routes(self) -> dict[str, BaseRoute]:
+        return {route.path: route for route in self.router.routes if getattr(route, 'path', None) in self.paths}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        if self._routes is None:
+            self._routes = self._build_routes()
+
+        route = self._routes.get(scope['path'])
+        if route is not None:
+            match, child_scope = route.matches(scope)
+            if match == Match.FULL:
+                scope.update(child_scope)
+                await route.handle(scope, receive, send)
+                return
+
+        await self.app(scope, receive, send)
@@ -1,55 +1,90 @@
 from abc import ABC
-from collections.abc import Awaitable, Callable, Sequence
-from contextlib import suppress
-from json import JSONDecodeError
+from collections.abc import Awaitable, Callable, Collection
 from time import time
 
 from fastapi import Request, Response
-from loguru import logger
 from starlette.datastructures import UploadFile
 
-from src import IS_SENTRY_INSTALLED
-from src.transport.rest.constants import LOGGING_REQUEST_METHODS_WITHOUT_BODY, LOGGING_SUBSTRINGS_OF_ROUTES_FOR_SKIP
+from src import get_active_sentry
+from src.metrics.loop import loop_monitor
+from src.settings import get_settings
+from src.tracing.spans import CURRENT_TRACE, RequestTrace
+from src.transport.rest.content_negotiation import normalize_media_type
+from src.transport.rest.constants import LOGGING_ROUTES_FOR_SKIP
 from src.transport.rest.errors import LoggingError, ServerError
+from src.transport.rest.middlewares.access_log_queue import (
+    access_log_queue,
+    AccessLogQueue,
+    AccessLogSnapshot,
+    decode_headers,
+    log_access_record,
+)
+from src.transport.rest.middlewares.access_log_sampling import AccessLogSampler, get_access_log_sampler
+from src.transport.rest.middlewares.body_capture import (
+    BodyCapture,
+    decode_body_preview,
+    merge_input_data,
+    output_body_preview,
+    tee_body_iterator,
+    tee_receive,
+)
 from src.utils import dump_json, get_project_info, TRACE_ID
 
-try:  # noqa: SIM105
-    from sentry_sdk import Scope, capture_exception
-except ImportError:
-    pass
-
 
 class FastAPIRequestWrapper:
     _request_object: Request
+    capture: BodyCapture
 
     def __init__(
         self,
         request_object: Request,
+        body_limit: int,
     ) -> None:
         self._request_object = request_object
+        self.capture = BodyCapture(
+            limit=body_limit,
+            media_type=normalize_media_type(request_object.headers.get('content-type')),
+        )
+        if not hasattr(request_object, '_body'):
+            request_object._receive = tee_receive(request_object.receive, self.capture)  # noqa: SLF001
+        else:
+            self.capture.feed(request_object._body)  # noqa: SLF001
 
     @property
     def headers(
         self,
     ) -> str | None:
-        return dump_json(dict(self._request_object.headers))
+        return decode_headers(self.raw_headers)
+
+    @property
+    def raw_headers(
+        self,
+    ) -> list[tuple[bytes, bytes]]:
+        return self._request_object.scope['headers']
+
+    @property
+    def query_string(
+        self,
+    ) -> bytes:
+        return self._request_object.scope.get('query_string', b'')
 
     async def get_input_data(
         self,
     ) -> str | None:
         input_data = None
-        if self._request_object.method.upper() not in LOGGING_REQUEST_METHODS_WITHOUT_BODY:
-            with suppress(
-                UnicodeDecodeError,
-                RuntimeError,
-                JSONDecodeError,
-            ):
-                input_data = await self._request_object.json()
+        # the form is only reused when the handler has already parsed it, the stream is never re-read here
+        form = self._request_object._form  # noqa: SLF001
+        if self.capture.size and not form:
+            input_data = decode_body_preview(
+                bytes(self.capture.preview),
+                truncated=self.capture.truncated,
+                media_type=self.capture.media_type,
+            )
+
         if params := self._request_object.query_params:
-            input_data = input_data or {}
-            input_data.update(params._dict)  # noqa
+            input_data = merge_input_data(input_data, params._dict)  # noqa
 
-        if form := await self._request_object.form():
+        if form:
             input_data = input_data or {}
             form_file_names = []
             for item in form._list:
@@ -77,34 +112,71 @@ class FastAPIRequestWrapper:
     def path(self) -> str:
         return self._request_object.url.path
 
+    @property
+    def route_template(self) -> str:
+        route = self._request_object.scope.get('route')
+        return route.path_format if route is not None else self.path
+
 
 class FastAPIResponseWrapper:
     _response_object: Response
+    capture: BodyCapture
 
     def __init__(
         self,
         response_object: Response,
+        body_limit: int,
     ) -> None:
         self._response_object = response_object
+        self.capture = BodyCapture(
+            limit=body_limit,
+            media_type=normalize_media_type(response_object.headers.get('content-type')),
+        )
+        if body := getattr(response_object, 'body', None):
+            self.capture.feed(body)
+
+    @property
+    def is_streaming(
+        self,
+    ) -> bool:
+        return hasattr(self._response_object, 'body_iterator')
+
+    def on_stream_complete(
+        self,
+        callback: Callable[[Exception | None], Awaitable[None]],
+    ) -> None:
+        self._response_object.body_iterator = tee_body_iterator(
+            body_iterator=self._response_object.body_iterator,
+            capture=self.capture,
+            charset=self._response_object.charset,
+            on_complete=callback,
+        )
 
     @property
     def headers(
         self,
     ) -> str:
-        return dump_json(dict(self._response_object.headers))
+        return decode_headers(self.raw_headers)
+
+    @property
+    def raw_headers(
+        self,
+    ) -> list[tuple[bytes, bytes]]:
+        return self._response_object.raw_headers
 
     @property
     def output_data(
         self,
     ) -> str | None:
-        output_data = None
-        if not self._response_object.body:
-            return output_data
-        with suppress(
-            UnicodeDecodeError,
-        ):
-            output_data = self._response_object.body.decode()
-        return dump_json(output_data) if output_data else None
+        if not self.capture.size:
+            return None
+        return dump_json(
+            output_body_preview(
+                bytes(self.capture.preview),
+                truncated=self.capture.truncated,
+                media_type=self.capture.media_type,
+            )
+        )
 
     @property
     def status_code(
@@ -118,23 +190,54 @@ class LoggingMiddlewareBase(
 ):
     request_cls: type[FastAPIRequestWrapper]  # type: ignore
     response_cls: type[FastAPIResponseWrapper]  # type: ignore
-    logging_substrings_of_routes_for_skip: Sequence[str] = ()
+    logging_routes_for_skip: Collection[str] = frozenset()
+    access_log_queue: AccessLogQueue | None = None
+
+    def __init__(
+        self,
+        body_limit: int | None = None,
+        access_log_sampler: AccessLogSampler | None = None,
+    ) -> None:
+        self.body_limit = get_settings().env.logger.access_log_body_limit if body_limit is None else body_limit
+        self.access_log_sampler = access_log_sampler or get_access_log_sampler()
+        tracing_settings = get_settings().env.tracing
+        self.is_logging_spans = tracing_settings.enabled and tracing_settings.access_log_spans
 
     async def __call__(
         self,
         request: object,
         call_next: Callable[[object], Awaitable[object]],
     ) -> object:
-        wrapped_request: FastAPIRequestWrapper = self.request_cls(request)  # type: ignore
+        route = request.scope.get('route')  # type: ignore
+        if route is not None and route.path_format in self.logging_routes_for_skip:
+            return await call_next(request)
+
+        wrapped_request: FastAPIRequestWrapper = self.request_cls(request, self.body_limit)  # type: ignore
         wrapped_response: FastAPIResponseWrapper | None = None
         http_status_code = None
         start_time = time()
+        loop_mark = loop_monitor.mark()
         error = None
+        is_deferred = False
 
         try:
             response = await call_next(request)
-            wrapped_response = self.response_cls(response)  # type: ignore
+            wrapped_response = self.response_cls(response, self.body_limit)  # type: ignore
             http_status_code = wrapped_response.status_code
+            if wrapped_response.is_streaming:
+                # the status line is already sent when the body fails, the record keeps it next to the error
+                async def on_stream_complete(stream_error: Exception | None) -> None:
+                    await self._log(
+                        wrapped_request=wrapped_request,
+                        wrapped_response=wrapped_response,
+                        start_time=start_time,
+                        loop_mark=loop_mark,
+                        http_status_code=http_status_code,
+                        error=stream_error,
+                    )
+
+                wrapped_response.on_stream_complete(on_stream_complete)
+                is_deferred = True
             return response  # noqa: TRY300
         except ServerError as exc:
             error = exc
@@ -145,57 +248,142 @@ class LoggingMiddlewareBase(
             error = exc
             raise
         finally:
-            try:
-                if not any(
-                    substring
-                    for substring in self.logging_substrings_of_routes_for_skip
-                    if substring in wrapped_request.path
-                ):
-                    error_title = None
-                    error_message = None
-                    sentry_id = None
-                    error_details = None
-                    trace_id = TRACE_ID.get('UNSET')
-
-                    if error:
-                        error_title = error.title if isinstance(error, ServerError) else error.__class__.__name__
-                        error_message = error.message if isinstance(error, ServerError) else str(error)
-                        error_details = error.details if isinstance(error, ServerError) else None
-                        sentry_id = error.sentry_id if isinstance(error, ServerError) else None
-
-                    logger.info(
-                        {
-                            'destination': 'internal',
-                            'http_method': wrapped_request.http_method,
-                            'method': wrapped_request.method,
-                            'processing_time': time() - start_time,
-                            'http_status_code': http_status_code,
-                            'input_data': await wrapped_request.get_input_data(),
-                            'output_data': wrapped_response.output_data if wrapped_response else None,
-                            'request_headers': wrapped_request.headers,
-                            'response_headers': wrapped_response.headers if wrapped_response else None,
-                            'error_title': error_title,
-                            'error_message': error_message,
-                            'error_details': error_details,
-                            'sentry_id': sentry_id,
-                            'trace_id': trace_id,
-                            'service_version': get_project_info().version,
-                        }
+            if not is_deferred:
+                await self._log(
+                    wrapped_request=wrapped_request,
+                    wrapped_response=wrapped_response,
+                    start_time=start_time,
+                    loop_mark=loop_mark,
+                    http_status_code=http_status_code,
+                    error=error,
+                )
+
+    async def _log(
+        self,
+        *,
+        wrapped_request: FastAPIRequestWrapper,
+        wrapped_response: FastAPIResponseWrapper | None,
+        start_time: float,
+        loop_mark: tuple[int, float],
+        http_status_code: int | None,
+        error: Exception | None,
+    ) -> None:
+        try:
+            error_title = None
+            error_message = None
+            sentry_id = None
+            error_details = None
+            trace_id = TRACE_ID.get('UNSET')
+            trace = CURRENT_TRACE.get() if self.is_logging_spans else None
+            processing_time = time() - start_time
+            loop_lag = loop_monitor.max_lag_since(loop_mark)
+
+            if self.access_log_sampler.is_sampling and not self.access_log_sampler.should_log(
+                route=wrapped_request.route_template,
+                http_status_code=http_status_code,
+                is_error=error is not None,
+                processing_time=processing_time,
+                trace_id=TRACE_ID.get(None),
+            ):
+                return
+
+            if error:
+                error_title = error.title if isinstance(error, ServerError) else error.__class__.__name__
+                error_message = error.message if isinstance(error, ServerError) else str(error)
+                error_details = error.details if isinstance(error, ServerError) else None
+                sentry_id = error.sentry_id if isinstance(error, ServerError) else None
+
+            if self.access_log_queue is not None and self.access_log_queue.is_running:
+                await self.access_log_queue.put(
+                    self._make_snapshot(
+                        wrapped_request=wrapped_request,
+                        wrapped_response=wrapped_response,
+                        processing_time=processing_time,
+                        loop_lag=loop_lag,
+                        http_status_code=http_status_code,
+                        error_title=error_title,
+                        error_message=error_message,
+                        error_details=error_details,
+                        sentry_id=sentry_id,
+                        trace_id=trace_id,
+                        trace=trace,
                     )
+                )
+            else:
+                log_access_record(
+                    {
+                        'destination': 'internal',
+                        'http_method': wrapped_request.http_method,
+                        'method': wrapped_request.method,
+                        'processing_time': processing_time,
+                        'loop_lag': loop_lag,
+                        'http_status_code': http_status_code,
+                        'input_data': await wrapped_request.get_input_data(),
+                        'input_data_size': wrapped_request.capture.size,
+                        'input_data_hash': wrapped_request.capture.digest,
+                        'output_data': wrapped_response.output_data if wrapped_response else None,
+                        'output_data_size': wrapped_response.capture.size if wrapped_response else None,
+                        'output_data_hash': wrapped_response.capture.digest if wrapped_response else None,
+                        'request_headers': wrapped_request.headers,
+                        'response_headers': wrapped_response.headers if wrapped_response else None,
+                        'error_title': error_title,
+                        'error_message': error_message,
+                        'error_details': error_details,
+                        'sentry_id': sentry_id,
+                        'trace_id': trace_id,
+                        'trace': trace.as_access_log() if trace else None,
+                        'service_version': get_project_info().version,
+                    }
+                )
+
+        except Exception as exc:
+            try:
+                raise LoggingError(debug=str(exc)) from exc  # noqa
+            except LoggingError as exc:
+                if (sentry_sdk := get_active_sentry()) is not None:
+                    scope = sentry_sdk.Scope.get_current_scope()
+                    scope.set_extra(exc.__class__.__name__, str(exc))
+                    sentry_sdk.capture_exception(exc)
 
-            except Exception as exc:
-                try:
-                    raise LoggingError(debug=str(exc)) from exc  # noqa
-                except LoggingError as exc:
-                    if IS_SENTRY_INSTALLED:
-                        scope = Scope.get_current_scope()
-                        scope.set_extra(exc.__class__.__name__, str(exc))
-                        capture_exception(exc)
+    @staticmethod
+    def _make_snapshot(
+        *,
+        wrapped_request: FastAPIRequestWrapper,
+        wrapped_response: FastAPIResponseWrapper | None,
+        processing_time: float,
+        loop_lag: float | None,
+        http_status_code: int | None,
+        error_title: str | None,
+        error_message: str | None,
+        error_details: list[str] | None,
+        sentry_id: str | None,
+        trace_id: str,
+        trace: RequestTrace | None,
+    ) -> AccessLogSnapshot:
+        return AccessLogSnapshot(
+            http_method=wrapped_request.http_method,
+            method=wrapped_request.method,
+            processing_time=processing_time,
+            loop_lag=loop_lag,
+            http_status_code=http_status_code,
+            query_string=wrapped_request.query_string,
+            request_body=wrapped_request.capture,
+            response_body=wrapped_response.capture if wrapped_response else None,
+            request_headers=tuple(wrapped_request.raw_headers),
+            response_headers=tuple(wrapped_response.raw_headers) if wrapped_response else None,
+            error_title=error_title,
+            error_message=error_message,
+            error_details=error_details,
+            sentry_id=sentry_id,
+            trace_id=trace_id,
+            trace=trace,
+        )
 
 
 class FastAPILoggingMiddleware(
     LoggingMiddlewareBase,
 ):
-    logging_substrings_of_routes_for_skip = LOGGING_SUBSTRINGS_OF_ROUTES_FOR_SKIP
+    logging_routes_for_skip = LOGGING_ROUTES_FOR_SKIP
     request_cls = FastAPIRequestWrapper
     response_cls = FastAPIResponseWrapper
+    access_log_queue = access_log_queue
@@ -0,0 +1,37 @@
+from time import perf_counter
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.metrics.http import HTTPMetrics, UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp, http_metrics: HTTPMetrics) -> None:
+        self.app = app
+        self.http_metrics = http_metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        start_time = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # the router stores the matched route in the shared scope, so the template is known here
+            route = scope.get('route')
+            self.http_metrics.observe_request(
+                method=scope['method'],
+                route=route.path_format if route is not None else UNMATCHED_ROUTE,
+                status_code=status_code,
+                duration=perf_counter() - start_time,
+            )
@@ -0,0 +1,62 @@
+import asyncio
+from time import perf_counter
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.settings import ProfilingSettings
+from src.transport.rest.profiling import is_profile_caller_allowed, ProfileStore, RequestProfile, RequestProfiler
+from src.utils import TRACE_ID
+
+
+# reading profiles back takes the same header, those requests are not profiled themselves
+PROFILES_PATH = '/debug/profiles'
+
+
+# Sits inside TraceIdMiddleware so the profile is stored under the trace id the response carries.
+# Requests without the header cost one scan of the raw headers.
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp, settings: ProfilingSettings, store: ProfileStore) -> None:
+        self.app = app
+        self.settings = settings
+        self.store = store
+        self.header = settings.header.lower().encode('latin-1')
+        self.allowed_clients = frozenset(settings.allowed_clients)
+
+    def _is_requested(self, scope: Scope) -> bool:
+        value = next((value for key, value in scope['headers'] if key == self.header), None)
+        if value is None or scope['path'].startswith(PROFILES_PATH):
+            return False
+
+        client = scope.get('client')
+        return is_profile_caller_allowed(
+            value.decode('latin-1'),
+            client[0] if client else None,
+            secret=self.settings.secret,
+            allowed_clients=self.allowed_clients,
+        )
+
+    def _save(self, profiler: RequestProfiler, trace_id: str, scope: Scope, duration: float) -> None:
+        profiler.stop()
+        profile = RequestProfile(
+            trace_id=trace_id,
+            method=scope['method'],
+            path=scope['path'],
+            duration=duration,
+            samples=profiler.samples,
+            stacks=dict(profiler.stacks.most_common()),
+        )
+        self.store.set(profile)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http' or not self._is_requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profiler = RequestProfiler(interval=self.settings.sample_interval, max_duration=self.settings.max_duration)
+        started = perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            # joining the sampler waits for its current sample and the file write blocks, both off the loop
+            await asyncio.to_thread(self._save, profiler, TRACE_ID.get(), scope, perf_counter() - started)
@@ -1,29 +1,72 @@
-from uuid import uuid4
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
-from starlette.requests import Request
-from starlette.responses import Response
-
-from src import IS_SENTRY_INSTALLED
-from src.settings import Settings
+from src import get_active_sentry
+from src.settings import SettingsSnapshot
+from src.tracing.context import new_trace_id, parse_traceparent
+from src.tracing.exporters import span_exporter
+from src.tracing.spans import CURRENT_TRACE, RequestTrace
 from src.utils import TRACE_ID
 
-try:  # noqa: SIM105
-    from sentry_sdk import Scope, capture_exception
-except ImportError:
-    pass
 
+# TRACE_ID is the request id of the logs and the X-Request-ID header: the incoming header when there is one,
+# the W3C trace id otherwise. With tracing on, the request also gets a server span, a child of the incoming
+# traceparent; its spans go to the access log and sampled traces to the span exporter.
+class TraceIdMiddleware:
+    def __init__(self, app: ASGIApp, settings_snapshot: SettingsSnapshot) -> None:
+        self.app = app
+        self.settings_snapshot = settings_snapshot
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
 
-class TraceIdMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
-        current_trace = request.headers.get(Settings().trace_id_header, str(uuid4()))
+        settings = self.settings_snapshot.current
+        trace_id_header = settings.trace_id_header
+        headers = Headers(scope=scope)
+        trace = None
+        if settings.env.tracing.enabled:
+            trace = RequestTrace(
+                name=scope['method'],
+                parent=parse_traceparent(headers.get('traceparent'), headers.get('tracestate')),
+                sample_rate=settings.env.tracing.sample_rate,
+            )
+            CURRENT_TRACE.set(trace)
+        current_trace = headers.get(trace_id_header) or (trace.trace_id if trace else new_trace_id())
         TRACE_ID.set(current_trace)
 
-        if IS_SENTRY_INSTALLED:
-            scope: Scope = Scope.get_current_scope()
-            scope.set_extra('X-Trace-Id', TRACE_ID.get())
+        if (sentry_sdk := get_active_sentry()) is not None:
+            sentry_sdk.Scope.get_current_scope().set_extra('X-Trace-Id', current_trace)
+
+        async def send_with_trace_id(message: Message) -> None:
+            if message['type'] == 'http.response.start':
+                MutableHeaders(scope=message)[trace_id_header] = current_trace
+                if trace is not None:
+                    trace.root.attributes['http.response.status_code'] = message['status']
+                    trace.root.is_error = message['status'] >= 500  # noqa: PLR2004
+            await send(message)
+
+        if trace is None:
+            await self.app(scope, receive, send_with_trace_id)
+            return
 
-        response = await call_next(request)
-        response.headers[Settings().trace_id_header] = current_trace
+        try:
+            await self.app(scope, receive, send_with_trace_id)
+        except BaseException:
+            trace.root.is_error = True
+            raise
+        finally:
+            self._finish(trace, scope)
 
-        return response
+    @staticmethod
+    def _finish(trace: RequestTrace, scope: Scope) -> None:
+        root = trace.root
+        root.end()
+        if (route := getattr(scope.get('route'), 'path_format', None)) is not None:
+            root.name = f'{scope["method"]} {route}'
+            root.attributes['http.route'] = route
+        root.attributes['http.request.method'] = scope['method']
+        root.attributes['url.path'] = scope['path']
+        if trace.is_sampled and span_exporter.is_running:
+            span_exporter.submit(trace.spans)
@@ -0,0 +1,101 @@
+"""OpenAPI document built once and served pre-compressed with ETag revalidation.
+
+The document is loaded from an artifact when one exists, otherwise it is built from the app at startup.
+Build the artifact: python -m src.transport.rest.openapi [--output build/openapi.json]
+"""
+
+import argparse
+from dataclasses import dataclass
+from hashlib import blake2b
+from pathlib import Path
+
+from fastapi import FastAPI
+from loguru import logger
+from orjson import orjson
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+
+from src.transport.rest.content_encoding import (
+    AVAILABLE_ENCODINGS,
+    BROTLI,
+    choose_encoding,
+    compress,
+    GZIP,
+    IDENTITY,
+    ZSTD,
+)
+
+DEFAULT_ARTIFACT_PATH = Path('build/openapi.json')
+ARTIFACT_SUFFIXES = {GZIP: '.gz', BROTLI: '.br', ZSTD: '.zst'}
+
+
+@dataclass(frozen=True, slots=True)
+class OpenAPIDocument:
+    etag: str
+    bodies: dict[str, bytes]
+
+    @classmethod
+    def from_schema(cls, schema: dict) -> 'OpenAPIDocument':
+        body = orjson.dumps(schema)
+        return cls(
+            etag=f'"{blake2b(body, digest_size=16).hexdigest()}"',
+            bodies={IDENTITY: body} | {encoding: compress(body, encoding) for encoding in AVAILABLE_ENCODINGS},
+        )
+
+    # artifact files: <path> is the plain document, <path>.gz, .br and .zst its compressed copies
+    @classmethod
+    def load(cls, path: Path) -> 'OpenAPIDocument | None':
+        if not path.is_file():
+            return None
+        body = path.read_bytes()
+        bodies = {IDENTITY: body}
+        for encoding in AVAILABLE_ENCODINGS:
+            encoded_path = path.with_name(path.name + ARTIFACT_SUFFIXES[encoding])
+            bodies[encoding] = encoded_path.read_bytes() if encoded_path.is_file() else compress(body, encoding)
+        return cls(etag=f'"{blake2b(body, digest_size=16).hexdigest()}"', bodies=bodies)
+
+    def dump(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        for encoding, body in self.bodies.items():
+            path.with_name(path.name + ARTIFACT_SUFFIXES.get(encoding, '')).write_bytes(body)
+
+    async def endpoint(self, request: Request) -> Response:
+        headers = {'ETag': self.etag, 'Vary': 'Accept-Encoding', 'Cache-Control': 'no-cache'}
+        if request.headers.get('if-none-match') in {self.etag, f'W/{self.etag}', '*'}:
+            return Response(status_code=304, headers=headers)
+
+        encoding = choose_encoding(request.headers.get('accept-encoding'))
+        if encoding != IDENTITY:
+            headers['Content-Encoding'] = encoding
+        return Response(content=self.bodies[encoding], media_type='application/json', headers=headers)
+
+
+# replaces the route FastAPI registers for openapi_url, which builds the schema on the first hit per worker
+def init_openapi(app: FastAPI, artifact_path: Path | None) -> None:
+    if app.openapi_url is None:
+        return
+
+    if artifact_path is not None and (document := OpenAPIDocument.load(artifact_path)) is not None:
+        logger.info('OpenAPI document loaded from {}', artifact_path)
+    else:
+        document = OpenAPIDocument.from_schema(app.openapi())
+
+    route = Route(app.openapi_url, document.endpoint, methods=['GET'], include_in_schema=False)
+    app.router.routes[:] = [
+        route if getattr(current, 'path', None) == app.openapi_url else current for current in app.router.routes
+    ]
+
+
+def main() -> None:
+    from src.bootstrap import make_app  # noqa: PLC0415
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--output', type=Path, default=DEFAULT_ARTIFACT_PATH)
+    args = parser.parse_args()
+
+    OpenAPIDocument.from_schema(make_app().openapi()).dump(args.output)
+
+
+if __name__ == '__main__':
+    main()
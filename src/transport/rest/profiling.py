@@ -0,0 +1,243 @@
+"""Sampling profiles of single requests, requested with a signed header or from an allow-listed client.
+Reading the stored profiles back takes the same header.
+
+A background thread samples the event loop thread while the request runs. When the request's task is
+on the CPU the sample is the running stack; when it is suspended the sample is its await chain ending in
+`<await ...>`, so time spent waiting on the database or an upstream shows up next to CPU time.
+Each sample is weighted by the microseconds since the previous one: the sampler needs the GIL, which a busy
+event loop thread hands over only every `sys.getswitchinterval()`, so CPU-bound stretches get fewer but
+heavier samples. Profiles are stored by trace id as collapsed stacks (`frame;frame;frame microseconds`),
+the input format of flamegraph.pl and speedscope. The store is a directory shared by all workers, so the
+profile can be fetched from whichever worker serves the follow-up request.
+
+Sign a header value: python -m src.transport.rest.profiling [--ttl 300]
+"""
+
+import argparse
+import asyncio
+import hmac
+import os
+import sys
+import threading
+from collections import Counter
+from collections.abc import Collection
+from contextlib import suppress
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from hashlib import sha256
+from pathlib import Path
+from time import perf_counter, time
+from types import CodeType, FrameType
+from typing import Any
+
+from orjson import orjson
+
+
+@dataclass(frozen=True, slots=True)
+class RequestProfile:
+    trace_id: str
+    method: str
+    path: str
+    duration: float
+    samples: int
+    stacks: dict[str, int]
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            'trace_id': self.trace_id,
+            'method': self.method,
+            'path': self.path,
+            'duration': self.duration,
+            'samples': self.samples,
+        }
+
+    def collapsed(self) -> str:
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.items())
+
+
+# One JSON file per profile, named by a hash of the trace id since the id may come from the client.
+# All methods do blocking file I/O and are called from threads.
+class ProfileStore:
+    def __init__(self, path: Path, max_profiles: int, ttl: float) -> None:
+        self.path = path
+        self.max_profiles = max_profiles
+        self.ttl = ttl
+        path.mkdir(parents=True, exist_ok=True)
+
+    def _file(self, trace_id: str) -> Path:
+        return self.path.joinpath(f'{sha256(trace_id.encode()).hexdigest()}.json')
+
+    def get(self, trace_id: str) -> RequestProfile | None:
+        file = self._file(trace_id)
+        try:
+            if file.stat().st_mtime + self.ttl <= time():
+                return None
+            return RequestProfile(**orjson.loads(file.read_bytes()))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def set(self, profile: RequestProfile) -> None:
+        if self.max_profiles <= 0:
+            return
+        file = self._file(profile.trace_id)
+        tmp = file.with_name(f'{file.name}.{os.getpid()}.tmp')
+        tmp.write_bytes(orjson.dumps(asdict(profile)))
+        tmp.replace(file)
+        self._prune()
+
+    # oldest first, expired and unreadable files are skipped
+    def values(self) -> list[RequestProfile]:
+        profiles = []
+        for file in self._files():
+            with suppress(OSError, ValueError, TypeError):
+                profiles.append(RequestProfile(**orjson.loads(file.read_bytes())))
+        return profiles
+
+    def _files(self) -> list[Path]:
+        now = time()
+        mtimes = {}
+        for file in self.path.glob('*.json'):
+            with suppress(OSError):
+                if (mtime := file.stat().st_mtime) + self.ttl > now:
+                    mtimes[file] = mtime
+        return sorted(mtimes, key=mtimes.__getitem__)
+
+    def _prune(self) -> None:
+        now = time()
+        files = []
+        for file in self.path.glob('*.json'):
+            with suppress(OSError):
+                if (mtime := file.stat().st_mtime) + self.ttl <= now:
+                    file.unlink()
+                else:
+                    files.append((mtime, file))
+        for _, file in sorted(files)[: max(len(files) - self.max_profiles, 0)]:
+            with suppress(OSError):
+                file.unlink()
+
+
+def _signature(secret: str, expires: str) -> str:
+    return hmac.new(secret.encode(), expires.encode(), sha256).hexdigest()
+
+
+def sign_profile_header(secret: str, ttl: float = 300.0) -> str:
+    expires = str(int(time() + ttl))
+    return f'{expires}.{_signature(secret, expires)}'
+
+
+def verify_profile_header(value: str, secret: str) -> bool:
+    expires, _, signature = value.partition('.')
+    if not expires.isdigit() or int(expires) < time():
+        return False
+    return hmac.compare_digest(signature, _signature(secret, expires))
+
+
+# an allow-listed client only needs to send the header, anyone else needs a valid signature in it
+def is_profile_caller_allowed(
+    header_value: str | None,
+    client_host: str | None,
+    *,
+    secret: str,
+    allowed_clients: Collection[str],
+) -> bool:
+    if header_value is None:
+        return False
+    if client_host is not None and client_host in allowed_clients:
+        return True
+    return bool(secret) and verify_profile_header(header_value, secret)
+
+
+@lru_cache(maxsize=1024)
+def _short_path(filename: str) -> str:
+    path = Path(filename)
+    for base in sorted((Path(base) for base in sys.path if base), key=lambda base: len(base.parts), reverse=True):
+        if path.is_relative_to(base):
+            return str(path.relative_to(base))
+    return filename
+
+
+@lru_cache(maxsize=4096)
+def _code_label(code: CodeType) -> str:
+    # `;` separates frames in the collapsed format
+    return f'{code.co_qualname} ({_short_path(code.co_filename)}:{code.co_firstlineno})'.replace(';', ',')
+
+
+def _label(frame: FrameType) -> str:
+    return _code_label(frame.f_code)
+
+
+def _running_stack(frame: FrameType | None, root: FrameType | None) -> list[str]:
+    stack = []
+    while frame is not None:
+        stack.append(_label(frame))
+        if frame is root:
+            break
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _awaiting_stack(coro: Any) -> list[str]:
+    stack = []
+    while (frame := getattr(coro, 'cr_frame', None) or getattr(coro, 'gi_frame', None)) is not None:
+        stack.append(_label(frame))
+        coro = getattr(coro, 'cr_await', None) or getattr(coro, 'gi_yieldfrom', None)
+    stack.append(f'<await {type(coro).__name__}>')
+    return stack
+
+
+# Samples only the task it is started from: work handed to the threadpool or to other tasks shows up
+# as an `<await ...>` frame of that task.
+class RequestProfiler:
+    def __init__(self, interval: float, max_duration: float) -> None:
+        self.interval = interval
+        self.max_duration = max_duration
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.current_task()
+        self._thread_id = threading.get_ident()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    # blocks until the sampler thread exits, call it off the event loop
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        sampled_at = perf_counter()
+        deadline = sampled_at + self.max_duration
+        while not self._stopped.wait(self.interval) and (now := perf_counter()) < deadline:
+            self._sample(weight=round((now - sampled_at) * 1e6))
+            sampled_at = now
+
+    def _sample(self, weight: int) -> None:
+        coro = self._task.get_coro()
+        if asyncio.current_task(self._loop) is self._task:
+            stack = _running_stack(sys._current_frames().get(self._thread_id), root=coro.cr_frame)  # noqa: SLF001
+        else:
+            stack = _awaiting_stack(coro)
+        if stack:
+            self.stacks[';'.join(stack)] += weight
+            self.samples += 1
+
+
+def main() -> None:
+    from src.settings import get_settings  # noqa: PLC0415
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--ttl', type=float, default=300.0)
+    args = parser.parse_args()
+
+    settings = get_settings().env.profiling
+    if not settings.secret:
+        parser.error('PROFILING_SECRET is not set')
+    sys.stdout.write(f'{settings.header}: {sign_profile_header(settings.secret, args.ttl)}\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,36 +1,73 @@
 from collections.abc import Callable, Coroutine
-from functools import partial
+from functools import lru_cache, partial
 from typing import Any
 
 from fastapi import APIRouter
-from fastapi.responses import ORJSONResponse
 from fastapi.routing import APIRoute
 from starlette.requests import Request
 from starlette.responses import Response
 
+from src.metrics.http import get_http_metrics
+from src.settings import get_settings
+from src.transport.rest.content_negotiation import negotiate_content, NegotiatedResponse
+from src.transport.rest.deadline import get_route_timeout, RouteDeadline
 from src.transport.rest.middlewares.logging_middleware import FastAPILoggingMiddleware
+from src.transport.rest.tracing import trace_endpoint, trace_route, trace_serialization
 
 
 class _FastAPILoggingRoute(
     APIRoute,
 ):
+    # set by FastAPILoggingRouter(timeout=...) on a subclass, so it survives include_router()
+    timeout: float | None = None
+
     def get_route_handler(
         self,
     ) -> Callable[[Request], Coroutine[Any, Any, Response]]:
         middleware = FastAPILoggingMiddleware()
+        is_tracing = get_settings().env.tracing.enabled
+        if is_tracing:
+            self.dependant.call = trace_endpoint(self.dependant.call)
         original_route_handler = super().get_route_handler()
-        return partial(
+        if is_tracing:
+            original_route_handler = partial(trace_serialization, call_next=original_route_handler)
+        if route_cache := getattr(self.endpoint, '__route_cache__', None):
+            original_route_handler = partial(route_cache, call_next=original_route_handler)
+        if get_settings().env.metrics.enabled:
+            route_in_flight = get_http_metrics().route_in_flight(route=self.path_format, methods=self.methods)
+            original_route_handler = partial(route_in_flight, call_next=original_route_handler)
+        if (deadline_settings := get_settings().env.deadline).enabled:
+            route_deadline = RouteDeadline(
+                timeout=get_route_timeout(self.endpoint, default=self.timeout or deadline_settings.default_timeout),
+                settings=deadline_settings,
+            )
+            original_route_handler = partial(route_deadline, call_next=original_route_handler)
+        original_route_handler = partial(
+            negotiate_content,
+            call_next=original_route_handler,
+            decode_request_body=self.body_field is not None,
+        )
+        original_route_handler = partial(
             middleware,
             call_next=original_route_handler,
         )
+        if is_tracing:
+            original_route_handler = partial(trace_route, call_next=original_route_handler)
+        return original_route_handler
+
+
+@lru_cache
+def _route_class_with_timeout(timeout: float) -> type[_FastAPILoggingRoute]:
+    return type(_FastAPILoggingRoute.__name__, (_FastAPILoggingRoute,), {'timeout': timeout})
 
 
 class FastAPILoggingRouter(APIRouter):
-    def __init__(self, *args, **kwargs):
+    # timeout - seconds for every route of the router, instead of DEADLINE_DEFAULT_TIMEOUT
+    def __init__(self, *args, timeout: float | None = None, **kwargs):
         if not kwargs.get('default_response_class'):
-            kwargs['default_response_class'] = ORJSONResponse
+            kwargs['default_response_class'] = NegotiatedResponse
 
         if not kwargs.get('route_class'):
-            kwargs['route_class'] = _FastAPILoggingRoute
+            kwargs['route_class'] = _FastAPILoggingRoute if timeout is None else _route_class_with_timeout(timeout)
 
         super().__init__(*args, **kwargs)
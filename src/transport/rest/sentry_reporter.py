@@ -0,0 +1,196 @@
+import queue
+import random
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from time import monotonic
+from types import TracebackType
+from typing import TYPE_CHECKING
+from uuid import uuid4
+
+from loguru import logger
+
+from src import get_active_sentry
+from src.settings import SentryReportingMode, SentrySettings
+
+if TYPE_CHECKING:
+    from sentry_sdk import Scope
+
+Fingerprint = tuple[str, str, int]
+
+
+@dataclass
+class SentryReporterStats:
+    enqueued: int = 0
+    reported: int = 0
+    sampled_out: int = 0
+    rate_limited: int = 0
+    deduplicated: int = 0
+    dropped: int = 0
+    failed: int = 0
+
+
+@dataclass(slots=True)
+class _Report:
+    event_id: str
+    exc: BaseException
+    scope: 'Scope'
+
+
+class _TokenBucket:
+    __slots__ = ('capacity', 'tokens', 'updated_at')
+
+    def __init__(self, per_minute: int) -> None:
+        self.capacity = per_minute
+        self.tokens = float(per_minute)
+        self.updated_at = monotonic()
+
+    def take(self) -> bool:
+        now = monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.capacity / 60)
+        self.updated_at = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+def _fingerprint(exc: BaseException) -> Fingerprint:
+    tb: TracebackType | None = exc.__traceback__
+    while tb is not None and tb.tb_next is not None:
+        tb = tb.tb_next
+    if tb is None:
+        return exc.__class__.__qualname__, '', 0
+    return exc.__class__.__qualname__, tb.tb_frame.f_code.co_filename, tb.tb_lineno
+
+
+# Sampling, rate limits and deduplication run inline and are O(1); building and sending the
+# event (frame serialization included) happens in a daemon thread, so the event loop never pays for it.
+# The event id is generated up front and returned to the caller for the X-Sentry-ID header.
+class SentryReporter:
+    def __init__(self) -> None:
+        self.stats = SentryReporterStats()
+        self.settings: SentrySettings | None = None
+        self._queue: queue.Queue[_Report | None] | None = None
+        self._thread: threading.Thread | None = None
+        self._buckets: dict[str, _TokenBucket] = {}
+        self._recent: OrderedDict[Fingerprint, tuple[float, str]] = OrderedDict()
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def size(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def start(self, settings: SentrySettings) -> None:
+        if self.is_running:
+            return
+        self.settings = settings
+        self._buckets.clear()
+        self._recent.clear()
+        self._queue = queue.Queue(maxsize=settings.queue_size)
+        self._thread = threading.Thread(target=self._run, name='sentry-reporter', daemon=True)
+        self._thread.start()
+
+    def stop(self, drain_timeout: float = 5.0) -> None:
+        if not self.is_running:
+            return
+        try:
+            self._queue.put(None, timeout=drain_timeout)
+        except queue.Full:
+            logger.warning('Sentry reporter queue is still full, {} reports are lost', self._queue.qsize())
+        self._thread.join(timeout=drain_timeout)
+        self._thread = None
+
+    def capture(
+        self,
+        exc: BaseException,
+        *,
+        title: str,
+        tags: dict[str, str],
+        extras: dict[str, object],
+    ) -> str | None:
+        now = monotonic()
+        while self._recent and next(iter(self._recent.values()))[0] <= now:
+            self._recent.popitem(last=False)
+        fingerprint = _fingerprint(exc)
+        if (recent := self._recent.get(fingerprint)) is not None:
+            self.stats.deduplicated += 1
+            return recent[1]
+
+        if random.random() >= self.settings.sample_rates.get(title, self.settings.default_sample_rate):
+            self.stats.sampled_out += 1
+            return None
+
+        if not self._take_token(title):
+            self.stats.rate_limited += 1
+            return None
+
+        from sentry_sdk import Scope  # noqa: PLC0415
+
+        scope = Scope.get_isolation_scope().fork()
+        scope.update_from_scope(Scope.get_current_scope())
+        for key, value in tags.items():
+            scope.set_tag(key, value)
+        for key, value in extras.items():
+            scope.set_extra(key, value)
+
+        event_id = uuid4().hex
+        try:
+            self._queue.put_nowait(_Report(event_id=event_id, exc=exc, scope=scope))
+        except queue.Full:
+            self.stats.dropped += 1
+            return None
+
+        self.stats.enqueued += 1
+        if self.settings.dedup_window:
+            self._recent[fingerprint] = (now + self.settings.dedup_window, event_id)
+        return event_id
+
+    def _take_token(self, title: str) -> bool:
+        if (bucket := self._buckets.get(title)) is None:
+            per_minute = self.settings.rate_limits_per_minute.get(title, self.settings.default_rate_limit_per_minute)
+            if per_minute is None:
+                return True
+            bucket = self._buckets[title] = _TokenBucket(per_minute)
+        return bucket.take()
+
+    def _run(self) -> None:
+        while (report := self._queue.get()) is not None:
+            try:
+                import sentry_sdk  # noqa: PLC0415
+                from sentry_sdk.utils import event_from_exception  # noqa: PLC0415
+
+                event, hint = event_from_exception(report.exc, client_options=sentry_sdk.get_client().options)
+                event['event_id'] = report.event_id
+                sentry_sdk.capture_event(event, hint=hint, scope=report.scope)
+                self.stats.reported += 1
+            except Exception:  # noqa: BLE001
+                self.stats.failed += 1
+
+
+sentry_reporter = SentryReporter()
+
+
+def report_exception(
+    exc: BaseException,
+    *,
+    title: str,
+    tags: dict[str, str],
+    extras: dict[str, object],
+    settings: SentrySettings,
+) -> str | None:
+    if (sentry_sdk := get_active_sentry()) is None:
+        return None
+
+    if settings.reporting_mode == SentryReportingMode.BACKGROUND and sentry_reporter.is_running:
+        return sentry_reporter.capture(exc, title=title, tags=tags, extras=extras)
+
+    scope = sentry_sdk.Scope.get_current_scope()
+    for key, value in tags.items():
+        scope.set_tag(key, value)
+    for key, value in extras.items():
+        scope.set_extra(key, value)
+    return sentry_sdk.capture_exception(exc)
@@ -0,0 +1,53 @@
+from asyncio import iscoroutinefunction
+from collections.abc import Awaitable, Callable
+from functools import wraps
+from typing import Any
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from src.tracing.spans import CURRENT_TRACE, start_span
+
+# Phases of a request under its server span:
+#   middleware    - from the server span's start to the route: inbound middlewares and routing
+#   handler       - the endpoint call
+#   serialization - from the endpoint's return value to the rendered response: response model, encoding
+# Body parsing and dependencies are what is left of the route between `middleware` and `handler`.
+
+
+async def trace_route(
+    request: Request,
+    call_next: Callable[[Request], Awaitable[Response]],
+) -> Response:
+    if (trace := CURRENT_TRACE.get()) is not None:
+        trace.start_span('middleware', start_ns=trace.root.start_ns).end()
+    return await call_next(request)
+
+
+async def trace_serialization(
+    request: Request,
+    call_next: Callable[[Request], Awaitable[Response]],
+) -> Response:
+    response = await call_next(request)
+    if (trace := CURRENT_TRACE.get()) is not None and (handler := trace.find('handler')) is not None:
+        trace.start_span('serialization', start_ns=handler.end_ns).end()
+    return response
+
+
+# Keeps the endpoint sync or async: FastAPI decides from the callable whether to run it in the threadpool
+def trace_endpoint(call: Callable[..., Any]) -> Callable[..., Any]:
+    if iscoroutinefunction(call):
+
+        @wraps(call)
+        async def traced_coroutine(*args: Any, **kwargs: Any) -> Any:
+            with start_span('handler'):
+                return await call(*args, **kwargs)
+
+        return traced_coroutine
+
+    @wraps(call)
+    def traced(*args: Any, **kwargs: Any) -> Any:
+        with start_span('handler'):
+            return call(*args, **kwargs)
+
+    return traced
@@ -1,7 +1,10 @@
+import random
+import zlib
 from contextvars import ContextVar
 from dataclasses import dataclass
 from functools import lru_cache
 from pathlib import Path
+from time import monotonic
 from tomllib import load
 from typing import Any
 
@@ -10,6 +13,21 @@ from orjson import orjson
 from src.settings import get_settings
 
 TRACE_ID: ContextVar[str] = ContextVar('TraceId')
+# time.monotonic() by which the current request has to be answered, None - no deadline
+DEADLINE: ContextVar[float | None] = ContextVar('Deadline', default=None)
+
+
+def remaining_budget() -> float | None:
+    deadline = DEADLINE.get()
+    return None if deadline is None else max(deadline - monotonic(), 0.0)
+
+
+# A stable point in [0, 1) per trace id: a trace is kept wherever its point is below the sample rate,
+# so every record of one trace makes the same decision for the same rate.
+def trace_sample_point(trace_id: str | None) -> float:
+    if not trace_id:
+        return random.random()
+    return zlib.crc32(trace_id.encode()) / 0x1_0000_0000
 
 
 @dataclass
@@ -20,8 +38,10 @@ class ProjectInfo:
 
 @lru_cache
 def get_project_info(
-    pyproject_path: Path = get_settings().root_path.joinpath('pyproject.toml'),
+    pyproject_path: Path | None = None,
 ) -> ProjectInfo:
+    if pyproject_path is None:
+        pyproject_path = get_settings().root_path.joinpath('pyproject.toml')
     with pyproject_path.open('rb') as f:
         pyproject_data = load(f)
 
@@ -0,0 +1,354 @@
+import asyncio
+from collections.abc import AsyncGenerator, AsyncIterator, Callable
+from time import monotonic
+
+import httpx
+import pytest
+from orjson import orjson
+
+from src.integrations import http_client as http_client_module
+from src.integrations.http_client import CircuitState, ExternalHTTPClient
+from src.settings import HTTPClientSettings
+from src.transport.rest.errors import CircuitOpenError, ExternalServiceError, RequestTimeoutError
+from src.utils import DEADLINE, TRACE_ID
+
+TRACE_ID_HEADER = 'X-Request-ID'
+URL = 'http://upstream.test/items'
+ORIGIN = 'http://upstream.test:80'
+
+
+def make_client(handler: Callable, **settings) -> ExternalHTTPClient:
+    return ExternalHTTPClient(
+        settings=HTTPClientSettings(**{'retry_backoff': 0, **settings}),
+        trace_id_header=TRACE_ID_HEADER,
+        transport=httpx.MockTransport(handler),
+    )
+
+
+# replays `replies` in order: a status code, a response, or a transport error class to raise
+def replay(*replies) -> tuple[Callable, list[httpx.Request]]:
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        reply = replies[len(requests) - 1]
+        if isinstance(reply, type) and issubclass(reply, httpx.TransportError):
+            raise reply('boom', request=request)
+        return reply if isinstance(reply, httpx.Response) else httpx.Response(reply)
+
+    return handler, requests
+
+
+@pytest.fixture()
+def access_records(monkeypatch: pytest.MonkeyPatch) -> list[dict]:
+    records = []
+    monkeypatch.setattr(http_client_module, 'log_access_record', records.append)
+    return records
+
+
+@pytest.fixture()
+def sleeps(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    delays = []
+    sleep = asyncio.sleep
+
+    async def fake_sleep(delay: float) -> None:
+        delays.append(delay)
+        await sleep(0)
+
+    monkeypatch.setattr(http_client_module.asyncio, 'sleep', fake_sleep)
+    return delays
+
+
+# async, so the deadline is set and reset in the context the test body runs in
+@pytest.fixture()
+async def deadline_in() -> AsyncGenerator[Callable[[float], None]]:
+    tokens = []
+
+    def set_deadline(budget: float) -> None:
+        tokens.append(DEADLINE.set(monotonic() + budget))
+
+    yield set_deadline
+    for token in reversed(tokens):
+        DEADLINE.reset(token)
+
+
+async def test_idempotent_request_is_retried_on_retry_status(access_records):
+    handler, requests = replay(503, 502, 200)
+    client = make_client(handler, retries=2)
+
+    response = await client.get(URL)
+
+    assert response.status_code == 200
+    assert len(requests) == 3
+    assert client.stats.retries == 2
+    assert [record['http_status_code'] for record in access_records] == [503, 502, 200]
+
+
+async def test_last_response_is_returned_when_retries_run_out(access_records):
+    handler, requests = replay(503, 503)
+    client = make_client(handler, retries=1)
+
+    response = await client.get(URL)
+
+    assert response.status_code == 503
+    assert len(requests) == 2
+    assert client.stats.failed == 0
+
+
+async def test_non_idempotent_request_is_not_retried(access_records):
+    handler, requests = replay(503, 201)
+    client = make_client(handler, retries=2)
+
+    response = await client.post(URL, json={'name': 'item'})
+
+    assert response.status_code == 503
+    assert len(requests) == 1
+
+
+async def test_non_idempotent_request_is_retried_when_explicitly_idempotent(access_records):
+    handler, requests = replay(503, 201)
+    client = make_client(handler, retries=2)
+
+    response = await client.post(URL, json={'name': 'item'}, is_idempotent=True)
+
+    assert response.status_code == 201
+    assert len(requests) == 2
+
+
+async def test_non_idempotent_request_is_retried_when_it_was_not_sent(access_records):
+    handler, requests = replay(httpx.ConnectError, 201)
+    client = make_client(handler, retries=2)
+
+    response = await client.post(URL, json={'name': 'item'})
+
+    assert response.status_code == 201
+    assert len(requests) == 2
+
+
+async def test_non_idempotent_request_is_not_retried_after_it_was_sent(access_records):
+    handler, requests = replay(httpx.ReadError, 201)
+    client = make_client(handler, retries=2)
+
+    with pytest.raises(ExternalServiceError):
+        await client.post(URL, json={'name': 'item'})
+
+    assert len(requests) == 1
+    assert client.stats.failed == 1
+    assert access_records[0]['error_title'] == 'ExternalServiceError'
+
+
+async def test_retry_waits_for_retry_after(access_records, sleeps):
+    handler, requests = replay(httpx.Response(503, headers={'Retry-After': '1'}), 200)
+    client = make_client(handler, retries=1, retry_backoff_max=2)
+
+    response = await client.get(URL)
+
+    assert response.status_code == 200
+    assert sleeps == [1]
+
+
+async def test_retry_after_longer_than_backoff_max_is_not_waited_for(access_records, sleeps):
+    handler, requests = replay(httpx.Response(429, headers={'Retry-After': '60'}), 200)
+    client = make_client(handler, retries=1, retry_backoff_max=2)
+
+    response = await client.get(URL)
+
+    assert response.status_code == 429
+    assert len(requests) == 1
+    assert sleeps == []
+
+
+async def test_retry_after_past_deadline_is_not_waited_for(access_records, sleeps, deadline_in):
+    handler, requests = replay(httpx.Response(503, headers={'Retry-After': '1'}), 200)
+    client = make_client(handler, retries=1, retry_backoff_max=2)
+    deadline_in(0.5)
+
+    response = await client.get(URL)
+
+    assert response.status_code == 503
+    assert len(requests) == 1
+    assert sleeps == []
+
+
+async def test_circuit_breaker_opens_half_opens_and_closes(access_records):
+    probe_started = asyncio.Event()
+    probe_finish = asyncio.Event()
+    statuses = iter((500, 500))
+    requests = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if (status_code := next(statuses, None)) is not None:
+            return httpx.Response(status_code)
+        probe_started.set()
+        await probe_finish.wait()
+        return httpx.Response(200)
+
+    client = make_client(handler, retries=0, breaker_failure_threshold=2, breaker_reset_timeout=0.05)
+    breaker_state = lambda: client.breakers[ORIGIN].state  # noqa: E731
+
+    assert (await client.get(URL)).status_code == 500
+    assert breaker_state() == CircuitState.CLOSED
+    assert (await client.get(URL)).status_code == 500
+    assert breaker_state() == CircuitState.OPEN
+
+    with pytest.raises(CircuitOpenError):
+        await client.get(URL)
+    assert len(requests) == 2
+    assert client.stats.rejected == 1
+    assert access_records[-1]['error_title'] == 'CircuitOpenError'
+
+    await asyncio.sleep(0.06)
+    probe = asyncio.create_task(client.get(URL))
+    await probe_started.wait()
+    assert breaker_state() == CircuitState.HALF_OPEN
+    # a single probe at a time, the rest is still rejected
+    with pytest.raises(CircuitOpenError):
+        await client.get(URL)
+
+    probe_finish.set()
+    assert (await probe).status_code == 200
+    assert breaker_state() == CircuitState.CLOSED
+    assert client.breakers[ORIGIN].failures == 0
+    assert len(requests) == 3
+
+
+async def test_circuit_breaker_reopens_when_probe_fails(access_records):
+    handler, requests = replay(500, 500)
+    client = make_client(handler, retries=0, breaker_failure_threshold=1, breaker_reset_timeout=0.05)
+
+    await client.get(URL)
+    assert client.breakers[ORIGIN].state == CircuitState.OPEN
+
+    await asyncio.sleep(0.06)
+    assert (await client.get(URL)).status_code == 500
+    assert client.breakers[ORIGIN].state == CircuitState.OPEN
+    with pytest.raises(CircuitOpenError):
+        await client.get(URL)
+    assert len(requests) == 2
+
+
+class _PausedStream(httpx.AsyncByteStream):
+    def __init__(self, paused: asyncio.Event, resume: asyncio.Event, *, error: type[Exception] | None = None) -> None:
+        self.paused = paused
+        self.resume = resume
+        self.error = error
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        yield b'first,'
+        self.paused.set()
+        await self.resume.wait()
+        if self.error is not None:
+            raise self.error('connection lost')
+        yield b'second'
+
+
+async def test_host_slot_is_held_while_streaming_and_released_after(access_records):
+    paused, resume = asyncio.Event(), asyncio.Event()
+    streams = iter((_PausedStream(paused, resume),))
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if (stream := next(streams, None)) is not None:
+            return httpx.Response(200, stream=stream)
+        return httpx.Response(200, content=b'next')
+
+    client = make_client(handler, max_connections_per_host=1, pool_timeout=0.1)
+
+    streamed = asyncio.create_task(client.get(URL))
+    await paused.wait()
+    assert client.transport.in_use() == {ORIGIN: 1}
+
+    resume.set()
+    assert (await streamed).content == b'first,second'
+    assert client.transport.in_use() == {}
+    assert (await client.get(URL)).content == b'next'
+
+
+async def test_host_slot_is_released_when_stream_fails(access_records):
+    paused, resume = asyncio.Event(), asyncio.Event()
+    stream = _PausedStream(paused, resume, error=httpx.ReadError)
+    client = make_client(lambda request: httpx.Response(200, stream=stream), max_connections_per_host=1, retries=0)
+
+    streamed = asyncio.create_task(client.get(URL))
+    await paused.wait()
+    resume.set()
+
+    with pytest.raises(ExternalServiceError):
+        await streamed
+    assert client.transport.in_use() == {}
+
+
+async def test_busy_host_times_out_on_its_slot(access_records):
+    paused, resume = asyncio.Event(), asyncio.Event()
+    client = make_client(
+        lambda request: httpx.Response(200, stream=_PausedStream(paused, resume)),
+        max_connections_per_host=1,
+        pool_timeout=0.05,
+        retries=0,
+    )
+
+    streamed = asyncio.create_task(client.get(URL))
+    await paused.wait()
+    with pytest.raises(ExternalServiceError) as exc_info:
+        await client.get(URL)
+    assert exc_info.value.message == 'No free connection to the external service'
+
+    resume.set()
+    await streamed
+    # the local pool being full says nothing about the host
+    assert client.breakers[ORIGIN].state == CircuitState.CLOSED
+
+
+async def test_timeouts_are_capped_by_request_deadline(access_records, deadline_in):
+    handler, requests = replay(200, 200)
+    client = make_client(handler, timeout=30, connect_timeout=5, pool_timeout=5)
+
+    await client.get(URL)
+    assert requests[0].extensions['timeout'] == {'connect': 5, 'read': 30, 'write': 30, 'pool': 5}
+
+    deadline_in(0.5)
+    await client.get(URL)
+    assert all(0 < value <= 0.5 for value in requests[1].extensions['timeout'].values())
+
+
+async def test_no_attempt_is_made_past_request_deadline(access_records, deadline_in):
+    handler, requests = replay(200)
+    client = make_client(handler)
+    deadline_in(-1)
+
+    with pytest.raises(RequestTimeoutError):
+        await client.get(URL)
+    assert requests == []
+
+
+async def test_attempt_is_logged_as_external_record_with_trace_id(access_records):
+    handler, requests = replay(201)
+    client = make_client(handler)
+
+    await client.post(
+        f'{URL}?dry_run=1',
+        json={'name': 'item'},
+        headers={'Authorization': 'Bearer secret'},
+    )
+
+    trace_id = TRACE_ID.get()
+    assert requests[0].headers[TRACE_ID_HEADER] == trace_id
+    [record] = access_records
+    assert record['destination'] == 'external'
+    assert record['trace_id'] == trace_id
+    assert record['http_method'] == 'POST'
+    assert record['method'] == URL
+    assert record['http_status_code'] == 201
+    assert orjson.loads(record['input_data']) == {'name': 'item', 'dry_run': '1'}
+    request_headers = orjson.loads(record['request_headers'])
+    assert request_headers['Authorization'] == '***'
+    assert request_headers[TRACE_ID_HEADER] == trace_id
+
+
+async def test_trace_id_header_set_by_caller_is_kept(access_records):
+    handler, requests = replay(200)
+    client = make_client(handler)
+
+    await client.get(URL, headers={TRACE_ID_HEADER: 'caller-trace'})
+
+    assert requests[0].headers[TRACE_ID_HEADER] == 'caller-trace'
@@ -0,0 +1,136 @@
+import gzip
+from datetime import UTC, datetime
+from pathlib import Path
+
+import pytest
+from orjson import orjson
+
+from src import log_index as log_index_module
+from src.log_index import LogIndex, LogRotationIndexer, search_logs
+
+BASE_TS = datetime(2026, 10, 1, tzinfo=UTC).timestamp()
+
+
+def make_line(ts_offset: float, trace_id: str | None, *, status_code: int = 200, route: str = '/items') -> bytes:
+    extra = {'trace_id': trace_id, 'http_status_code': status_code, 'route': route} if trace_id else {}
+    record = {
+        'time': {'timestamp': BASE_TS + ts_offset},
+        'extra': extra,
+        # the message is the repr of the whole access record, bodies included
+        'message': f"{{'trace_id': 'body-{trace_id}'}}",
+    }
+    return orjson.dumps({'text': 'line\n', 'record': record}, option=orjson.OPT_APPEND_NEWLINE)
+
+
+def write_log(path: Path, *lines: bytes) -> Path:
+    path.write_bytes(b''.join(lines))
+    return path
+
+
+def at(ts_offset: float) -> datetime:
+    return datetime.fromtimestamp(BASE_TS + ts_offset, tz=UTC)
+
+
+def trace_ids(records) -> list[str]:
+    return [record['extra']['trace_id'] for record in records]
+
+
+@pytest.fixture()
+def small_segments(monkeypatch: pytest.MonkeyPatch) -> None:
+    # a few lines per gzip member, so reads cross segments
+    monkeypatch.setattr(log_index_module, 'SEGMENT_SIZE', 600)
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_rotated_file_round_trips_through_its_index(tmp_path: Path, small_segments, compress):
+    lines = [make_line(offset, f'trace-{offset % 3}', status_code=200 + offset) for offset in range(12)]
+    # out of order, blank and foreign lines are all seen in real files
+    rotated = write_log(tmp_path / 'app.2026-10-01.log', *lines[6:], b'\n', b'not json\n', *lines[:6])
+
+    LogRotationIndexer(compress=compress)(str(rotated))
+
+    data_path = tmp_path / ('app.2026-10-01.log.gz' if compress else 'app.2026-10-01.log')
+    assert rotated.exists() is not compress
+    index = LogIndex.load(data_path.with_name(data_path.name + '.idx'))
+    assert index.data_path == data_path
+    assert index.compressed is compress
+    assert index.time_range == [BASE_TS, BASE_TS + 11]
+    assert [entry[0] for entry in index.entries] == sorted(entry[0] for entry in index.entries)
+    if compress:
+        assert len(index.segments) > 1
+        # still one gzip stream for zcat
+        assert sorted(gzip.decompress(data_path.read_bytes()).splitlines(keepends=True)) == sorted(lines)
+
+    assert list(index.read(index.find(trace_id='trace-1', since=None, until=None))) == lines[1::3]
+    assert list(index.read(index.find(trace_id=None, since=BASE_TS + 3, until=BASE_TS + 5))) == lines[3:6]
+    assert list(index.read(index.find(trace_id='trace-1', since=BASE_TS + 2, until=None))) == lines[4::3]
+    assert index.find(trace_id='missing', since=None, until=None) == []
+
+
+def test_index_uses_the_records_extra_not_the_message(tmp_path: Path):
+    rotated = write_log(tmp_path / 'app.2026-10-01.log', make_line(0, 'real'))
+
+    LogRotationIndexer(compress=False)(str(rotated))
+
+    index = LogIndex.load(tmp_path / 'app.2026-10-01.log.idx')
+    assert set(index.traces) == {'real'}
+    [(_, _, _, _, status_code, route, _)] = index.entries
+    assert (status_code, route) == (200, '/items')
+
+
+def test_index_written_as_one_document_still_loads(tmp_path: Path):
+    rotated = write_log(tmp_path / 'app.2026-10-01.log', make_line(0, 'a'), make_line(1, 'b'))
+    LogRotationIndexer(compress=False)(str(rotated))
+    index_path = tmp_path / 'app.2026-10-01.log.idx'
+    header, _, body = index_path.read_bytes().partition(b'\n')
+    index_path.write_bytes(orjson.dumps({**orjson.loads(header), **orjson.loads(body)}))
+
+    index = LogIndex.load(index_path)
+
+    assert list(index.read(index.find(trace_id='b', since=None, until=None))) == [make_line(1, 'b')]
+
+
+@pytest.fixture()
+def log_path(tmp_path: Path, small_segments) -> Path:
+    log_path = tmp_path / 'app.log'
+    first = write_log(tmp_path / 'app.2026-10-01_00-00-00.log', *(make_line(offset, 'shared') for offset in range(3)))
+    second = write_log(
+        tmp_path / 'app.2026-10-01_01-00-00.log',
+        *(make_line(offset, 'shared' if offset % 2 else f'own-{offset}') for offset in range(10, 20)),
+    )
+    LogRotationIndexer(compress=True)(str(first))
+    LogRotationIndexer(compress=False)(str(second))
+    write_log(log_path, make_line(30, 'shared'), make_line(31, 'active'), b'{"partial')
+    return log_path
+
+
+def test_search_by_trace_id_spans_rotated_and_active_files(log_path: Path):
+    records = list(search_logs(log_path, trace_id='shared'))
+
+    assert [record['time']['timestamp'] - BASE_TS for record in records] == [0, 1, 2, 11, 13, 15, 17, 19, 30]
+    assert trace_ids(search_logs(log_path, trace_id='active')) == ['active']
+    assert list(search_logs(log_path, trace_id='missing')) == []
+
+
+def test_search_by_time_window(log_path: Path):
+    assert trace_ids(search_logs(log_path, since=at(2), until=at(11))) == ['shared', 'own-10', 'shared']
+    assert trace_ids(search_logs(log_path, since=at(25))) == ['shared', 'active']
+    assert trace_ids(search_logs(log_path, trace_id='shared', until=at(1))) == ['shared', 'shared']
+
+
+def test_search_stops_at_limit(log_path: Path):
+    assert len(list(search_logs(log_path, trace_id='shared', limit=4))) == 4
+
+
+def test_search_skips_rotated_files_outside_the_window_by_header(log_path: Path):
+    # the first file ends before the window: only its header line is read, neither the entries nor the data
+    index_path = log_path.parent / 'app.2026-10-01_00-00-00.log.gz.idx'
+    index_path.write_bytes(index_path.read_bytes().partition(b'\n')[0] + b'\nnot json')
+    (log_path.parent / 'app.2026-10-01_00-00-00.log.gz').unlink()
+
+    assert trace_ids(search_logs(log_path, since=at(10), until=at(11))) == ['own-10', 'shared']
+
+
+def test_search_needs_a_trace_id_or_a_window(log_path: Path):
+    with pytest.raises(ValueError, match='trace_id or a time window'):
+        search_logs(log_path)
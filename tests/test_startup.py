@@ -0,0 +1,17 @@
+import os
+from statistics import median
+
+from benchmarks.bench_startup import _run_child
+
+# import of src.bootstrap + make_app() + lifespan startup + the first request, median of fresh interpreters;
+# well above a cold start here (~1.2s), raise or lower it per machine with TEST_STARTUP_MAX_SECONDS
+STARTUP_MAX_SECONDS = float(os.environ.get('TEST_STARTUP_MAX_SECONDS', '3.0'))
+STARTUP_RUNS = 3
+
+
+def test_cold_start_is_within_budget():
+    runs = [_run_child() for _ in range(STARTUP_RUNS)]
+
+    total = median(run['total'] for run in runs)
+    phases = {phase: round(median(run[phase] for run in runs), 3) for phase in runs[0]}
+    assert total <= STARTUP_MAX_SECONDS, f'cold start {total:.3f}s is above {STARTUP_MAX_SECONDS}s: {phases}'
@@ -0,0 +1,90 @@
+import pytest
+
+from src.tracing.context import parse_traceparent, TraceParent
+
+TRACE_ID = '4bf92f3577b34da6a3ce929d0e0e4736'
+SPAN_ID = '00f067aa0ba902b7'
+
+
+@pytest.mark.parametrize(
+    ('header', 'is_sampled'),
+    [
+        (f'00-{TRACE_ID}-{SPAN_ID}-01', True),
+        (f'00-{TRACE_ID}-{SPAN_ID}-00', False),
+        # only the sampled bit of the flags is known
+        (f'00-{TRACE_ID}-{SPAN_ID}-03', True),
+        (f'00-{TRACE_ID}-{SPAN_ID}-02', False),
+        (f' 00-{TRACE_ID}-{SPAN_ID}-01 ', True),
+    ],
+)
+def test_valid_traceparent_is_parsed(header, is_sampled):
+    assert parse_traceparent(header) == TraceParent(trace_id=TRACE_ID, span_id=SPAN_ID, is_sampled=is_sampled)
+
+
+@pytest.mark.parametrize(
+    'header',
+    [
+        None,
+        '',
+        # version ff is forbidden
+        f'ff-{TRACE_ID}-{SPAN_ID}-01',
+        # all-zero ids are invalid
+        f'00-{"0" * 32}-{SPAN_ID}-01',
+        f'00-{TRACE_ID}-{"0" * 16}-01',
+        # version 00 has exactly four fields
+        f'00-{TRACE_ID}-{SPAN_ID}-01-extra',
+        f'00-{TRACE_ID}-{SPAN_ID}-01extra',
+        # lowercase hex only, fixed field lengths
+        f'00-{TRACE_ID.upper()}-{SPAN_ID}-01',
+        f'00-{TRACE_ID[:-1]}-{SPAN_ID}-01',
+        f'00-{TRACE_ID}-{SPAN_ID}0-01',
+        f'0-{TRACE_ID}-{SPAN_ID}-01',
+        f'00_{TRACE_ID}_{SPAN_ID}_01',
+    ],
+)
+def test_invalid_traceparent_is_ignored(header):
+    assert parse_traceparent(header) is None
+
+
+@pytest.mark.parametrize(
+    'header',
+    [
+        f'01-{TRACE_ID}-{SPAN_ID}-01',
+        f'cc-{TRACE_ID}-{SPAN_ID}-01-what-the-future-will-be-like',
+    ],
+)
+def test_future_version_is_parsed_by_its_known_fields(header):
+    assert parse_traceparent(header) == TraceParent(trace_id=TRACE_ID, span_id=SPAN_ID, is_sampled=True)
+
+
+def test_future_version_needs_a_dash_after_known_fields():
+    assert parse_traceparent(f'01-{TRACE_ID}-{SPAN_ID}-01.future') is None
+
+
+def test_header_is_written_as_version_00():
+    traceparent = parse_traceparent(f'cc-{TRACE_ID}-{SPAN_ID}-03-future')
+
+    assert traceparent.header() == f'00-{TRACE_ID}-{SPAN_ID}-01'
+
+
+def test_tracestate_is_kept_without_empty_members():
+    traceparent = parse_traceparent(f'00-{TRACE_ID}-{SPAN_ID}-01', 'rojo=00f067aa0ba902b7, ,congo=t61rcWkgMzE,')
+
+    assert traceparent.tracestate == 'rojo=00f067aa0ba902b7,congo=t61rcWkgMzE'
+
+
+def test_tracestate_over_limit_drops_members_from_the_end():
+    members = [f'vendor{index}={"x" * 40}' for index in range(20)]
+
+    tracestate = parse_traceparent(f'00-{TRACE_ID}-{SPAN_ID}-01', ','.join(members)).tracestate
+
+    assert len(tracestate) <= 512
+    kept = tracestate.split(',')
+    assert kept == members[: len(kept)]
+    assert len(','.join(members[: len(kept) + 1])) > 512
+
+
+def test_tracestate_with_single_oversized_member_is_dropped():
+    traceparent = parse_traceparent(f'00-{TRACE_ID}-{SPAN_ID}-01', f'vendor={"x" * 600}')
+
+    assert traceparent.tracestate is None
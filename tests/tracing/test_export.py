@@ -0,0 +1,79 @@
+from collections.abc import AsyncGenerator, Generator
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from src.settings import get_settings_snapshot, TracingSettings
+from src.tracing.exporters import InMemorySpanExporter, span_exporter
+from src.tracing.spans import SpanKind, start_span
+from src.transport import rest
+from src.transport.rest.router import FastAPILoggingRouter
+
+TRACE_ID = '4bf92f3577b34da6a3ce929d0e0e4736'
+PARENT_SPAN_ID = '00f067aa0ba902b7'
+
+router = FastAPILoggingRouter()
+
+
+@router.get('/items/{item_id}')
+async def get_item_handler(item_id: int):
+    with start_span('load item', attributes={'item.id': item_id}):
+        return {'id': item_id}
+
+
+@pytest.fixture()
+def exporter() -> Generator[InMemorySpanExporter]:
+    exporter = InMemorySpanExporter()
+    span_exporter.start(settings=TracingSettings(flush_interval=0.01), exporter=exporter)
+    yield exporter
+    span_exporter.stop()
+
+
+@pytest.fixture()
+async def client() -> AsyncGenerator[AsyncClient]:
+    app = FastAPI()
+    rest.init_middlewares(app=app, settings_snapshot=get_settings_snapshot())
+    app.include_router(router)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test') as client:
+        yield client
+
+
+async def test_spans_of_one_request_are_exported_together(exporter, client):
+    response = await client.get('/items/7', headers={'traceparent': f'00-{TRACE_ID}-{PARENT_SPAN_ID}-01'})
+    span_exporter.stop()
+
+    assert response.status_code == 200
+    assert response.headers['X-Request-ID'] == TRACE_ID
+    spans = {span.name: span for span in exporter.spans}
+    assert set(spans) == {'GET /items/{item_id}', 'middleware', 'handler', 'serialization', 'load item'}
+    assert {span.trace_id for span in spans.values()} == {TRACE_ID}
+    assert all(span.end_ns is not None for span in spans.values())
+
+    root = spans['GET /items/{item_id}']
+    assert root.kind == SpanKind.SERVER
+    assert root.parent_id == PARENT_SPAN_ID
+    assert root.attributes['http.route'] == '/items/{item_id}'
+    assert root.attributes['http.response.status_code'] == 200
+    assert {spans[name].parent_id for name in ('middleware', 'handler', 'serialization')} == {root.span_id}
+    assert spans['load item'].parent_id == spans['handler'].span_id
+    assert spans['load item'].attributes == {'item.id': 7}
+
+
+async def test_unsampled_request_is_not_exported(exporter, client):
+    response = await client.get('/items/7', headers={'traceparent': f'00-{TRACE_ID}-{PARENT_SPAN_ID}-00'})
+    span_exporter.stop()
+
+    assert response.status_code == 200
+    assert list(exporter.spans) == []
+
+
+async def test_each_request_gets_its_own_trace(exporter, client):
+    await client.get('/items/1')
+    await client.get('/items/2')
+    span_exporter.stop()
+
+    roots = [span for span in exporter.spans if span.kind == SpanKind.SERVER]
+    assert len(roots) == 2
+    assert roots[0].trace_id != roots[1].trace_id
+    assert all(span.parent_id is None for span in roots)
@@ -0,0 +1,149 @@
+from uuid import uuid4
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from httpx import ASGITransport, AsyncClient
+
+from src.settings import LoggerSettings
+from src.transport.rest.middlewares import access_log_sampling as sampling_module, logging_middleware
+from src.transport.rest.middlewares.access_log_sampling import AccessLogSampler
+from src.transport.rest.router import FastAPILoggingRouter
+
+ROUTE = '/items'
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture()
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(sampling_module, 'monotonic', clock)
+    return clock
+
+
+def make_sampler(**settings) -> AccessLogSampler:
+    return AccessLogSampler.from_settings(LoggerSettings(**settings))
+
+
+def should_log(sampler: AccessLogSampler, **record) -> bool:
+    record = {
+        'route': ROUTE,
+        'http_status_code': 200,
+        'is_error': False,
+        'processing_time': 0.01,
+        'trace_id': uuid4().hex,
+        **record,
+    }
+    return sampler.should_log(**record)
+
+
+def test_sampler_is_off_by_default():
+    assert not make_sampler().is_sampling
+    assert make_sampler(access_log_sample_rate=0.5).is_sampling
+    assert make_sampler(access_log_sample_rates={ROUTE: 0.5}).is_sampling
+    assert make_sampler(access_log_budget_per_second=100).is_sampling
+
+
+@pytest.mark.parametrize(
+    ('http_status_code', 'is_error'),
+    [(400, False), (404, False), (500, False), (503, False), (None, False), (200, True)],
+)
+def test_errors_are_always_kept(http_status_code, is_error):
+    sampler = make_sampler(access_log_sample_rate=0)
+
+    assert should_log(sampler, http_status_code=http_status_code, is_error=is_error)
+    assert sampler.stats.kept_errors == 1
+
+
+@pytest.mark.parametrize('http_status_code', [200, 201, 204, 301, 304, 307])
+def test_successes_and_redirects_are_sampled(http_status_code):
+    sampler = make_sampler(access_log_sample_rate=0)
+
+    assert not should_log(sampler, http_status_code=http_status_code)
+    assert sampler.stats.dropped == 1
+    assert sampler.dropped_by_route == {ROUTE: 1}
+
+
+def test_slow_requests_are_always_kept():
+    sampler = make_sampler(
+        access_log_sample_rate=0,
+        access_log_slow_threshold=1.0,
+        access_log_slow_thresholds={'/reports': 5.0},
+    )
+
+    assert should_log(sampler, processing_time=1.0)
+    assert not should_log(sampler, processing_time=0.99)
+    assert not should_log(sampler, route='/reports', processing_time=2.0)
+    assert should_log(sampler, route='/reports', processing_time=5.0)
+    assert sampler.stats.kept_slow == 2
+
+
+def test_route_rate_overrides_default_rate():
+    sampler = make_sampler(access_log_sample_rate=0, access_log_sample_rates={'/orders': 1.0})
+
+    assert should_log(sampler, route='/orders')
+    assert not should_log(sampler, route=ROUTE)
+
+
+def test_decision_follows_trace_id():
+    sampler = make_sampler(access_log_sample_rate=0.5)
+    trace_ids = [uuid4().hex for _ in range(1000)]
+
+    decisions = [should_log(sampler, trace_id=trace_id) for trace_id in trace_ids]
+
+    # the same trace is kept or dropped on every service that samples by it
+    assert decisions == [should_log(sampler, trace_id=trace_id) for trace_id in trace_ids]
+    assert 400 < sum(decisions) < 600
+
+
+def test_adaptive_rate_follows_budget(clock):
+    sampler = make_sampler(access_log_budget_per_second=10)
+
+    for _ in range(99):
+        assert should_log(sampler)
+    clock.now += 1.0
+    should_log(sampler)
+    # 100 records offered within a second against a budget of 10 per second
+    assert sampler.adaptive_rate == pytest.approx(0.1)
+
+    kept = sum(should_log(sampler) for _ in range(1000))
+    assert 50 < kept < 150
+    # errors are kept whatever the budget
+    assert should_log(sampler, http_status_code=500)
+
+    # the 1000 records above (errors are not offered) closed the next window, a quiet one brings the rate back
+    clock.now += 1.0
+    should_log(sampler)
+    assert sampler.adaptive_rate == pytest.approx(10 / 1001)
+    clock.now += 1.0
+    should_log(sampler)
+    assert sampler.adaptive_rate == 1.0
+
+
+async def test_logging_route_drops_sampled_records_and_keeps_errors(monkeypatch: pytest.MonkeyPatch):
+    records = []
+    monkeypatch.setattr(logging_middleware, 'log_access_record', records.append)
+    sampler = make_sampler(access_log_sample_rate=0)
+    monkeypatch.setattr(logging_middleware, 'get_access_log_sampler', lambda: sampler)
+
+    router = FastAPILoggingRouter()
+
+    @router.get('/items/{status_code}')
+    async def get_item_handler(status_code: int):
+        return JSONResponse({'status': status_code}, status_code=status_code)
+
+    app = FastAPI()
+    app.include_router(router)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test') as client:
+        for status_code in (200, 304, 404, 500):
+            await client.get(f'/items/{status_code}')
+
+    assert [record['http_status_code'] for record in records] == [404, 500]
+    assert sampler.dropped_by_route == {'/items/{status_code}': 2}
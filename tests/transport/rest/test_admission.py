@@ -0,0 +1,245 @@
+import asyncio
+
+import pytest
+from starlette.types import Message, Receive, Scope, Send
+
+from src.settings import AdmissionSettings, get_settings_snapshot
+from src.transport.rest import admission as admission_module
+from src.transport.rest.admission import AdmissionController, AIMDLimit, Priority
+from src.transport.rest.middlewares.admission_middleware import AdmissionMiddleware
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture()
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(admission_module, 'monotonic', clock)
+    return clock
+
+
+def make_limit(initial: int = 10, **kwargs) -> AIMDLimit:
+    kwargs = {'min_limit': 2, 'max_limit': 12, 'latency_target': 1.0, 'backoff_ratio': 0.5, **kwargs}
+    return AIMDLimit(initial=initial, **kwargs)
+
+
+def test_fast_sample_from_a_busy_worker_raises_the_limit_by_one():
+    limit = make_limit()
+
+    limit.on_sample(0.1, in_flight=5)
+    assert limit.value == 11
+    limit.on_sample(0.1, in_flight=10)
+    limit.on_sample(0.1, in_flight=10)
+    assert limit.value == 12
+
+
+def test_fast_sample_from_an_idle_worker_keeps_the_limit():
+    limit = make_limit()
+
+    limit.on_sample(0.1, in_flight=4)
+
+    assert limit.value == 10
+
+
+def test_slow_sample_backs_off_once_per_latency_target(clock):
+    limit = make_limit()
+
+    limit.on_sample(2.0, in_flight=10)
+    assert limit.value == 5
+    # requests admitted together finish slow together
+    clock.now += 0.5
+    limit.on_sample(2.0, in_flight=10)
+    assert limit.value == 5
+
+    clock.now += 0.5
+    limit.on_sample(2.0, in_flight=10)
+    assert limit.value == 2
+    clock.now += 1
+    limit.on_sample(2.0, in_flight=10)
+    assert limit.value == 2
+
+
+def test_initial_limit_is_kept_within_bounds():
+    assert make_limit(initial=100).value == 12
+    assert make_limit(initial=1).value == 2
+
+
+def make_controller(**settings) -> AdmissionController:
+    settings = {'initial_limit': 2, 'queue_size': 2, 'queue_timeout': 0.05, 'adaptive': False, **settings}
+    return AdmissionController(AdmissionSettings(**settings))
+
+
+def test_priority_by_path():
+    controller = make_controller(critical_paths=('/debug/health',), low_priority_paths=('/reports',))
+
+    assert controller.priority('/debug/health') is Priority.CRITICAL
+    assert controller.priority('/reports/daily') is Priority.LOW
+    assert controller.priority('/items') is Priority.NORMAL
+
+
+async def test_requests_over_the_limit_wait_for_a_slot_in_order():
+    controller = make_controller(queue_timeout=1)
+    assert await controller.acquire(Priority.NORMAL)
+    assert await controller.acquire(Priority.NORMAL)
+
+    first = asyncio.create_task(controller.acquire(Priority.NORMAL))
+    second = asyncio.create_task(controller.acquire(Priority.NORMAL))
+    await asyncio.sleep(0)
+    assert controller.stats()['waiting'] == 2
+
+    controller.release(0.01)
+    assert await first
+    assert not second.done()
+    controller.release(0.01)
+    assert await second
+    assert controller.stats() == {
+        'limit': 2,
+        'in_flight': 2,
+        'waiting': 0,
+        'admitted': 4,
+        'queued': 2,
+        'shed': {},
+    }
+
+
+async def test_request_is_shed_when_the_queue_is_full_or_the_wait_times_out():
+    controller = make_controller(queue_size=1)
+    assert await controller.acquire(Priority.NORMAL)
+    assert await controller.acquire(Priority.NORMAL)
+
+    waiter = asyncio.create_task(controller.acquire(Priority.NORMAL))
+    await asyncio.sleep(0)
+    assert not await controller.acquire(Priority.NORMAL)
+    assert not await waiter
+
+    assert controller.shed == {'queue_full': 1, 'queue_timeout': 1}
+    assert controller.in_flight == 2
+
+
+async def test_low_priority_is_never_queued_and_gets_a_share_of_the_limit():
+    controller = make_controller(initial_limit=4, low_priority_share=0.5)
+
+    assert await controller.acquire(Priority.LOW)
+    assert await controller.acquire(Priority.LOW)
+    assert not await controller.acquire(Priority.LOW)
+    assert await controller.acquire(Priority.NORMAL)
+
+    assert controller.shed == {'low_priority': 1}
+
+
+async def test_cancelled_waiter_does_not_keep_a_slot():
+    controller = make_controller(initial_limit=1, queue_timeout=1)
+    assert await controller.acquire(Priority.NORMAL)
+    waiter = asyncio.create_task(controller.acquire(Priority.NORMAL))
+    await asyncio.sleep(0)
+
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    controller.release(0.01)
+
+    assert controller.stats()['in_flight'] == 0
+    assert controller.stats()['waiting'] == 0
+
+
+async def test_adaptive_controller_moves_the_limit_with_latency(clock):
+    controller = make_controller(adaptive=True, initial_limit=4, min_limit=2, max_limit=8, backoff_ratio=0.5)
+    for _ in range(4):
+        assert await controller.acquire(Priority.NORMAL)
+
+    controller.release(0.1)
+    assert controller.limit.value == 5
+    controller.release(5.0)
+    assert controller.limit.value == 2
+
+
+class App:
+    def __init__(self) -> None:
+        self.release = asyncio.Event()
+        self.calls = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.calls += 1
+        await self.release.wait()
+        await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b'ok'})
+
+
+async def call(middleware: AdmissionMiddleware, path: str = '/items') -> list[Message]:
+    messages = []
+
+    async def send(message: Message) -> None:
+        messages.append(message)
+
+    scope = {'type': 'http', 'method': 'GET', 'path': path, 'headers': [], 'query_string': b''}
+    await middleware(scope, None, send)
+    return messages
+
+
+def make_middleware(app: App, **settings) -> AdmissionMiddleware:
+    return AdmissionMiddleware(
+        app,
+        controller=make_controller(initial_limit=1, queue_size=0, retry_after=3, **settings),
+        is_debug=False,
+        settings_snapshot=get_settings_snapshot(),
+    )
+
+
+async def test_middleware_sheds_with_503_and_retry_after():
+    app = App()
+    middleware = make_middleware(app)
+
+    admitted = asyncio.create_task(call(middleware))
+    await asyncio.sleep(0)
+    [start, _] = await call(middleware)
+    app.release.set()
+    await admitted
+
+    assert start['status'] == 503
+    assert (b'retry-after', b'3') in start['headers']
+    assert app.calls == 1
+    assert middleware.controller.shed == {'queue_full': 1}
+    assert middleware.controller.in_flight == 0
+
+
+async def test_middleware_lets_critical_paths_through():
+    app = App()
+    middleware = make_middleware(app, critical_paths=('/debug/health',))
+
+    admitted = asyncio.create_task(call(middleware))
+    await asyncio.sleep(0)
+    critical = asyncio.create_task(call(middleware, '/debug/health'))
+    await asyncio.sleep(0)
+    assert app.calls == 2
+
+    app.release.set()
+    [start, _] = await critical
+    await admitted
+    assert start['status'] == 200
+
+
+async def test_middleware_samples_latency_at_response_start():
+    async def streaming_app(scope: Scope, receive: Receive, send: Send) -> None:
+        await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+        await asyncio.sleep(0.1)
+        await send({'type': 'http.response.body', 'body': b'ok'})
+
+    controller = make_controller(adaptive=True, initial_limit=1, min_limit=1, latency_target=0.05)
+    middleware = AdmissionMiddleware(
+        streaming_app,
+        controller=controller,
+        is_debug=False,
+        settings_snapshot=get_settings_snapshot(),
+    )
+
+    await call(middleware)
+
+    # the slow body is the client's or the stream's time, not the server's: the limit grows
+    assert controller.limit.value == 2
+    assert controller.in_flight == 0
@@ -0,0 +1,154 @@
+import asyncio
+from collections.abc import AsyncGenerator, Callable
+
+import pytest
+from fakeredis import FakeAsyncRedis, FakeServer
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from httpx import ASGITransport, AsyncClient
+
+from src.cache.lru import LRUCache
+from src.transport.rest.cache import cached, ResponseCache
+from src.transport.rest.router import FastAPILoggingRouter
+
+
+class Endpoint:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.release.set()
+        self.status_codes: list[int] = []
+
+    def make_app(self, redis: FakeAsyncRedis) -> FastAPI:
+        router = FastAPILoggingRouter()
+
+        @router.get('/items')
+        @cached(ttl=60)
+        async def get_items_handler(page: int = 1):
+            self.calls += 1
+            await self.release.wait()
+            status_code = self.status_codes.pop(0) if self.status_codes else 200
+            return JSONResponse({'page': page, 'call': self.calls}, status_code=status_code)
+
+        app = FastAPI()
+        app.state.response_cache = ResponseCache(local=LRUCache(max_entries=100), redis=redis, key_prefix='test')
+        app.include_router(router)
+        return app
+
+
+@pytest.fixture()
+def server() -> FakeServer:
+    return FakeServer()
+
+
+@pytest.fixture()
+def endpoint() -> Endpoint:
+    return Endpoint()
+
+
+@pytest.fixture()
+async def make_client(server: FakeServer, endpoint: Endpoint) -> AsyncGenerator[Callable[[], AsyncClient]]:
+    clients = []
+
+    def make() -> AsyncClient:
+        app = endpoint.make_app(FakeAsyncRedis(server=server))
+        client = AsyncClient(transport=ASGITransport(app=app), base_url='http://test')
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        await client.aclose()
+
+
+async def wait_for_calls(endpoint: Endpoint, calls: int) -> None:
+    while endpoint.calls < calls:
+        await asyncio.sleep(0)
+    # let the other requests reach the in-flight entry
+    await asyncio.sleep(0.01)
+
+
+async def test_concurrent_misses_call_endpoint_once(endpoint, make_client):
+    client = make_client()
+    endpoint.release.clear()
+
+    requests = [asyncio.create_task(client.get('/items', params={'page': 1})) for _ in range(5)]
+    await wait_for_calls(endpoint, 1)
+    endpoint.release.set()
+    responses = await asyncio.gather(*requests)
+
+    assert endpoint.calls == 1
+    assert {response.status_code for response in responses} == {200}
+    assert {response.content for response in responses} == {b'{"page":1,"call":1}'}
+    assert sorted(response.headers['X-Cache'] for response in responses) == ['HIT'] * 4 + ['MISS']
+
+
+async def test_waiters_call_endpoint_when_leader_response_is_not_cacheable(endpoint, make_client):
+    client = make_client()
+    endpoint.release.clear()
+    endpoint.status_codes = [503]
+
+    requests = [asyncio.create_task(client.get('/items')) for _ in range(3)]
+    await wait_for_calls(endpoint, 1)
+    endpoint.release.set()
+    responses = await asyncio.gather(*requests)
+
+    assert endpoint.calls == 3
+    assert sorted(response.status_code for response in responses) == [200, 200, 503]
+
+
+async def test_repeated_request_is_served_from_cache(endpoint, make_client):
+    client = make_client()
+
+    first = await client.get('/items')
+    second = await client.get('/items')
+
+    assert endpoint.calls == 1
+    assert first.headers['X-Cache'] == 'MISS'
+    assert second.headers['X-Cache'] == 'HIT'
+    assert second.content == first.content
+    assert second.headers['ETag'] == first.headers['ETag']
+
+
+async def test_query_is_part_of_the_key(endpoint, make_client):
+    client = make_client()
+
+    await client.get('/items', params={'page': 1})
+    response = await client.get('/items', params={'page': 2})
+
+    assert endpoint.calls == 2
+    assert response.json() == {'page': 2, 'call': 2}
+
+
+async def test_matching_etag_gets_not_modified(endpoint, make_client):
+    client = make_client()
+    etag = (await client.get('/items')).headers['ETag']
+
+    response = await client.get('/items', headers={'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert response.content == b''
+    assert endpoint.calls == 1
+
+
+async def test_other_worker_is_served_from_redis(endpoint, make_client):
+    first_worker, second_worker = make_client(), make_client()
+
+    await first_worker.get('/items')
+    response = await second_worker.get('/items')
+
+    assert endpoint.calls == 1
+    assert response.headers['X-Cache'] == 'HIT'
+    assert response.json() == {'page': 1, 'call': 1}
+
+
+async def test_redis_errors_leave_local_tier_working(server, endpoint, make_client):
+    client = make_client()
+    server.connected = False
+
+    first = await client.get('/items')
+    second = await client.get('/items')
+
+    assert (first.status_code, second.status_code) == (200, 200)
+    assert second.headers['X-Cache'] == 'HIT'
+    assert endpoint.calls == 1
@@ -0,0 +1,159 @@
+import gzip
+import zlib
+from types import SimpleNamespace
+
+import pytest
+from starlette.types import Message, Receive, Scope, Send
+
+from src.settings import CompressionSettings
+from src.transport.rest.content_encoding import AVAILABLE_ENCODINGS, choose_encoding
+from src.transport.rest.middlewares.compression_middleware import CompressionMiddleware, uncompressed
+
+BODY = b'{"items": [' + b'{"name": "item"},' * 200 + b'{}]}'
+
+
+@pytest.mark.parametrize(
+    ('accept_encoding', 'offered', 'encoding'),
+    [
+        (None, ('zstd', 'br', 'gzip'), 'identity'),
+        ('', ('zstd', 'br', 'gzip'), 'identity'),
+        ('gzip', ('zstd', 'br', 'gzip'), 'gzip'),
+        # equal weights: the server's order decides
+        ('gzip, br, zstd', ('zstd', 'br', 'gzip'), 'zstd'),
+        ('gzip, br', ('zstd', 'br', 'gzip'), 'br'),
+        # the client's weights win over the server's order
+        ('zstd;q=0.5, gzip;q=0.8', ('zstd', 'br', 'gzip'), 'gzip'),
+        ('GZIP; Q=0.9, br;q=0.1', ('br', 'gzip'), 'gzip'),
+        # q=0 refuses a coding, also one the wildcard would allow
+        ('*, zstd;q=0', ('zstd', 'br', 'gzip'), 'br'),
+        ('gzip;q=0', ('zstd', 'br', 'gzip'), 'identity'),
+        ('*;q=0', ('zstd', 'br', 'gzip'), 'identity'),
+        ('gzip;q=oops, br', ('gzip', 'br'), 'br'),
+        ('deflate, compress', ('zstd', 'br', 'gzip'), 'identity'),
+        ('zstd', ('gzip',), 'identity'),
+    ],
+)
+def test_choose_encoding(accept_encoding, offered, encoding):
+    assert choose_encoding(accept_encoding, offered) == encoding
+
+
+def make_app(*chunks: bytes, status: int = 200, **headers: str):
+    async def app(scope: Scope, receive: Receive, send: Send) -> None:
+        raw_headers = [(key.replace('_', '-').encode(), value.encode()) for key, value in headers.items()]
+        await send({'type': 'http.response.start', 'status': status, 'headers': raw_headers})
+        for index, chunk in enumerate(chunks):
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': index < len(chunks) - 1})
+
+    return app
+
+
+async def call(app, accept_encoding: str | None = 'gzip', *, method: str = 'GET', route=None) -> list[Message]:
+    headers = [(b'accept-encoding', accept_encoding.encode())] if accept_encoding is not None else []
+    scope = {'type': 'http', 'method': method, 'path': '/', 'headers': headers}
+    if route is not None:
+        scope['route'] = route
+    messages = []
+
+    async def send(message: Message) -> None:
+        messages.append(message)
+
+    middleware = CompressionMiddleware(app, CompressionSettings(encodings=('gzip',), minimum_size=500))
+    await middleware(scope, None, send)
+    return messages
+
+
+def response_headers(messages: list[Message]) -> dict[str, str]:
+    return {key.decode(): value.decode() for key, value in messages[0]['headers']}
+
+
+def response_body(messages: list[Message]) -> bytes:
+    return b''.join(message.get('body', b'') for message in messages[1:])
+
+
+async def test_large_body_is_compressed_with_negotiated_encoding():
+    messages = await call(make_app(BODY, content_type='application/json', content_length=str(len(BODY))))
+
+    headers = response_headers(messages)
+    assert headers['content-encoding'] == 'gzip'
+    assert headers['vary'] == 'Accept-Encoding'
+    assert int(headers['content-length']) == len(response_body(messages)) < len(BODY)
+    assert gzip.decompress(response_body(messages)) == BODY
+
+
+async def test_streamed_body_is_compressed_chunk_by_chunk():
+    chunks = (BODY[:1000], BODY[1000:2000], BODY[2000:])
+    messages = await call(make_app(*chunks, content_type='application/json'))
+
+    assert response_headers(messages)['content-encoding'] == 'gzip'
+    assert 'content-length' not in response_headers(messages)
+    assert len(messages) == 1 + len(chunks)
+    # every chunk is flushed, so it can be decoded before the stream ends
+    assert zlib.decompressobj(31).decompress(messages[1]['body']) == chunks[0]
+    assert gzip.decompress(response_body(messages)) == BODY
+
+
+async def test_strong_etag_is_weakened():
+    messages = await call(make_app(BODY, etag='"abc"'))
+
+    assert response_headers(messages)['etag'] == 'W/"abc"'
+
+
+@pytest.mark.parametrize(
+    ('status', 'headers'),
+    [
+        (200, {'content_encoding': 'br'}),
+        (200, {'content_type': 'image/png'}),
+        (200, {'content_type': 'application/zip'}),
+        (200, {'content_length': '100'}),
+        (206, {}),
+        (304, {}),
+    ],
+)
+async def test_response_is_passed_through(status, headers):
+    messages = await call(make_app(BODY, status=status, **headers))
+
+    assert response_headers(messages).get('content-encoding') == headers.get('content_encoding')
+    assert response_body(messages) == BODY
+
+
+async def test_already_encoded_stream_is_not_encoded_again():
+    encoded = gzip.compress(BODY)
+    messages = await call(make_app(encoded[:100], encoded[100:], content_encoding='gzip'))
+
+    assert response_body(messages) == encoded
+
+
+async def test_small_single_chunk_body_is_sent_as_is():
+    messages = await call(make_app(b'{"ok": true}'))
+
+    assert 'content-encoding' not in response_headers(messages)
+    assert response_body(messages) == b'{"ok": true}'
+
+
+async def test_svg_is_compressed_although_images_are_skipped():
+    messages = await call(make_app(BODY, content_type='image/svg+xml'))
+
+    assert response_headers(messages)['content-encoding'] == 'gzip'
+
+
+@pytest.mark.parametrize(('accept_encoding', 'method'), [(None, 'GET'), ('gzip;q=0', 'GET'), ('gzip', 'HEAD')])
+async def test_nothing_is_compressed_without_an_accepted_encoding(accept_encoding, method):
+    messages = await call(make_app(BODY), accept_encoding, method=method)
+
+    assert response_body(messages) == BODY
+
+
+async def test_route_can_opt_out():
+    @uncompressed
+    async def endpoint():
+        pass
+
+    messages = await call(make_app(BODY), route=SimpleNamespace(endpoint=endpoint))
+
+    assert response_body(messages) == BODY
+
+
+@pytest.mark.skipif(AVAILABLE_ENCODINGS != ('zstd', 'br', 'gzip'), reason='needs the compression extra')
+def test_optional_encodings_are_offered_when_installed():
+    assert choose_encoding('br, gzip') == 'br'
+    assert choose_encoding('zstd, br, gzip') == 'zstd'
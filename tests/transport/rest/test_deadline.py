@@ -0,0 +1,170 @@
+import asyncio
+from time import monotonic
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import Message, Receive
+
+from src.bootstrap import make_app
+from src.settings import DeadlineSettings
+from src.transport.rest.deadline import RouteDeadline
+from src.transport.rest.errors import ClientDisconnectedError, RequestTimeoutError
+from src.transport.rest.router import FastAPILoggingRouter
+from src.utils import DEADLINE
+
+HEADER = 'X-Request-Timeout'
+
+
+def make_request(**headers: str) -> Request:
+    raw_headers = [(key.lower().encode(), value.encode()) for key, value in headers.items()]
+    return Request({'type': 'http', 'method': 'GET', 'path': '/', 'headers': raw_headers})
+
+
+@pytest.mark.parametrize(
+    ('timeout', 'header', 'budget'),
+    [
+        (10.0, None, 10.0),
+        (10.0, '2.5', 2.5),
+        # the client can shorten its deadline, never extend it
+        (10.0, '30', 10.0),
+        (None, '30', 30.0),
+        (None, '900', 300.0),
+        (None, None, None),
+        (10.0, 'soon', 10.0),
+        (10.0, '0', 10.0),
+        (10.0, '-1', 10.0),
+    ],
+)
+def test_header_budget_is_clamped_to_route_timeout(timeout, header, budget):
+    route_deadline = RouteDeadline(timeout=timeout, settings=DeadlineSettings(header=HEADER, max_timeout=300))
+    request = make_request(**({HEADER: header} if header is not None else {}))
+
+    assert route_deadline.get_budget(request) == budget
+
+
+class Endpoint:
+    def __init__(self, duration: float = 0.0, *, read_body: bool = False) -> None:
+        self.duration = duration
+        self.read_body = read_body
+        self.is_cancelled = False
+        self.deadline: float | None = None
+        self.body: bytes | None = None
+
+    async def __call__(self, request: Request) -> Response:
+        self.deadline = DEADLINE.get()
+        if self.read_body:
+            self.body = await request.body()
+        try:
+            await asyncio.sleep(self.duration)
+        except asyncio.CancelledError:
+            self.is_cancelled = True
+            raise
+        return Response(b'done')
+
+
+def make_receiver(*messages: Message, disconnect_after: float | None = None) -> Receive:
+    queue = list(messages)
+
+    async def receive() -> Message:
+        if queue:
+            return queue.pop(0)
+        if disconnect_after is None:
+            await asyncio.Future()
+        await asyncio.sleep(disconnect_after)
+        return {'type': 'http.disconnect'}
+
+    return receive
+
+
+def make_route_deadline(timeout: float | None, **settings) -> RouteDeadline:
+    settings = {'header': HEADER, 'disconnect_watch_delay': 0, **settings}
+    return RouteDeadline(timeout=timeout, settings=DeadlineSettings(**settings))
+
+
+def make_receiving_request(receive: Receive) -> Request:
+    return Request({'type': 'http', 'method': 'POST', 'path': '/', 'headers': []}, receive)
+
+
+async def test_handler_within_budget_gets_the_deadline():
+    endpoint = Endpoint()
+    started = monotonic()
+
+    response = await make_route_deadline(timeout=5)(make_receiving_request(make_receiver()), endpoint)
+
+    assert response.body == b'done'
+    assert started + 5 <= endpoint.deadline <= monotonic() + 5
+    assert DEADLINE.get() is None
+
+
+async def test_handler_is_cancelled_when_budget_runs_out():
+    endpoint = Endpoint(duration=5)
+
+    with pytest.raises(RequestTimeoutError):
+        await make_route_deadline(timeout=0.05)(make_receiving_request(make_receiver()), endpoint)
+
+    assert endpoint.is_cancelled
+    assert DEADLINE.get() is None
+
+
+async def test_handler_is_cancelled_when_client_disconnects():
+    endpoint = Endpoint(duration=5)
+    receive = make_receiver(disconnect_after=0.05)
+
+    with pytest.raises(ClientDisconnectedError):
+        await make_route_deadline(timeout=None)(make_receiving_request(receive), endpoint)
+
+    assert endpoint.is_cancelled
+
+
+async def test_disconnect_is_not_watched_when_disabled():
+    endpoint = Endpoint(duration=0.1)
+    receive = make_receiver(disconnect_after=0.01)
+
+    response = await make_route_deadline(timeout=None, cancel_on_disconnect=False)(
+        make_receiving_request(receive),
+        endpoint,
+    )
+
+    assert response.body == b'done'
+    assert not endpoint.is_cancelled
+
+
+async def test_watched_request_still_reads_its_body():
+    endpoint = Endpoint(read_body=True)
+    receive = make_receiver(
+        {'type': 'http.request', 'body': b'first,', 'more_body': True},
+        {'type': 'http.request', 'body': b'second', 'more_body': False},
+    )
+
+    await make_route_deadline(timeout=5)(make_receiving_request(receive), endpoint)
+
+    assert endpoint.body == b'first,second'
+
+
+async def test_cancellation_from_outside_is_not_turned_into_timeout():
+    endpoint = Endpoint(duration=5)
+    call = asyncio.create_task(make_route_deadline(timeout=5)(make_receiving_request(make_receiver()), endpoint))
+    await asyncio.sleep(0.01)
+
+    call.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await call
+    assert endpoint.is_cancelled
+
+
+async def test_route_timeout_answers_504():
+    router = FastAPILoggingRouter(timeout=0.05)
+
+    @router.get('/slow')
+    async def get_slow_handler():
+        await asyncio.sleep(5)
+
+    app = make_app.__wrapped__()
+    app.include_router(router)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test') as client:
+        response = await client.get('/slow')
+
+    assert response.status_code == 504
@@ -0,0 +1,83 @@
+from collections.abc import AsyncGenerator
+from pathlib import Path
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from src.bootstrap import make_app
+from src.settings import get_settings, ProfilingSettings
+from src.transport.rest.profiling import sign_profile_header
+
+HEADER = 'X-Profile'
+SECRET = 'profiling-secret'
+TRACE_ID_HEADER = 'X-Request-ID'
+
+
+@pytest.fixture()
+async def make_client(monkeypatch: pytest.MonkeyPatch, tmp_path: Path):
+    clients = []
+
+    async def make(**settings) -> AsyncClient:
+        profiling = ProfilingSettings(enabled=True, header=HEADER, path=tmp_path, **settings)
+        monkeypatch.setattr(get_settings().env, 'profiling', profiling)
+        # make_app() is cached, the middleware stack has to be built with these settings
+        client = AsyncClient(transport=ASGITransport(app=make_app.__wrapped__()), base_url='http://test')
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        await client.aclose()
+
+
+@pytest.fixture()
+async def client(make_client) -> AsyncGenerator[AsyncClient]:
+    yield await make_client(secret=SECRET)
+
+
+def signed() -> dict[str, str]:
+    return {HEADER: sign_profile_header(SECRET)}
+
+
+async def test_signed_request_is_profiled_and_read_back_with_the_header(client):
+    response = await client.get('/debug/ping', headers=signed())
+    trace_id = response.headers[TRACE_ID_HEADER]
+
+    profiles = (await client.get('/debug/profiles', headers=signed())).json()
+    assert [profile['trace_id'] for profile in profiles] == [trace_id]
+
+    profile = await client.get(f'/debug/profiles/{trace_id}', headers=signed())
+    assert profile.status_code == 200
+    assert profile.headers['content-type'].startswith('text/plain')
+
+
+async def test_profiles_are_not_readable_without_a_valid_header(client):
+    await client.get('/debug/ping', headers=signed())
+    trace_id = (await client.get('/debug/profiles', headers=signed())).json()[0]['trace_id']
+
+    for headers in ({}, {HEADER: 'unsigned'}, {HEADER: sign_profile_header('other-secret')}):
+        assert (await client.get('/debug/profiles', headers=headers)).status_code == 403
+        assert (await client.get(f'/debug/profiles/{trace_id}', headers=headers)).status_code == 403
+
+
+async def test_unsigned_request_is_not_profiled(client):
+    await client.get('/debug/ping', headers={HEADER: 'unsigned'})
+
+    assert (await client.get('/debug/profiles', headers=signed())).json() == []
+
+
+async def test_allowed_client_only_needs_the_header(make_client):
+    client = await make_client(allowed_clients=['127.0.0.1'])
+
+    await client.get('/debug/ping', headers={HEADER: '1'})
+
+    assert (await client.get('/debug/profiles')).status_code == 403
+    assert len((await client.get('/debug/profiles', headers={HEADER: '1'})).json()) == 1
+
+
+async def test_reading_profiles_does_not_profile_the_read(client):
+    await client.get('/debug/ping', headers=signed())
+    for _ in range(3):
+        await client.get('/debug/profiles', headers=signed())
+
+    assert len((await client.get('/debug/profiles', headers=signed())).json()) == 1
@@ -0,0 +1,201 @@
+import threading
+from collections.abc import Generator
+
+import pytest
+import sentry_sdk
+from sentry_sdk.envelope import Envelope
+from sentry_sdk.transport import Transport
+
+from src.settings import SentrySettings
+from src.transport.rest import sentry_reporter as sentry_reporter_module
+from src.transport.rest.sentry_reporter import SentryReporter
+
+
+class FakeTransport(Transport):
+    def __init__(self, options: dict | None = None) -> None:
+        super().__init__(options)
+        self.events: list[dict] = []
+        self.is_sending = threading.Event()
+        self.may_send = threading.Event()
+        self.may_send.set()
+
+    def capture_envelope(self, envelope: Envelope) -> None:
+        if (event := envelope.get_event()) is not None:
+            self.is_sending.set()
+            self.may_send.wait(timeout=5)
+            self.events.append(event)
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture()
+def transport() -> Generator[FakeTransport]:
+    transport = FakeTransport()
+    sentry_sdk.init(dsn='http://public@sentry.test/1', transport=transport, default_integrations=False)
+    yield transport
+    sentry_sdk.get_client().close()
+    sentry_sdk.get_global_scope().set_client(None)
+
+
+@pytest.fixture()
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(sentry_reporter_module, 'monotonic', clock)
+    return clock
+
+
+@pytest.fixture()
+def make_reporter() -> Generator:
+    reporters = []
+
+    def make(**settings) -> SentryReporter:
+        reporter = SentryReporter()
+        reporter.start(SentrySettings(**settings))
+        reporters.append(reporter)
+        return reporter
+
+    yield make
+    for reporter in reporters:
+        reporter.stop()
+
+
+# every call raises from the same line, so the errors share a fingerprint
+def raise_error(exc: Exception) -> Exception:
+    try:
+        raise exc
+    except Exception as caught:  # noqa: BLE001
+        return caught
+
+
+def raise_elsewhere(exc: Exception) -> Exception:
+    try:
+        raise exc
+    except Exception as caught:  # noqa: BLE001
+        return caught
+
+
+def capture(reporter: SentryReporter, exc: Exception, title: str = 'InternalServerError') -> str | None:
+    return reporter.capture(exc, title=title, tags={}, extras={})
+
+
+def test_event_is_sent_from_worker_with_its_event_id(transport, make_reporter):
+    reporter = make_reporter()
+
+    event_id = reporter.capture(
+        raise_error(ValueError('boom')),
+        title='InternalServerError',
+        tags={'route': '/items'},
+        extras={'trace_id': 'abc'},
+    )
+    reporter.stop()
+
+    [event] = transport.events
+    assert event['event_id'] == event_id
+    assert event['tags']['route'] == '/items'
+    assert event['extra']['trace_id'] == 'abc'
+    assert event['exception']['values'][-1]['type'] == 'ValueError'
+    assert reporter.stats.reported == 1
+
+
+def test_same_error_within_window_is_deduplicated(transport, make_reporter, clock):
+    reporter = make_reporter(dedup_window=60)
+
+    first = capture(reporter, raise_error(ValueError('first')))
+    second = capture(reporter, raise_error(ValueError('second')))
+    other_site = capture(reporter, raise_elsewhere(ValueError('third')))
+    other_type = capture(reporter, raise_error(KeyError('fourth')))
+    reporter.stop()
+
+    assert second == first
+    assert other_site not in (None, first)
+    assert other_type not in (None, first, other_site)
+    assert reporter.stats.deduplicated == 1
+    assert len(transport.events) == 3
+
+
+def test_same_error_after_window_is_reported_again(transport, make_reporter, clock):
+    reporter = make_reporter(dedup_window=60)
+
+    first = capture(reporter, raise_error(ValueError('first')))
+    clock.now += 61
+    second = capture(reporter, raise_error(ValueError('second')))
+    reporter.stop()
+
+    assert second not in (None, first)
+    assert reporter.stats.deduplicated == 0
+    assert len(transport.events) == 2
+
+
+def test_errors_are_sampled_by_title(transport, make_reporter):
+    reporter = make_reporter(dedup_window=0, sample_rates={'ObjectNotFoundError': 0}, default_sample_rate=1)
+
+    assert capture(reporter, raise_error(ValueError()), title='ObjectNotFoundError') is None
+    assert capture(reporter, raise_error(ValueError()), title='InternalServerError') is not None
+    reporter.stop()
+
+    assert reporter.stats.sampled_out == 1
+    assert len(transport.events) == 1
+
+
+def test_default_sample_rate_applies_to_unlisted_titles(transport, make_reporter):
+    reporter = make_reporter(dedup_window=0, sample_rates={'InternalServerError': 1}, default_sample_rate=0)
+
+    assert capture(reporter, raise_error(ValueError()), title='ExternalServiceError') is None
+    assert capture(reporter, raise_error(ValueError()), title='InternalServerError') is not None
+    reporter.stop()
+
+    assert reporter.stats.sampled_out == 1
+
+
+def test_token_bucket_limits_each_title(transport, make_reporter, clock):
+    reporter = make_reporter(dedup_window=0, rate_limits_per_minute={'InternalServerError': 2})
+
+    assert [capture(reporter, raise_error(ValueError())) is not None for _ in range(3)] == [True, True, False]
+    assert capture(reporter, raise_error(ValueError()), title='ExternalServiceError') is not None
+    reporter.stop()
+
+    assert reporter.stats.rate_limited == 1
+    assert len(transport.events) == 3
+
+
+def test_token_bucket_refills_over_the_minute(transport, make_reporter, clock):
+    reporter = make_reporter(dedup_window=0, rate_limits_per_minute={'InternalServerError': 2})
+    for _ in range(2):
+        capture(reporter, raise_error(ValueError()))
+
+    clock.now += 29
+    assert capture(reporter, raise_error(ValueError())) is None
+    clock.now += 1
+    assert capture(reporter, raise_error(ValueError())) is not None
+    assert capture(reporter, raise_error(ValueError())) is None
+
+    assert reporter.stats.rate_limited == 2
+
+
+def test_default_rate_limit_applies_to_unlisted_titles(transport, make_reporter, clock):
+    reporter = make_reporter(dedup_window=0, default_rate_limit_per_minute=1)
+
+    assert capture(reporter, raise_error(ValueError()), title='ExternalServiceError') is not None
+    assert capture(reporter, raise_error(ValueError()), title='ExternalServiceError') is None
+    assert capture(reporter, raise_error(ValueError()), title='InternalServerError') is not None
+
+
+def test_report_is_dropped_when_queue_is_full(transport, make_reporter):
+    reporter = make_reporter(dedup_window=0, queue_size=1)
+    transport.may_send.clear()
+
+    assert capture(reporter, raise_error(ValueError())) is not None
+    assert transport.is_sending.wait(timeout=5)
+    assert capture(reporter, raise_error(ValueError())) is not None
+    assert capture(reporter, raise_error(ValueError())) is None
+
+    transport.may_send.set()
+    reporter.stop()
+    assert reporter.stats.dropped == 1
+    assert len(transport.events) == 2